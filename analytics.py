@@ -0,0 +1,74 @@
+# ==============================================================================
+#  analytics.py - Search Analytics Read from the Rollup Tables
+# ==============================================================================
+# Builds the figures shown on /analytics: the most searched cases, the case
+# type distribution, searches per hour, the result cache hit rate and scrape
+# latency. Everything is read from the rollup tables maintained by
+# query_log_writer.py, never from query_log itself, so the cost of a
+# dashboard load depends on the number of case types and hours shown, not on
+# the size of the log. Hours are in UTC. Must be used inside an app context.
+# ==============================================================================
+
+import datetime
+from sqlalchemy import func
+from models import db, QueryCaseRollup, QueryTypeRollup, QueryHourRollup
+
+
+# Returns the dashboard figures for the last `hours` hours (at most 31 days)
+# and the `top` most searched cases
+def query_analytics(hours=24, top=10):
+    hours = max(1, min(hours, 31 * 24))
+    top = max(1, min(top, 100))
+    now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+    hour_keys = [(now - datetime.timedelta(hours=offset)).strftime('%Y-%m-%d %H')
+                 for offset in range(hours - 1, -1, -1)]
+
+    # --- Searches, cache hits and scrapes per hour (missing hours are zero) ---
+    rows = {row.hour: row for row in QueryHourRollup.query.filter(QueryHourRollup.hour >= hour_keys[0]).all()}
+    per_hour = []
+    for key in hour_keys:
+        row = rows.get(key)
+        per_hour.append({
+            'hour': key + ':00',
+            'searches': row.searches if row else 0,
+            'cache_hits': row.cache_hits if row else 0,
+            'scrapes': row.scrapes if row else 0,
+            'scrape_failures': row.scrape_failures if row else 0,
+            'avg_scrape_s': round(row.scrape_seconds_total / row.scrapes, 2) if row and row.scrapes else None,
+            'max_scrape_s': round(row.scrape_seconds_max, 2) if row and row.scrapes else None,
+        })
+
+    searches = sum(hour['searches'] for hour in per_hour)
+    cache_hits = sum(hour['cache_hits'] for hour in per_hour)
+    scrapes = sum(hour['scrapes'] for hour in per_hour)
+    scrape_seconds = sum(rows[key].scrape_seconds_total for key in hour_keys if key in rows)
+    max_scrape = max((rows[key].scrape_seconds_max for key in hour_keys if key in rows), default=0.0)
+
+    # --- Top cases and case types (all time) ---
+    top_cases = (QueryCaseRollup.query
+                 .order_by(QueryCaseRollup.searches.desc(), QueryCaseRollup.last_searched_at.desc())
+                 .limit(top).all())
+    case_types = QueryTypeRollup.query.order_by(QueryTypeRollup.searches.desc()).all()
+    total_searches = db.session.query(func.coalesce(func.sum(QueryTypeRollup.searches), 0)).scalar()
+
+    return {
+        'window_hours': hours,
+        'window': {
+            'searches': searches,
+            'cache_hits': cache_hits,
+            'cache_hit_rate': round(cache_hits / searches, 3) if searches else 0.0,
+            'scrapes': scrapes,
+            'scrape_failures': sum(hour['scrape_failures'] for hour in per_hour),
+            'avg_scrape_s': round(scrape_seconds / scrapes, 2) if scrapes else None,
+            'max_scrape_s': round(max_scrape, 2) if scrapes else None,
+        },
+        'per_hour': per_hour,
+        'total_searches': total_searches,
+        'top_cases': [{'case_type': case.case_type, 'case_number': case.case_number, 'case_year': case.case_year,
+                       'searches': case.searches,
+                       'last_searched_at': case.last_searched_at.strftime('%Y-%m-%d %H:%M') if case.last_searched_at else None}
+                      for case in top_cases],
+        'case_types': [{'case_type': row.case_type, 'searches': row.searches,
+                        'share': round(row.searches / total_searches, 3) if total_searches else 0.0}
+                       for row in case_types],
+    }
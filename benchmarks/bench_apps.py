@@ -0,0 +1,291 @@
+# ==============================================================================
+#  bench_apps.py - End-to-End Benchmark of Both Apps Against the Mock Court
+# ==============================================================================
+# Starts benchmarks/mock_court.py and then each app (app.py and app2.py) in
+# its own process, drives their pages at a fixed concurrency and reports the
+# p50/p95/p99 latency and throughput of every scenario plus the app's peak
+# resident memory:
+#
+#   index      GET /  (app.py opens a scrape session and reads the CAPTCHA)
+#   search     POST /search, then polling the job until its results are ready
+#   summarize  POST /summarize for an order of the searched case
+#
+# Each app runs from a scratch copy of the repository so benchmark traffic
+# never touches the databases in instance/. Summaries use the local stub
+# model. Save a run with --save and fail on regressions against it later
+# with --compare (exit status 1 if any p95 got slower than --tolerance).
+#
+# Usage (from the repository root):
+#   python benchmarks/bench_apps.py [--apps app app2] [--concurrency 4] [--requests 40]
+#                                   [--latency 0.1] [--save run.json] [--compare run.json]
+# ==============================================================================
+
+import argparse
+import json
+import os
+import re
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The CAPTCHA flow each app runs (see captcha_flows.py)
+APP_FLOWS = {'app': 'user', 'app2': 'auto'}
+CASE_TYPE = 'W.P.(C)'
+CASE_YEAR = '2020'
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_up(url, process, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url} exited during startup")
+        try:
+            requests.get(url, timeout=5)
+            return
+        except requests.RequestException:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not start within {timeout}s")
+
+
+# Peak resident set size of a process in KiB (Linux only)
+def peak_rss_kib(pid):
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+# ------------------------------------------------------------------------------
+# Running the apps
+# ------------------------------------------------------------------------------
+
+# Runs inside the app process (see --serve): the same app as app.py or
+# app2.py, but threaded and without the debugger
+def serve(module_name, port, stub_delay):
+    from court_app import create_app
+    app = create_app(APP_FLOWS[module_name])
+    app.extensions['court_services'].summarizer.stub_delay = stub_delay
+    app.run(host='127.0.0.1', port=port, threaded=True, use_reloader=False)
+
+
+# Copies the app code (not .git or instance/) into a temporary directory
+def scratch_copy():
+    directory = tempfile.mkdtemp(prefix='bench-apps-')
+    for name in os.listdir(ROOT):
+        source = os.path.join(ROOT, name)
+        if name.endswith('.py') or name == 'templates':
+            if os.path.isdir(source):
+                shutil.copytree(source, os.path.join(directory, name))
+            else:
+                shutil.copy(source, directory)
+    shutil.copy(os.path.abspath(__file__), directory)
+    return directory
+
+
+def start_app(module_name, court_url, stub_delay, log):
+    directory = scratch_copy()
+    port = free_port()
+    env = dict(os.environ, CASE_STATUS_URL=court_url, SUMMARY_MODEL='stub')
+    process = subprocess.Popen([sys.executable, 'bench_apps.py', '--serve', module_name, str(port), str(stub_delay)],
+                               cwd=directory, env=env, stdout=log, stderr=subprocess.STDOUT)
+    base_url = f'http://127.0.0.1:{port}'
+    wait_until_up(base_url + '/stats', process)
+    return process, base_url, directory
+
+
+# ------------------------------------------------------------------------------
+# Scenarios: each returns the latency of one operation in seconds
+# ------------------------------------------------------------------------------
+
+class AppClient:
+    def __init__(self, module_name, base_url):
+        self.module_name = module_name
+        self.base_url = base_url
+        self._numbers = iter(range(1, 10 ** 9))
+        self._lock = threading.Lock()
+        self.order_urls = []
+
+    def next_case_number(self):
+        with self._lock:
+            return str(next(self._numbers))
+
+    def index(self, http):
+        started = time.perf_counter()
+        response = http.get(self.base_url + '/', timeout=60)
+        response.raise_for_status()
+        return time.perf_counter() - started
+
+    def search(self, http):
+        form = {'case_type': CASE_TYPE, 'case_number': self.next_case_number(), 'filing_year': CASE_YEAR}
+        started = time.perf_counter()
+        if self.module_name == 'app':
+            # The user-assisted flow needs the session id and CAPTCHA shown on /
+            page = http.get(self.base_url + '/', timeout=60).text
+            form['session_id'] = re.search(r'name="session_id" value="([^"]*)"', page).group(1)
+            form['captcha'] = form['original_captcha'] = re.search(r'name="original_captcha" value="([^"]*)"', page).group(1)
+        response = http.post(self.base_url + '/search', data=form, allow_redirects=False, timeout=60)
+        job_url = response.headers.get('Location')
+        if response.status_code != 302 or not job_url:
+            raise RuntimeError(f"search was not queued (HTTP {response.status_code})")
+        while True:
+            job = http.get(self.base_url + job_url + '/status', timeout=60).json()
+            if job['status'] == 'failed':
+                raise RuntimeError(job['error'])
+            if job['status'] == 'done':
+                break
+            time.sleep(0.02)
+        elapsed = time.perf_counter() - started
+        if not job['result']:
+            raise RuntimeError("search found no records")
+        with self._lock:
+            self.order_urls.extend(link['url'] for link in job['result']['order_links'][:3])
+        return elapsed
+
+    def summarize(self, http):
+        with self._lock:
+            if not self.order_urls:
+                raise RuntimeError("no order links collected by the search scenario")
+            pdf_url = self.order_urls.pop()
+        started = time.perf_counter()
+        response = http.post(self.base_url + '/summarize', data={'pdf_url': pdf_url}, timeout=120)
+        response.raise_for_status()
+        return time.perf_counter() - started
+
+
+def run_scenario(operation, concurrency, count):
+    latencies = []
+    errors = []
+    local = threading.local()
+
+    def one(_):
+        if not hasattr(local, 'http'):
+            local.http = requests.Session()
+        try:
+            latencies.append(operation(local.http))
+        except Exception as e:
+            errors.append(str(e))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one, range(count)))
+    wall = time.perf_counter() - started
+
+    result = {'requests': count, 'errors': len(errors), 'throughput_rps': round(len(latencies) / wall, 2)}
+    if len(latencies) >= 2:
+        cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+        result.update({'p50_ms': round(cuts[49] * 1000, 1), 'p95_ms': round(cuts[94] * 1000, 1),
+                       'p99_ms': round(cuts[98] * 1000, 1)})
+    if errors:
+        result['first_error'] = errors[0]
+    return result
+
+
+# ------------------------------------------------------------------------------
+# Reporting
+# ------------------------------------------------------------------------------
+
+def print_report(results):
+    print(f"\n{'app':<6} {'scenario':<10} {'reqs':>5} {'errs':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>8}")
+    for app_name, app_result in results['apps'].items():
+        for scenario, r in app_result['scenarios'].items():
+            print(f"{app_name:<6} {scenario:<10} {r['requests']:>5} {r['errors']:>5} {r.get('p50_ms', '-'):>9} "
+                  f"{r.get('p95_ms', '-'):>9} {r.get('p99_ms', '-'):>9} {r['throughput_rps']:>8}")
+            if r.get('first_error'):
+                print(f"       first error: {r['first_error']}")
+        rss = app_result['peak_rss_kib']
+        print(f"{app_name:<6} peak RSS: {f'{rss / 1024:.1f} MiB' if rss else 'n/a'}")
+
+
+# Returns a list of regressions: scenarios whose p95 grew beyond tolerance
+def compare(results, baseline, tolerance):
+    regressions = []
+    for app_name, app_result in results['apps'].items():
+        for scenario, r in app_result['scenarios'].items():
+            before = baseline.get('apps', {}).get(app_name, {}).get('scenarios', {}).get(scenario, {})
+            if 'p95_ms' in r and 'p95_ms' in before and r['p95_ms'] > before['p95_ms'] * (1 + tolerance):
+                regressions.append(f"{app_name} {scenario}: p95 {before['p95_ms']} ms -> {r['p95_ms']} ms")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark app.py and app2.py against the local mock court.")
+    parser.add_argument('--apps', nargs='+', default=['app', 'app2'], choices=('app', 'app2'))
+    parser.add_argument('--scenarios', nargs='+', default=['index', 'search', 'summarize'],
+                        choices=('index', 'search', 'summarize'))
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=40, help="operations per scenario")
+    parser.add_argument('--latency', type=float, default=0.1, help="mock court response delay in seconds")
+    parser.add_argument('--jitter', type=float, default=0.02)
+    parser.add_argument('--stub-delay', type=float, default=0.005, help="stub model delay per word")
+    parser.add_argument('--save', help="write the results as JSON to this file")
+    parser.add_argument('--compare', help="baseline JSON from an earlier --save run")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="allowed p95 slow-down (default 0.2 = 20%%)")
+    parser.add_argument('--serve', nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        serve(args.serve[0], int(args.serve[1]), float(args.serve[2]))
+        return
+
+    log = tempfile.NamedTemporaryFile(prefix='bench-apps-', suffix='.log', delete=False)
+    court_port = free_port()
+    court = subprocess.Popen([sys.executable, os.path.join(ROOT, 'benchmarks', 'mock_court.py'),
+                              '--port', str(court_port), '--latency', str(args.latency), '--jitter', str(args.jitter)],
+                             stdout=log, stderr=subprocess.STDOUT)
+    court_url = f'http://127.0.0.1:{court_port}/app/get-case-type-status'
+    results = {'settings': {key: getattr(args, key) for key in ('concurrency', 'requests', 'latency', 'jitter', 'stub_delay')},
+               'apps': {}}
+    try:
+        wait_until_up(court_url, court)
+        for module_name in args.apps:
+            process, base_url, directory = start_app(module_name, court_url, args.stub_delay, log)
+            client = AppClient(module_name, base_url)
+            scenarios = {}
+            try:
+                for scenario in args.scenarios:
+                    print(f"{module_name}: {scenario} x{args.requests} at concurrency {args.concurrency}...")
+                    scenarios[scenario] = run_scenario(getattr(client, scenario), args.concurrency, args.requests)
+                results['apps'][module_name] = {'scenarios': scenarios, 'peak_rss_kib': peak_rss_kib(process.pid)}
+            finally:
+                process.terminate()
+                process.wait()
+                shutil.rmtree(directory, ignore_errors=True)
+    finally:
+        court.terminate()
+        court.wait()
+        log.close()
+
+    print_report(results)
+    print(f"\nServer logs: {log.name}")
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
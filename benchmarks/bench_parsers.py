@@ -0,0 +1,146 @@
+# ==============================================================================
+#  bench_parsers.py - Parse Time and Memory of the Court Page Parsers
+# ==============================================================================
+# Runs every parser backend of parsers.py, plus the original full-tree
+# BeautifulSoup 'html.parser' code as a baseline, over the saved pages in
+# benchmarks/fixtures/ and prints the median parse time and the peak memory
+# allocated while parsing each page (measured with tracemalloc). The outputs
+# of all backends are checked against the baseline first. tracemalloc only
+# sees Python allocations, so lxml's tree (allocated in C) is not included
+# in its peak.
+#
+# Usage (from the repository root):
+#   python benchmarks/bench_parsers.py [--iterations 50]
+# ==============================================================================
+
+import argparse
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from bs4 import BeautifulSoup
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import parsers
+
+FIXTURES = os.path.join(ROOT, 'benchmarks', 'fixtures')
+
+
+# ------------------------------------------------------------------------------
+# Baseline: the parsing code both apps used before parsers.py
+# ------------------------------------------------------------------------------
+
+def baseline_case_results(page_source):
+    if parsers.NO_RECORDS_TEXT in page_source:
+        return None
+    soup = BeautifulSoup(page_source, 'html.parser')
+    first_row_cells = soup.find('table', id='caseTable').find('tbody').find('tr').find_all('td')
+    second_cell = first_row_cells[1]
+    order_page_url = None
+    for link in second_cell.find_all('a'):
+        if 'Orders' in link.text and link.has_attr('href'):
+            order_page_url = link['href']
+            break
+    return {
+        'diary_no': second_cell.text.strip().split('\n')[0],
+        'parties': first_row_cells[2].text.strip(),
+        'order_page_link': order_page_url
+    }
+
+
+def baseline_order_links(page_source):
+    order_links = []
+    for table in BeautifulSoup(page_source, 'html.parser').find_all('table'):
+        if table.find('tbody'):
+            for row in table.find('tbody').find_all('tr'):
+                cells = row.find_all('td')
+                if len(cells) > 2 and cells[1].find('a') and 'showlogo' in cells[1].find('a')['href']:
+                    link = cells[1].find('a')
+                    order_links.append({'text': link.text.strip(), 'url': link['href'], 'date': cells[2].text.strip()})
+    return order_links
+
+
+def baseline_case_type_options(page_source):
+    select = BeautifulSoup(page_source, 'html.parser').find('select', {'name': 'case_type'})
+    labels = [option.text.strip() for option in select.find_all('option')] if select else []
+    return [label for label in labels if label and label.lower() != 'select']
+
+
+# What HttpSession read from the case status page before parse_search_form()
+def baseline_search_form(page_source):
+    soup = BeautifulSoup(page_source, 'html.parser')
+    captcha_element = soup.find(id='captcha-code')
+    form = soup.find('select', {'name': 'case_type'}).find_parent('form')
+    fields = {}
+    for field in form.find_all('input'):
+        if field.get('name') and field.get('type') not in ('submit', 'button', 'checkbox', 'radio'):
+            fields[field['name']] = field.get('value', '')
+    captcha_input = form.find(id='captchaInput')
+    option_values = {}
+    for select in form.find_all('select'):
+        option_values[select.get('name')] = {
+            option.text.strip(): option.get('value', option.text.strip()) for option in select.find_all('option')
+        }
+    return {
+        'captcha_text': captcha_element.get_text(strip=True),
+        'method': (form.get('method') or 'get').lower(),
+        'action': form.get('action'),
+        'fields': fields,
+        'captcha_field': captcha_input.get('name') if captcha_input and captcha_input.get('name') else 'captchaInput',
+        'option_values': option_values,
+    }
+
+
+# (fixture file, baseline function, parsers.py function)
+CASES = [
+    ('case_status_page.html', baseline_case_type_options, parsers.parse_case_type_options),
+    ('case_status_page.html', baseline_search_form, parsers.parse_search_form),
+    ('results_page.html', baseline_case_results, parsers.parse_case_results),
+    ('orders_page.html', baseline_order_links, parsers.parse_order_links),
+]
+
+
+# ------------------------------------------------------------------------------
+# Measurement
+# ------------------------------------------------------------------------------
+
+def measure(function, page_source, iterations):
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        function(page_source)
+        timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    function(page_source)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(timings), peak
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the court page parsers against saved pages.")
+    parser.add_argument('--iterations', type=int, default=50, help="parses per page and backend (default: 50)")
+    args = parser.parse_args(argv)
+
+    print(f"{'page':<22} {'backend':<10} {'median ms':>10} {'peak KiB':>10} {'speed-up':>9}")
+    for file_name, baseline, function in CASES:
+        with open(os.path.join(FIXTURES, file_name), encoding='utf-8') as f:
+            page_source = f.read()
+
+        expected = baseline(page_source)
+        base_time, base_peak = measure(baseline, page_source, args.iterations)
+        print(f"{file_name:<22} {'baseline':<10} {base_time * 1000:>10.2f} {base_peak / 1024:>10.0f} {'1.0x':>9}")
+
+        for backend in parsers.BACKENDS:
+            parsers.backend = backend
+            if function(page_source) != expected:
+                sys.exit(f"{backend} parser output differs from the baseline for {file_name}")
+            elapsed, peak = measure(function, page_source, args.iterations)
+            print(f"{file_name:<22} {backend:<10} {elapsed * 1000:>10.2f} {peak / 1024:>10.0f} {base_time / elapsed:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+# ==============================================================================
+#  bench_startup.py - Cold-Start Time of the Apps
+# ==============================================================================
+# Measures what every new worker process pays before it can serve its first
+# request: each run builds and starts the app of app.py or app2.py in a fresh
+# Python process (through wsgi.py, or by importing the file itself in older
+# trees that build the app on import), then sends one request to /stats through
+# the test client. Reported per app: import time, first request time, the
+# total, peak resident memory and which heavy libraries (Selenium, Gemini,
+# PyPDF2) had been loaded by then.
+#
+# --baseline REV runs the same measurement against an earlier commit (taken
+# with `git archive`), so the effect of a change on start-up can be seen.
+# Each run uses a scratch copy of the code, so the databases in instance/
+# are never touched, and CASE_STATUS_URL points at a closed port so no run
+# waits on the network.
+#
+# Usage (from the repository root):
+#   python benchmarks/bench_startup.py [--apps app app2] [--runs 5] [--baseline HEAD~1]
+# ==============================================================================
+
+import argparse
+import json
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ('selenium', 'google.generativeai', 'PyPDF2')
+APP_FLOWS = {'app': 'user', 'app2': 'auto'}
+
+# Runs in the measured process: prints one JSON line with the timings
+PROBE = """
+import json, os, sys, time
+started = time.perf_counter()
+app = getattr(__import__(sys.argv[1]), 'app', None)
+if app is None:
+    # app.py / app2.py only build the app when run as a script; wsgi.py
+    # builds the same one on import
+    os.environ['CAPTCHA_FLOW'] = sys.argv[2]
+    app = __import__('wsgi').app
+imported = time.perf_counter()
+app.test_client().get('/stats')
+answered = time.perf_counter()
+rss = None
+try:
+    with open('/proc/self/status') as f:
+        rss = next(int(line.split()[1]) for line in f if line.startswith('VmHWM:'))
+except (OSError, StopIteration):
+    pass
+print(json.dumps({'import_s': imported - started, 'first_request_s': answered - imported,
+                  'heavy_modules': [name for name in %r if name in sys.modules], 'peak_rss_kib': rss}))
+sys.stdout.flush()
+os._exit(0)
+""" % (HEAVY_MODULES,)
+
+
+def closed_port_url():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    return f'http://127.0.0.1:{port}/app/get-case-type-status'
+
+
+# Copies the app code (not .git or instance/) into a temporary directory
+def scratch_copy():
+    directory = tempfile.mkdtemp(prefix='bench-startup-')
+    for name in os.listdir(ROOT):
+        source = os.path.join(ROOT, name)
+        if name.endswith('.py') or name == 'templates':
+            if os.path.isdir(source):
+                shutil.copytree(source, os.path.join(directory, name))
+            else:
+                shutil.copy(source, directory)
+    return directory
+
+
+# Extracts the tree of an earlier commit into a temporary directory
+def revision_copy(revision):
+    directory = tempfile.mkdtemp(prefix='bench-startup-')
+    archive = subprocess.run(['git', 'archive', revision], cwd=ROOT, capture_output=True, check=True).stdout
+    subprocess.run(['tar', '-x', '-C', directory], input=archive, check=True)
+    return directory
+
+
+def measure(directory, module_name, runs):
+    env = dict(os.environ, CASE_STATUS_URL=closed_port_url(), SUMMARY_MODEL='stub')
+    env.pop('WEB_CONCURRENCY', None)
+    samples = []
+    for _ in range(runs):
+        # A new instance/ every run, as on a fresh deployment
+        shutil.rmtree(os.path.join(directory, 'instance'), ignore_errors=True)
+        result = subprocess.run([sys.executable, '-c', PROBE, module_name, APP_FLOWS[module_name]], cwd=directory, env=env,
+                                capture_output=True, text=True, timeout=300)
+        lines = [line for line in result.stdout.splitlines() if line.startswith('{')]
+        if result.returncode != 0 or not lines:
+            raise RuntimeError(f"{module_name} failed to start:\n{result.stdout}\n{result.stderr}")
+        samples.append(json.loads(lines[-1]))
+    return {
+        'import_ms': round(statistics.median(s['import_s'] for s in samples) * 1000, 1),
+        'first_request_ms': round(statistics.median(s['first_request_s'] for s in samples) * 1000, 1),
+        'total_ms': round(statistics.median(s['import_s'] + s['first_request_s'] for s in samples) * 1000, 1),
+        'peak_rss_kib': max((s['peak_rss_kib'] or 0) for s in samples) or None,
+        'heavy_modules': samples[-1]['heavy_modules'],
+    }
+
+
+def print_report(results):
+    print(f"\n{'tree':<14}{'app':<6}{'import':>10}{'1st req':>10}{'total':>10}{'peak RSS':>12}  heavy modules loaded")
+    for tree, apps in results.items():
+        for app_name, r in apps.items():
+            rss = f"{r['peak_rss_kib'] / 1024:.0f} MiB" if r['peak_rss_kib'] else '-'
+            print(f"{tree:<14}{app_name:<6}{r['import_ms']:>8} ms{r['first_request_ms']:>7} ms{r['total_ms']:>7} ms"
+                  f"{rss:>12}  {', '.join(r['heavy_modules']) or 'none'}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the cold-start time of app.py and app2.py.")
+    parser.add_argument('--apps', nargs='+', default=['app', 'app2'], choices=('app', 'app2'))
+    parser.add_argument('--runs', type=int, default=5, help="fresh processes per app (the median is reported)")
+    parser.add_argument('--baseline', help="git revision to measure as well, e.g. HEAD~1")
+    parser.add_argument('--save', help="write the results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    trees = {}
+    if args.baseline:
+        trees[args.baseline] = revision_copy(args.baseline)
+    trees['working tree'] = scratch_copy()
+
+    results = {}
+    try:
+        for tree, directory in trees.items():
+            results[tree] = {}
+            for module_name in args.apps:
+                print(f"{tree}: starting {module_name} x{args.runs}...")
+                results[tree][module_name] = measure(directory, module_name, args.runs)
+    finally:
+        for directory in trees.values():
+            shutil.rmtree(directory, ignore_errors=True)
+
+    print_report(results)
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+# ==============================================================================
+#  mock_court.py - Local Stand-In for the Court's Case Status Website
+# ==============================================================================
+# Serves the pages the scrapers read, with the same structure as the real
+# site, so lookups can be tested and benchmarked without touching
+# delhihighcourt.nic.in:
+#
+#   GET /app/get-case-type-status     the case status page (saved fixture
+#                                     page with a fresh CAPTCHA and CSRF token
+#                                     per visit); the AJAX search on the same
+#                                     URL returns DataTables JSON rows
+#   GET /app/case-orders/<case_id>    the orders page with `showlogo` links
+#   GET /app/showlogo/<case_id>/<n>   an order PDF (supports ETag / 304)
+#
+# Case numbers starting with 0 return "no records". Every response is
+# delayed by --latency seconds (plus random --jitter) to mimic the real
+# site. Point an app at it with:
+#   CASE_STATUS_URL=http://127.0.0.1:5055/app/get-case-type-status
+#
+# Usage:
+#   python benchmarks/mock_court.py [--port 5055] [--latency 0.2] [--jitter 0.05]
+#                                   [--orders 20] [--pdf-pages 5]
+# ==============================================================================
+
+import argparse
+import base64
+import os
+import random
+import secrets
+import time
+from flask import Flask, Response, abort, jsonify, request, session
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+# Values baked into the saved case status page, replaced on every visit
+FIXTURE_CAPTCHA = '<span id="captcha-code" class="captcha-code">4821</span>'
+FIXTURE_TOKEN = 'value="fP3s9XyQ2kLm8RtVb7Nc1DzA4eWh6JuG0oIiYpTq"'
+
+app = Flask(__name__)
+app.secret_key = secrets.token_hex(16)
+app.config['LATENCY'] = 0.0
+app.config['JITTER'] = 0.0
+app.config['ORDERS'] = 20
+app.config['PDF_PAGES'] = 5
+
+with open(os.path.join(FIXTURES, 'case_status_page.html'), encoding='utf-8') as f:
+    STATUS_PAGE = f.read()
+
+
+@app.before_request
+def simulate_latency():
+    delay = app.config['LATENCY'] + random.uniform(0, app.config['JITTER'])
+    if delay > 0:
+        time.sleep(delay)
+
+
+def _case_id(case_type, case_number, case_year):
+    key = f"{case_type} {case_number}/{case_year}"
+    return base64.urlsafe_b64encode(key.encode()).decode().rstrip('=')
+
+
+def _case_name(case_id):
+    return base64.urlsafe_b64decode(case_id + '=' * (-len(case_id) % 4)).decode()
+
+
+# ------------------------------------------------------------------------------
+# Case status page and search
+# ------------------------------------------------------------------------------
+
+@app.route('/app/get-case-type-status')
+def case_status():
+    if request.headers.get('X-Requested-With') != 'XMLHttpRequest':
+        session['captcha'] = f"{random.randint(1000, 9999)}"
+        session['token'] = secrets.token_hex(20)
+        return (STATUS_PAGE
+                .replace(FIXTURE_CAPTCHA, f'<span id="captcha-code" class="captcha-code">{session["captcha"]}</span>')
+                .replace(FIXTURE_TOKEN, f'value="{session["token"]}"'))
+
+    if request.args.get('_token') != session.get('token'):
+        return jsonify({'message': 'CSRF token mismatch.'}), 419
+    if request.args.get('captchaInput') != session.get('captcha'):
+        return jsonify({'data': [], 'message': 'Invalid captcha'})
+
+    case_type = request.args.get('case_type', '')
+    case_number = request.args.get('case_number', '')
+    case_year = request.args.get('case_year', '')
+    if not case_number or case_number.startswith('0'):
+        return jsonify({'data': []})
+
+    case_id = _case_id(case_type, case_number, case_year)
+    return jsonify({'data': [[
+        "1",
+        f"{case_type} {case_number}/{case_year} [PENDING]<br><a href=\"/app/case-orders/{case_id}\">Orders</a>"
+        f" | <a href=\"/app/case-judgements/{case_id}\">Judgments</a>",
+        "RAM KUMAR SHARMA<br>VS.<br>UNION OF INDIA &amp; ORS.",
+        f"NEXT DATE: 14/03/{case_year}<br>Court No. : 27",
+    ]]})
+
+
+# ------------------------------------------------------------------------------
+# Orders page and order PDFs
+# ------------------------------------------------------------------------------
+
+@app.route('/app/case-orders/<case_id>')
+def case_orders(case_id):
+    name = _case_name(case_id)
+    rows = "".join(
+        f'<tr><td>{n}</td><td><a href="/app/showlogo/{case_id}/{n}" target="_blank">{name}</a></td>'
+        f'<td>{(n % 28) + 1:02d}/{(n % 12) + 1:02d}/2023</td><td>HON\'BLE MR. JUSTICE A. B. SINGH</td></tr>'
+        for n in range(app.config['ORDERS'], 0, -1))
+    return (f'<html><body><h2>Orders : {name}</h2><table class="table" id="caseOrderTable">'
+            f'<thead><tr><th>S.No.</th><th>Case No / Order Link</th><th>Date of Order</th><th>Bench</th></tr></thead>'
+            f'<tbody>{rows}</tbody></table></body></html>')
+
+
+# Builds a small but valid PDF with one line of text per page
+def make_pdf(lines):
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>",
+               b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % (4 + 2 * i) for i in range(len(lines)))
+               + b"] /Count %d >>" % len(lines),
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    for i, line in enumerate(lines):
+        stream = f"BT /F1 11 Tf 72 720 Td ({line}) Tj ET".encode('latin-1')
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % (5 + 2 * i))
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+
+    pdf = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    pdf += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return pdf
+
+
+@app.route('/app/showlogo/<case_id>/<int:order_number>')
+def order_pdf(case_id, order_number):
+    if order_number < 1 or order_number > app.config['ORDERS']:
+        abort(404)
+    etag = f'"{case_id}-{order_number}"'
+    if request.headers.get('If-None-Match') == etag:
+        return Response(status=304, headers={'ETag': etag})
+    name = _case_name(case_id)
+    lines = [f"Order {order_number} in {name}, page {page}. The petition is listed for arguments; "
+             f"the respondents are directed to file a reply within four weeks."
+             for page in range(1, app.config['PDF_PAGES'] + 1)]
+    return Response(make_pdf(lines), mimetype='application/pdf', headers={'ETag': etag})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a local stand-in for the court's case status website.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument('--jitter', type=float, default=0.0, help="extra random delay of up to this many seconds")
+    parser.add_argument('--orders', type=int, default=20, help="orders listed for every case")
+    parser.add_argument('--pdf-pages', type=int, default=5, help="pages in every order PDF")
+    args = parser.parse_args(argv)
+
+    app.config.update(LATENCY=args.latency, JITTER=args.jitter, ORDERS=args.orders, PDF_PAGES=args.pdf_pages)
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == '__main__':
+    main()
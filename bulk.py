@@ -0,0 +1,167 @@
+# ==============================================================================
+#  bulk.py - Bulk Case Lookups (shared by the /bulk endpoint and the CLI)
+# ==============================================================================
+# Takes a CSV or JSON list of (case_type, case_number, case_year), drops
+# repeated entries, looks the cases up on a pool of parallel workers and
+# yields one result per case as soon as it finishes, ready to be streamed as
+# NDJSON. Scrapes go through the app's court governor (see governor.py), so
+# a large batch cannot flood the court website.
+#
+# Command-line usage (uses the fully automated 'auto' flow, as app2.py):
+#   python bulk.py cases.csv [--workers 4] [--rate 3.0] [--force-refresh] > results.ndjson
+# ==============================================================================
+
+import argparse
+import contextlib
+import csv
+import io
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Accepted column / key names for each field of a case
+FIELD_ALIASES = {
+    'case_type': ('case_type', 'type'),
+    'case_number': ('case_number', 'number', 'case_no'),
+    'case_year': ('case_year', 'year', 'filing_year'),
+}
+
+
+# ------------------------------------------------------------------------------
+# Parsing and de-duplication
+# ------------------------------------------------------------------------------
+
+def _pick(record, field):
+    for name in FIELD_ALIASES[field]:
+        value = record.get(name)
+        if value not in (None, ''):
+            return str(value).strip()
+    raise ValueError(f"Missing '{field}' in entry: {record}")
+
+
+# Parses a batch from CSV (with a header row) or JSON (a list of objects or
+# of [case_type, case_number, case_year] lists) into a list of key tuples
+def parse_batch(text, fmt=None):
+    text = text.strip()
+    if fmt is None:
+        fmt = 'json' if text.startswith(('[', '{')) else 'csv'
+
+    if fmt == 'json':
+        records = json.loads(text)
+        if isinstance(records, dict):
+            records = records.get('cases', [])
+    else:
+        records = list(csv.DictReader(io.StringIO(text)))
+
+    cases = []
+    for record in records:
+        if isinstance(record, (list, tuple)):
+            case_type, case_number, case_year = (str(value).strip() for value in record)
+        else:
+            record = {str(key).strip().lower(): value for key, value in record.items()}
+            case_type, case_number, case_year = (_pick(record, field) for field in FIELD_ALIASES)
+        cases.append((case_type, case_number, case_year))
+    return cases
+
+
+# Removes repeated cases while keeping the original order
+def dedupe(cases):
+    seen = set()
+    unique = []
+    for case in cases:
+        if case not in seen:
+            seen.add(case)
+            unique.append(case)
+    return unique, len(cases) - len(unique)
+
+
+# ------------------------------------------------------------------------------
+# Running a batch
+# ------------------------------------------------------------------------------
+
+# Looks up every case with `lookup(case_type, case_number, case_year)` on
+# `workers` threads, yielding one result dict per case in completion order
+# followed by a final summary dict. Closing the generator early (e.g. the
+# /bulk client disconnected) cancels the lookups that have not started, so
+# an abandoned batch stops using the court governor's budget.
+def run_batch(cases, lookup, workers=4):
+    unique, duplicates = dedupe(cases)
+    started = time.monotonic()
+    counts = {}
+
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bulk-worker')
+    finished = False
+    try:
+        futures = {executor.submit(lookup, *case): case for case in unique}
+        for future in as_completed(futures):
+            case_type, case_number, case_year = futures[future]
+            record = {'case_type': case_type, 'case_number': case_number, 'case_year': case_year}
+            try:
+                record.update(future.result())
+            except Exception as e:
+                record.update({'status': 'error', 'error': str(e)})
+            counts[record['status']] = counts.get(record['status'], 0) + 1
+            yield record
+        finished = True
+    finally:
+        # Lookups already running finish in the background
+        executor.shutdown(wait=finished, cancel_futures=not finished)
+
+    yield {'summary': {
+        'received': len(cases),
+        'duplicates_removed': duplicates,
+        'looked_up': len(unique),
+        'by_status': counts,
+        'elapsed_s': round(time.monotonic() - started, 3),
+    }}
+
+
+# Closing this generator closes `records` too (and so cancels its batch)
+def to_ndjson(records):
+    try:
+        for record in records:
+            yield json.dumps(record, default=str) + "\n"
+    finally:
+        close = getattr(records, 'close', None)
+        if close is not None:
+            close()
+
+
+# ==============================================================================
+#  COMMAND-LINE ENTRY POINT
+# ==============================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Look up many Delhi High Court cases and print NDJSON results.")
+    parser.add_argument('file', help="CSV (case_type,case_number,case_year) or JSON file; '-' for stdin")
+    parser.add_argument('--format', choices=('csv', 'json'), help="input format (detected if omitted)")
+    parser.add_argument('--workers', type=int, help="parallel lookups (default: BULK_WORKERS)")
+    parser.add_argument('--rate', type=float, help="max requests per second to the court website (default: COURT_RATE)")
+    parser.add_argument('--force-refresh', action='store_true', help="ignore cached results")
+    args = parser.parse_args(argv)
+
+    text = sys.stdin.read() if args.file == '-' else open(args.file, encoding='utf-8-sig').read()
+    cases = parse_batch(text, args.format)
+
+    # Keep the app's progress messages out of the NDJSON written to stdout
+    out = sys.stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        # Imported here so the endpoint can import this module without a cycle
+        from court_app import create_app
+        from models import db
+
+        # Only the lookups run: no watchlist scheduler or other background work
+        app = create_app('auto', config={'COURT_RATE': args.rate} if args.rate else None, start=False)
+        with app.app_context():
+            db.create_all()
+
+        flow = app.extensions['captcha_flow']
+        lookup = lambda *case: flow.lookup_case(*case, force_refresh=args.force_refresh)
+        for line in to_ndjson(run_batch(cases, lookup, workers=args.workers or app.config['BULK_WORKERS'])):
+            out.write(line)
+            out.flush()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,497 @@
+# ==============================================================================
+#  captcha_flows.py - The User-Assisted and Automated CAPTCHA Flows
+# ==============================================================================
+# The two versions of the app differ only in how the court's CAPTCHA gets
+# solved, so each is a flow plugged into create_app() (see court_app.py) on
+# top of the shared services (see services.py):
+#
+#   * UserCaptchaFlow ('user', formerly app.py) - the homepage opens a scrape
+#     session and shows its CAPTCHA; the user types it in with the search,
+#     which then runs in that same live session.
+#   * AutoCaptchaFlow ('auto', formerly app2.py) - the CAPTCHA is read from
+#     the page automatically, so a search needs nothing but the case details.
+#     This also makes bulk lookups and the watchlist possible.
+#
+# A flow sets its own config defaults (configure()), registers the homepage
+# and /search (plus any routes of its own), starts its background work and
+# adds its components to /stats. Flows are looked up by name in FLOWS.
+# ==============================================================================
+
+import atexit
+import datetime
+import uuid
+from flask import Response, render_template, request, redirect, url_for, session, jsonify
+from governor import CircuitOpenError
+from models import db, WatchedCase
+from session_registry import SessionRegistry
+from watchlist import Watchlist, case_to_dict, order_to_dict
+from bulk import parse_batch, run_batch, to_ndjson
+
+
+# Years offered in the year dropdown: the current year down to 1951
+def _year_options():
+    return list(range(datetime.datetime.now().year, 1950, -1))
+
+
+# Renders the results of a case answered from the result cache
+def _render_cached(cached):
+    case_data, order_links, fetched_at = cached
+    return render_template('results.html', case_data=case_data, order_links=order_links, cached_at=fetched_at)
+
+
+# Renders an error page if the search form is missing any case detail, else
+# returns None
+def _check_case_details(case_type, case_number, filing_year):
+    if all(value and value.strip() for value in (case_type, case_number, filing_year)):
+        return None
+    return render_template('error.html',
+                           error_title="Missing Case Details",
+                           error_message="Please select a case type and filing year and enter a case number.")
+
+
+# ==============================================================================
+#  1. USER-ASSISTED FLOW
+# ==============================================================================
+
+class UserCaptchaFlow:
+    name = 'user'
+    database = 'delhi_high_court.db'
+
+    @staticmethod
+    def configure(app):
+        # How long a CAPTCHA session may wait for its search, and how many may
+        # be open, by primary scraper backend. An HTTP session is only a cookie
+        # jar and a form; a Selenium session holds a pooled browser, so None
+        # means as many as DRIVER_POOL_MAX_SIZE.
+        app.config['SESSION_TTL'] = 300
+        app.config['SESSION_MAX_ACTIVE'] = {'http': 200, 'selenium': None}
+
+    def __init__(self, app, services):
+        self.app = app
+        self.services = services
+
+        # Live scrape sessions waiting for the user's search submission. Abandoned
+        # sessions expire and any browser they hold is handed back to the pool.
+        max_sessions = app.config['SESSION_MAX_ACTIVE'].get(app.config['SCRAPER_BACKENDS'][0])
+        if max_sessions is None:
+            max_sessions = app.config['DRIVER_POOL_MAX_SIZE']
+        self.active_sessions = SessionRegistry(ttl=app.config['SESSION_TTL'],
+                                               max_sessions=max_sessions,
+                                               on_evict=lambda session_id, scrape_session: scrape_session.close())
+        atexit.register(self.active_sessions.shutdown)
+
+        # When every pooled browser is parked in a waiting session, a new
+        # visitor takes over the oldest one's browser instead of waiting for
+        # the checkout to time out
+        services.driver_pool.on_exhausted = lambda: self.active_sessions.evict_oldest(
+            lambda scrape_session: scrape_session.backend == 'selenium')
+
+    def register_routes(self, app):
+        services = self.services
+        active_sessions = self.active_sessions
+
+        # ------------------------------------------------------------------------------
+        # ROUTE: / (Homepage)
+        # ------------------------------------------------------------------------------
+        # Opens a scrape session on the court website to read the CAPTCHA and
+        # keeps that session alive for the user's search submission. The case
+        # types come from the cached catalog.
+        # ------------------------------------------------------------------------------
+        @app.route('/')
+        def index():
+            # Generate a unique session ID for this user's visit
+            session_id = str(uuid.uuid4())
+            session['id'] = session_id
+
+            captcha_text = "Error"
+
+            # The "Case Type" dropdown options come from the cached catalog
+            case_type_options = services.case_type_catalog.get()
+
+            try:
+                # Load the court website and scrape the CAPTCHA text from the page
+                scrape_session = services.scraper.open_session()
+                captcha_text = scrape_session.captcha_text
+
+                # Park the live session in the session registry, ready for the search
+                active_sessions.put(session_id, scrape_session)
+                print(f"{scrape_session.backend} session {session_id} started. CAPTCHA: {captcha_text}")
+
+            except Exception as e:
+                print(f"An error occurred while fetching CAPTCHA: {e}")
+
+            return render_template('index.html',
+                                   captcha_text=captcha_text,
+                                   session_id=session_id,
+                                   case_types=case_type_options,
+                                   years=_year_options())
+
+        # ------------------------------------------------------------------------------
+        # ROUTE: /search (Handles form submission)
+        # ------------------------------------------------------------------------------
+        # Validates the CAPTCHA, logs the query and answers from the result cache
+        # if it can. Otherwise it hands the live scrape session to a background
+        # job and redirects to that job's results page.
+        # ------------------------------------------------------------------------------
+        @app.route('/search', methods=['POST'])
+        def search():
+            # Retrieve the user's session ID and the corresponding live scrape session
+            session_id = request.form.get('session_id')
+            scrape_session = active_sessions.pop(session_id)
+
+            # Handle cases where the session has expired
+            if scrape_session is None:
+                return render_template('error.html',
+                                       error_title="Session Expired",
+                                       error_message="Your session has timed out. Please go back and start a new search.")
+
+            handed_to_job = False
+            try:
+                # Retrieve all data from the submitted form
+                case_type = request.form.get('case_type')
+                case_number = request.form.get('case_number')
+                filing_year = request.form.get('filing_year')
+                captcha_input = request.form.get('captcha')
+                original_captcha = request.form.get('original_captcha')
+                force_refresh = request.form.get('force_refresh') == 'on'
+
+                # --- Pre-submission Validation ---
+                # Compare the user's input with the original CAPTCHA before submitting
+                if captcha_input != original_captcha:
+                    return render_template('error.html',
+                                           error_title="Invalid CAPTCHA",
+                                           error_message="The CAPTCHA code you entered did not match the one displayed. Please try again.")
+                # Every case detail is needed for the search (and its log row)
+                invalid = _check_case_details(case_type, case_number, filing_year)
+                if invalid:
+                    return invalid
+
+                # --- Result Cache and Logging ---
+                # A recent lookup of the same case is served without running the scrape
+                cached = services.cached_lookup(case_type, case_number, filing_year, force_refresh=force_refresh)
+                if cached:
+                    return _render_cached(cached)
+
+                # --- Background Scrape ---
+                # The job now owns the scrape session and will close it when done
+                job = services.search_jobs.submit('search', self.run_search_job, scrape_session, session_id,
+                                                  case_type, case_number, filing_year, captcha_input)
+                handed_to_job = True
+                return redirect(url_for('job_page', job_id=job.id))
+
+            except Exception as e:
+                print(f"An error occurred during form submission: {e}")
+                return f"<h1>An Error Occurred</h1><p>Could not process the request. Error: {e}</p>"
+            finally:
+                # Release the session unless a background job is now using it
+                if not handed_to_job:
+                    scrape_session.close()
+                    print(f"Scrape session {session_id} closed.")
+
+    # ------------------------------------------------------------------------------
+    # JOB: run_search_job (Runs in a background worker)
+    # ------------------------------------------------------------------------------
+    # Submits the search in the live session, parses the main case details and
+    # follows the "Orders" link to collect the PDF links (see scrapers.py).
+    # Returns the results for the job, or None if no records were found.
+    # ------------------------------------------------------------------------------
+    def run_search_job(self, job, scrape_session, session_id, case_type, case_number, filing_year, captcha_input):
+        services = self.services
+        try:
+            with services.query_log_writer.timed_scrape():
+                result = scrape_session.search(case_type, case_number, filing_year, captcha_input, progress=job.set_progress)
+            print(f"Scrape step timings for session {session_id}: {scrape_session.steps.summary()}")
+        except CircuitOpenError:
+            # Refused before anything was sent, so the browser is still usable
+            stale = services.stale_result(case_type, case_number, filing_year)
+            if stale is None:
+                raise
+            return stale
+        except Exception:
+            # A browser in an unknown state must not be handed to another user
+            scrape_session.close(discard=True)
+            raise
+        finally:
+            # Always release the session (e.g. return its browser to the pool)
+            scrape_session.close()
+            print(f"Scrape session {session_id} closed.")
+
+        # Cache the results so repeat lookups can skip the scrape entirely
+        return services.store_result(case_type, case_number, filing_year, result)
+
+    # Starts reaping abandoned CAPTCHA sessions
+    def start(self):
+        self.active_sessions.start()
+
+    def stats(self):
+        return {'sessions': self.active_sessions.stats()}
+
+
+# ==============================================================================
+#  2. AUTOMATED FLOW
+# ==============================================================================
+
+class AutoCaptchaFlow:
+    name = 'auto'
+    # A separate database file for the automated version of the app
+    database = 'delhi_high_court_v2.db'
+
+    @staticmethod
+    def configure(app):
+        # Bulk lookups (/bulk and bulk.py): parallel workers and batch size limit.
+        # Their requests to the court website share the COURT_* limits.
+        app.config['BULK_WORKERS'] = 4
+        app.config['BULK_MAX_CASES'] = 1000
+
+        # Watchlist: default seconds between checks of a watched case, random jitter
+        # (as a fraction of that interval), parallel checks, and how often the
+        # scheduler looks for cases that are due
+        app.config['WATCHLIST_INTERVAL'] = 24 * 3600
+        app.config['WATCHLIST_MIN_INTERVAL'] = 900     # shortest interval_s a case may ask for
+        app.config['WATCHLIST_JITTER'] = 0.1
+        app.config['WATCHLIST_WORKERS'] = 2
+        app.config['WATCHLIST_POLL_INTERVAL'] = 60
+
+    def __init__(self, app, services):
+        self.app = app
+        self.services = services
+
+        # Watched cases, re-checked in the background for new orders (see refresh_case)
+        self.watchlist = Watchlist(app, self.refresh_case, services.pdf_store,
+                                   interval=app.config['WATCHLIST_INTERVAL'],
+                                   jitter=app.config['WATCHLIST_JITTER'],
+                                   workers=app.config['WATCHLIST_WORKERS'],
+                                   poll_interval=app.config['WATCHLIST_POLL_INTERVAL'])
+        atexit.register(self.watchlist.shutdown)
+
+    def register_routes(self, app):
+        services = self.services
+        watchlist = self.watchlist
+
+        # ------------------------------------------------------------------------------
+        # ROUTE: / (Homepage)
+        # ------------------------------------------------------------------------------
+        # Only needs the available Case Types, which come from the cached
+        # catalog, so no browser is launched here.
+        # ------------------------------------------------------------------------------
+        @app.route('/')
+        def index():
+            return render_template('index_v2.html',
+                                   case_types=services.case_type_catalog.get(),
+                                   years=_year_options())
+
+        # ------------------------------------------------------------------------------
+        # ROUTE: /search (Handles form submission)
+        # ------------------------------------------------------------------------------
+        # Answers from the result cache if it can, and otherwise queues a
+        # background job that reads the CAPTCHA, fills it in and performs the
+        # entire multi-step scraping process.
+        # ------------------------------------------------------------------------------
+        @app.route('/search', methods=['POST'])
+        def search():
+            # Retrieve user's search criteria from the form
+            case_type = request.form.get('case_type')
+            case_number = request.form.get('case_number')
+            filing_year = request.form.get('filing_year')
+            force_refresh = request.form.get('force_refresh') == 'on'
+
+            invalid = _check_case_details(case_type, case_number, filing_year)
+            if invalid:
+                return invalid
+
+            try:
+                # Serve a recent lookup of the same case without touching the court website
+                cached = services.cached_lookup(case_type, case_number, filing_year, force_refresh=force_refresh)
+                if cached:
+                    return _render_cached(cached)
+
+                # Run the scrape in the background and send the user to its results page
+                job = services.search_jobs.submit('search', self.run_search_job, case_type, case_number, filing_year)
+                return redirect(url_for('job_page', job_id=job.id))
+
+            except Exception as e:
+                print(f"An error occurred during form submission: {e}")
+                return render_template('error.html',
+                                       error_title="An Application Error Occurred",
+                                       error_message=f"Could not process the request. Error: {e}")
+
+        # ------------------------------------------------------------------------------
+        # ROUTE: /bulk (Batch lookup API)
+        # ------------------------------------------------------------------------------
+        # Accepts a CSV (case_type,case_number,case_year) or JSON list of cases,
+        # either as the request body or as an uploaded file named "cases".
+        # Repeated entries are looked up once, and results are streamed back as
+        # NDJSON, one line per case as it finishes, followed by a summary line.
+        # Add ?force_refresh=1 to ignore cached results.
+        # ------------------------------------------------------------------------------
+        @app.route('/bulk', methods=['POST'])
+        def bulk():
+            upload = request.files.get('cases')
+            if upload:
+                text = upload.read().decode('utf-8-sig')
+                source_name = upload.filename or ''
+            else:
+                text = request.get_data(as_text=True)
+                source_name = request.content_type or ''
+
+            fmt = 'json' if 'json' in source_name else 'csv' if 'csv' in source_name else None
+            try:
+                cases = parse_batch(text, fmt)
+            except Exception as e:
+                return jsonify({'error': f"Could not read the list of cases: {e}"}), 400
+            if not cases:
+                return jsonify({'error': "The list of cases is empty."}), 400
+            if len(cases) > app.config['BULK_MAX_CASES']:
+                return jsonify({'error': f"At most {app.config['BULK_MAX_CASES']} cases can be looked up per batch."}), 413
+
+            force_refresh = request.args.get('force_refresh', '').lower() in ('1', 'true', 'on')
+            lookup = lambda *case: self.lookup_case(*case, force_refresh=force_refresh)
+            records = run_batch(cases, lookup, workers=app.config['BULK_WORKERS'])
+            return Response(to_ndjson(records), mimetype='application/x-ndjson')
+
+        # ------------------------------------------------------------------------------
+        # ROUTES: /watchlist (Watched cases API)
+        # ------------------------------------------------------------------------------
+        # GET lists the watched cases; POST adds one (case_type, case_number,
+        # case_year and an optional interval_s, as JSON or form data). A case's
+        # page lists its orders, newest first; DELETE removes it and POST
+        # .../check queues an immediate re-check as a background job.
+        # ------------------------------------------------------------------------------
+        @app.route('/watchlist', methods=['GET', 'POST'])
+        def watchlist_cases():
+            if request.method == 'GET':
+                return jsonify({'cases': [case_to_dict(case) for case in WatchedCase.query.order_by(WatchedCase.id)]})
+
+            data = request.get_json(silent=True) or request.form
+            case_type = data.get('case_type')
+            case_number = data.get('case_number')
+            case_year = data.get('case_year') or data.get('filing_year')
+            if not (case_type and case_number and case_year):
+                return jsonify({'error': "case_type, case_number and case_year are required."}), 400
+            interval = data.get('interval_s')
+            if interval in (None, ''):
+                interval = None
+            else:
+                try:
+                    interval = int(interval)
+                except (TypeError, ValueError):
+                    return jsonify({'error': "interval_s must be a whole number of seconds."}), 400
+                if interval < app.config['WATCHLIST_MIN_INTERVAL']:
+                    return jsonify({'error': f"interval_s must be at least {app.config['WATCHLIST_MIN_INTERVAL']} seconds."}), 400
+            case = watchlist.add(str(case_type).strip(), str(case_number).strip(), str(case_year).strip(), interval=interval)
+            return jsonify(case_to_dict(case)), 201
+
+        @app.route('/watchlist/<int:case_id>', methods=['GET', 'DELETE'])
+        def watchlist_case(case_id):
+            if request.method == 'DELETE':
+                if not watchlist.remove(case_id):
+                    return jsonify({'error': 'Unknown watched case'}), 404
+                return jsonify({'removed': case_id})
+            case = db.session.get(WatchedCase, case_id)
+            if case is None:
+                return jsonify({'error': 'Unknown watched case'}), 404
+            return jsonify(case_to_dict(case, with_orders=True))
+
+        # The check runs as a background job; poll its status URL for the result
+        @app.route('/watchlist/<int:case_id>/check', methods=['POST'])
+        def watchlist_check(case_id):
+            if db.session.get(WatchedCase, case_id) is None:
+                return jsonify({'error': 'Unknown watched case'}), 404
+            job = services.search_jobs.submit('watchlist_check', self.run_watchlist_check_job, case_id)
+            status_url = url_for('job_status', job_id=job.id)
+            return jsonify({'job_id': job.id, 'status_url': status_url}), 202, {'Location': status_url}
+
+    # ------------------------------------------------------------------------------
+    # JOB: run_search_job (Runs in a background worker)
+    # ------------------------------------------------------------------------------
+    # Auto-reads the CAPTCHA, fills in the form and parses the results and the
+    # orders page, falling back to the next scraper backend on failure. Returns
+    # the results for the job, or None if no records were found.
+    # ------------------------------------------------------------------------------
+    def run_search_job(self, job, case_type, case_number, filing_year):
+        services = self.services
+        try:
+            with services.query_log_writer.timed_scrape():
+                result = services.scraper.lookup(case_type, case_number, filing_year, progress=job.set_progress)
+        except CircuitOpenError:
+            # The court website is down: fall back to a saved result of any age
+            stale = services.stale_result(case_type, case_number, filing_year)
+            if stale is None:
+                raise
+            return stale
+
+        # Cache the results for repeat lookups
+        return services.store_result(case_type, case_number, filing_year, result)
+
+    # ------------------------------------------------------------------------------
+    # JOB: run_watchlist_check_job (Runs in a background worker)
+    # ------------------------------------------------------------------------------
+    # Re-checks one watched case on demand and returns it with any new orders.
+    # ------------------------------------------------------------------------------
+    def run_watchlist_check_job(self, job, case_id):
+        case = db.session.get(WatchedCase, case_id)
+        if case is None:
+            raise ValueError("The watched case has been removed.")
+        job.set_progress("Checking the case for new orders...")
+        new_orders = self.watchlist.check(case)
+        return {'case': case_to_dict(case), 'new_orders': [order_to_dict(order) for order in new_orders]}
+
+    # ------------------------------------------------------------------------------
+    # HELPER: lookup_case (Used by bulk lookups from any thread)
+    # ------------------------------------------------------------------------------
+    # Logs and looks up a single case, answering from the result cache when it
+    # can and otherwise scraping it (within the court governor's limits, falling
+    # back to an older cached result while its circuit is open). Returns a result
+    # record for the NDJSON stream.
+    # ------------------------------------------------------------------------------
+    def lookup_case(self, case_type, case_number, filing_year, force_refresh=False):
+        services = self.services
+        with self.app.app_context():
+            cached = services.result_cache.get(case_type, case_number, filing_year, force_refresh=force_refresh)
+            services.query_log_writer.log(case_type, case_number, filing_year, cache_hit=bool(cached))
+            if cached:
+                case_data, order_links, fetched_at = cached
+                return {'status': 'found', 'source': 'cache', 'fetched_at': fetched_at.isoformat(),
+                        'case_data': case_data, 'order_links': order_links}
+
+            try:
+                with services.query_log_writer.timed_scrape():
+                    result = services.scraper.lookup(case_type, case_number, filing_year)
+            except CircuitOpenError:
+                stale = services.stale_result(case_type, case_number, filing_year)
+                if stale is None:
+                    raise
+                return {'status': 'found', 'source': 'stale_cache', 'fetched_at': stale['cached_at'],
+                        'case_data': stale['case_data'], 'order_links': stale['order_links']}
+            if result is None:
+                return {'status': 'not_found', 'source': 'scrape'}
+            case_data, order_links = result
+            services.result_cache.put(case_type, case_number, filing_year, case_data, order_links)
+            return {'status': 'found', 'source': 'scrape', 'case_data': case_data, 'order_links': order_links}
+
+    # ------------------------------------------------------------------------------
+    # HELPER: refresh_case (Used by the watchlist scheduler)
+    # ------------------------------------------------------------------------------
+    # Scrapes a case without consulting the result cache (within the court
+    # governor's limits) and stores the fresh result in the cache.
+    # ------------------------------------------------------------------------------
+    def refresh_case(self, case_type, case_number, filing_year):
+        result = self.services.scraper.lookup(case_type, case_number, filing_year)
+        if result is not None:
+            case_data, order_links = result
+            self.services.result_cache.put(case_type, case_number, filing_year, case_data, order_links)
+        return result
+
+    # Starts re-checking watched cases for new orders
+    def start(self):
+        self.watchlist.start()
+
+    def stats(self):
+        return {'watchlist': self.watchlist.stats()}
+
+
+# The available flows by name (see create_app() in court_app.py)
+FLOWS = {
+    UserCaptchaFlow.name: UserCaptchaFlow,
+    AutoCaptchaFlow.name: AutoCaptchaFlow,
+}
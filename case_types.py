@@ -0,0 +1,112 @@
+# ==============================================================================
+#  case_types.py - Cached Catalog of Court "Case Type" Options
+# ==============================================================================
+# The list of case types on the court website changes only a few times a
+# year, yet the homepage used to launch a browser to scrape it on every load.
+# The catalog keeps the list in memory, persists it to SQLite so it survives
+# restarts, and refreshes it at most once per `refresh_interval`. When the
+# copy is stale it is still served immediately while a background thread
+# fetches a fresh one (stale-while-revalidate). A failed or empty refresh is
+# not retried for `retry_interval`, so a broken court page doesn't trigger a
+# scrape on every homepage hit.
+# ==============================================================================
+
+import datetime
+import json
+import threading
+from models import db, CaseTypeCache
+
+
+class CaseTypeCatalog:
+    def __init__(self, app, fetch, refresh_interval=24 * 3600, retry_interval=300):
+        self.app = app
+        self.fetch = fetch
+        self.refresh_interval = datetime.timedelta(seconds=refresh_interval)
+        self.retry_interval = datetime.timedelta(seconds=retry_interval)
+
+        self._options = None
+        self._refreshed_at = None
+        self._attempted_at = None              # start of the last refresh, successful or not
+        self._lock = threading.Lock()          # guards the in-memory copy
+        self._refresh_lock = threading.Lock()  # only one fetch at a time
+
+    def _is_stale(self):
+        return self._refreshed_at is None or \
+            datetime.datetime.now() - self._refreshed_at >= self.refresh_interval
+
+    # Records a refresh attempt, unless one was made less than
+    # `retry_interval` ago (then returns False)
+    def _start_attempt(self):
+        now = datetime.datetime.now()
+        with self._lock:
+            if self._attempted_at is not None and now - self._attempted_at < self.retry_interval:
+                return False
+            self._attempted_at = now
+            return True
+
+    # Reads the persisted copy into memory (requires an app context)
+    def _load(self):
+        row = db.session.get(CaseTypeCache, 1)
+        if row is not None:
+            with self._lock:
+                self._options = json.loads(row.options_json)
+                self._refreshed_at = row.refreshed_at
+
+    # Scrapes a fresh list and persists it. An empty scrape usually means the
+    # page failed to load, so it never replaces a good cached list.
+    def refresh(self):
+        if not self._refresh_lock.acquire(blocking=False):
+            # Another thread is already fetching; wait for its result instead
+            with self._refresh_lock:
+                return self._options or []
+        try:
+            self._attempted_at = datetime.datetime.now()
+            options = self.fetch()
+            if not options:
+                print("Case type refresh returned no options; keeping the cached list.")
+                return self._options or []
+            refreshed_at = datetime.datetime.now()
+            with self.app.app_context():
+                row = db.session.get(CaseTypeCache, 1)
+                if row is None:
+                    row = CaseTypeCache(id=1)
+                    db.session.add(row)
+                row.options_json = json.dumps(options)
+                row.refreshed_at = refreshed_at
+                db.session.commit()
+            with self._lock:
+                self._options = options
+                self._refreshed_at = refreshed_at
+            print(f"Case type catalog refreshed ({len(options)} options).")
+            return options
+        except Exception as e:
+            print(f"An error occurred while refreshing case types: {e}")
+            return self._options or []
+        finally:
+            self._refresh_lock.release()
+
+    def _refresh_in_background(self):
+        if self._refresh_lock.locked():
+            return
+        threading.Thread(target=self.refresh, name="case-type-refresh", daemon=True).start()
+
+    # Returns the case type list, fetching synchronously only if nothing has
+    # ever been cached; a stale list is returned at once and refreshed behind.
+    # Either way at most one refresh is started per retry interval.
+    def get(self):
+        if self._options is None:
+            with self.app.app_context():
+                self._load()
+        if self._options is None:
+            return self.refresh() if self._start_attempt() else []
+        if self._is_stale() and self._start_attempt():
+            self._refresh_in_background()
+        return self._options
+
+    # Loads the persisted list at startup and refreshes it in the background
+    # if missing or stale, so the first homepage visit never waits on Chrome
+    def prefill(self):
+        with self.app.app_context():
+            self._load()
+        if self._is_stale():
+            self._refresh_in_background()
@@ -0,0 +1,351 @@
+# ==============================================================================
+#  court_app.py - Application Factory for Both Versions of the App
+# ==============================================================================
+# create_app(flow) builds a Flask app from the shared services (see
+# services.py) and one CAPTCHA flow (see captcha_flows.py): 'user' for the
+# user-assisted version (app.py) or 'auto' for the fully automated one
+# (app2.py). Routes that work the same in both (search jobs, summaries,
+# stats, analytics, metrics) are registered here.
+#
+# Building an app loads no browser, PDF or AI libraries; those are imported
+# on first use. Unless start=False, the app's background work is started
+# right away, so each worker process of a WSGI server (see wsgi.py) builds
+# and starts its own app.
+# ==============================================================================
+
+import datetime
+import os
+from flask import Flask, Response, stream_with_context, render_template, request, jsonify
+import requests
+from models import db
+from summaries import EmptyDocumentError, sse_event
+from analytics import query_analytics
+from tracing import tracer
+from services import CourtServices
+from captcha_flows import FLOWS
+
+
+# ==============================================================================
+#  1. CONFIGURATION
+# ==============================================================================
+
+def configure(app, flow_class):
+    app.config['SECRET_KEY'] = 'a_very_secret_key_that_should_be_changed'
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + flow_class.database
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    # Number of worker processes serving the app (set by gunicorn.conf.py).
+    # The COURT_* limits are split between them, and background search jobs
+    # are tracked in the database so any process can report on them.
+    app.config['WORKER_PROCESSES'] = int(os.environ.get('WEB_CONCURRENCY', 1))
+
+    # Path of the local ChromeDriver used by the Selenium backend
+    app.config['CHROME_DRIVER_PATH'] = os.path.join(os.getcwd(), 'drivers', 'chromedriver.exe')
+
+    # Warm browser pool settings (see driver_pool.py)
+    app.config['DRIVER_POOL_MIN_SIZE'] = 1
+    app.config['DRIVER_POOL_MAX_SIZE'] = 4
+    app.config['DRIVER_POOL_MAX_USES'] = 50
+    app.config['DRIVER_POOL_CHECKOUT_TIMEOUT'] = 30
+
+    # How often (in seconds) the cached "Case Type" list is re-scraped
+    app.config['CASE_TYPES_REFRESH_INTERVAL'] = 24 * 3600
+    # ...and how long to wait before retrying after a failed or empty refresh
+    app.config['CASE_TYPES_RETRY_INTERVAL'] = 300
+
+    # How long (in seconds) a cached case lookup is served before re-scraping
+    app.config['RESULT_CACHE_MAX_AGE'] = 6 * 3600
+
+    # On-disk cache for order PDFs: location, size limit (bytes) and how long a
+    # stored PDF is trusted before it is revalidated with the court website
+    app.config['PDF_STORE_DIR'] = os.path.join(app.instance_path, 'pdf_cache')
+    app.config['PDF_STORE_MAX_BYTES'] = 500 * 1024 * 1024
+    app.config['PDF_STORE_REVALIDATE_AFTER'] = 24 * 3600
+
+    # Gemini model used for order summaries (summaries are cached per model).
+    # Set the SUMMARY_MODEL environment variable to 'stub' to test without Gemini.
+    app.config['SUMMARY_MODEL'] = os.environ.get('SUMMARY_MODEL', 'gemini-1.5-flash')
+
+    # The Google Gemini API key (the client is configured with it on first use)
+    app.config['GEMINI_API_KEY'] = os.environ.get('GEMINI_API_KEY', 'PASTE_YOUR_GEMINI_API_KEY')  # IMPORTANT
+
+    # Limits on how much of an order PDF is read, when extraction is split across
+    # worker processes, and the size of each part of a long document summarized
+    # separately before the parts are combined
+    app.config['PDF_MAX_PAGES'] = 300
+    app.config['PDF_MAX_CHARS'] = 500000
+    app.config['PDF_EXTRACT_WORKERS'] = 2
+    app.config['PDF_PARALLEL_MIN_PAGES'] = 60
+    app.config['SUMMARY_CHUNK_CHARS'] = 30000
+
+    # Background prefetching: when a search finishes, download and summarize its
+    # newest PREFETCH_ORDERS orders ahead of the user's click. Off by default as
+    # it calls the model for orders nobody may ask about.
+    app.config['PREFETCH_ENABLED'] = False
+    app.config['PREFETCH_ORDERS'] = 1
+    app.config['PREFETCH_WORKERS'] = 1
+    app.config['PREFETCH_QUEUE_SIZE'] = 20
+
+    # Maximum seconds each scrape step may wait for the court website to be ready
+    app.config['SCRAPE_STEP_TIMEOUTS'] = {'page_load': 30, 'captcha': 10, 'results': 15, 'orders': 10}
+
+    # Scraper backends to try, in order: the lightweight HTTP engine first, with
+    # the Selenium browser flow as a fallback (see scrapers.py)
+    app.config['SCRAPER_BACKENDS'] = ['http', 'selenium']
+
+    # Number of searches scraped concurrently in the background, and how long
+    # (in seconds) finished search jobs are kept for their results page
+    app.config['JOB_WORKERS'] = 4
+    app.config['JOB_RETENTION'] = 3600
+
+    # Limits on requests to the court website, shared by every scrape and PDF
+    # download (see governor.py): requests per second and burst size, requests
+    # at once, failures in a row that open the circuit breaker, seconds it stays
+    # open, and how long a request may wait for its turn
+    app.config['COURT_RATE'] = 3.0
+    app.config['COURT_BURST'] = 6
+    app.config['COURT_MAX_IN_FLIGHT'] = 4
+    app.config['COURT_FAILURE_THRESHOLD'] = 5
+    app.config['COURT_RESET_TIMEOUT'] = 30
+    app.config['COURT_ACQUIRE_TIMEOUT'] = 30
+
+    # The court's case status page, used for both the CAPTCHA and the search.
+    # Can be pointed at a local stand-in server for testing.
+    app.config['CASE_STATUS_URL'] = os.environ.get('CASE_STATUS_URL', "https://delhihighcourt.nic.in/app/get-case-type-status")
+
+    # Requests slower than this many seconds are logged with their full span
+    # breakdown (see tracing.py) to the console and to TRACE_SLOW_LOG
+    app.config['TRACE_SLOW_REQUEST_SECONDS'] = 2.0
+    app.config['TRACE_SLOW_LOG'] = os.path.join(app.instance_path, 'slow_requests.log')
+
+    # Searches are logged to the query_log table in batches of up to
+    # QUERY_LOG_BATCH_SIZE rows, at most QUERY_LOG_FLUSH_INTERVAL seconds after
+    # they happen; beyond QUERY_LOG_MAX_QUEUE unwritten rows new ones are dropped
+    app.config['QUERY_LOG_BATCH_SIZE'] = 200
+    app.config['QUERY_LOG_FLUSH_INTERVAL'] = 1.0
+    app.config['QUERY_LOG_MAX_QUEUE'] = 10000
+
+    # The /analytics dashboard: hours of history shown and length of the top
+    # cases list
+    app.config['ANALYTICS_HOURS'] = 24
+    app.config['ANALYTICS_TOP_CASES'] = 10
+
+    # Settings of the flow itself (e.g. CAPTCHA sessions, bulk, watchlist)
+    flow_class.configure(app)
+
+
+# ==============================================================================
+#  2. APP FACTORY
+# ==============================================================================
+
+# Builds the app for the named CAPTCHA flow ('user' or 'auto'). `config`
+# overrides any of the settings above. With start=False nothing runs in the
+# background until start_app() is called (e.g. for command-line tools).
+def create_app(flow='auto', config=None, start=True):
+    if flow not in FLOWS:
+        raise ValueError(f"Unknown CAPTCHA flow {flow!r}; choose one of {', '.join(FLOWS)}")
+    flow_class = FLOWS[flow]
+
+    app = Flask(__name__)
+    configure(app, flow_class)
+    if config:
+        app.config.update(config)
+
+    # Bind the shared database models (see models.py) to this app
+    db.init_app(app)
+
+    # Time every request, scrape step, query and model call (served at /metrics)
+    tracer.configure(slow_threshold=app.config['TRACE_SLOW_REQUEST_SECONDS'],
+                     slow_log_path=app.config['TRACE_SLOW_LOG'])
+    tracer.init_app(app)
+    tracer.instrument_sqlalchemy()
+
+    services = CourtServices(app)
+    captcha_flow = flow_class(app, services)
+    app.extensions['court_services'] = services
+    app.extensions['captcha_flow'] = captcha_flow
+
+    captcha_flow.register_routes(app)
+    register_routes(app, services, captcha_flow)
+
+    if start:
+        start_app(app)
+    return app
+
+
+# Creates the flow's database tables without building an app around them
+# (run once by gunicorn.conf.py before the worker processes start)
+def prepare_database(flow='auto'):
+    app = Flask(__name__)
+    configure(app, FLOWS[flow])
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+
+
+# Creates the database tables and starts the app's background work
+def start_app(app):
+    app.extensions['court_services'].start()
+    app.extensions['captcha_flow'].start()
+
+
+# ==============================================================================
+#  3. SHARED ROUTES
+# ==============================================================================
+
+def register_routes(app, services, captcha_flow):
+    search_jobs = services.search_jobs
+    pdf_store = services.pdf_store
+    summarizer = services.summarizer
+    prefetcher = services.prefetcher
+
+    # ------------------------------------------------------------------------------
+    # ROUTE: /jobs/<job_id> (Results page for a background search)
+    # ------------------------------------------------------------------------------
+    # While the search job is still running this renders a progress view that
+    # polls /jobs/<job_id>/status; once it has finished it renders the results
+    # (or the error) exactly like a direct search used to.
+    # ------------------------------------------------------------------------------
+    @app.route('/jobs/<job_id>')
+    def job_page(job_id):
+        job = search_jobs.get(job_id)
+        if job is None:
+            return render_template('error.html',
+                                   error_title="Search Not Found",
+                                   error_message="This search has expired or does not exist. Please go back and start a new search."), 404
+        if job.status == 'failed':
+            return render_template('error.html',
+                                   error_title="An Application Error Occurred",
+                                   error_message=f"Could not process the request. Error: {job.error}")
+        if not job.finished:
+            return render_template('results.html', job=job)
+        if job.result is None:
+            return render_template('error.html',
+                                   error_title="Search Failed",
+                                   error_message="Your search was submitted successfully, but no records were found for the given case details.")
+        cached_at = job.result.get('cached_at')
+        return render_template('results.html', case_data=job.result['case_data'], order_links=job.result['order_links'],
+                               cached_at=datetime.datetime.fromisoformat(cached_at) if cached_at else None,
+                               stale=job.result.get('stale'))
+
+    # ------------------------------------------------------------------------------
+    # ROUTE: /jobs/<job_id>/status (Polled by the results page)
+    # ------------------------------------------------------------------------------
+    # Returns the job's status and progress as JSON, plus the final case_data and
+    # order_links once it has finished.
+    # ------------------------------------------------------------------------------
+    @app.route('/jobs/<job_id>/status')
+    def job_status(job_id):
+        job = search_jobs.get(job_id)
+        if job is None:
+            return jsonify({'error': 'Unknown or expired job'}), 404
+        return jsonify(job.to_dict())
+
+    # ------------------------------------------------------------------------------
+    # ROUTE: /summarize (Handles AI summary generation)
+    # ------------------------------------------------------------------------------
+    # Called by JavaScript from the results page. It fetches a PDF through the
+    # PDF store, extracts its text, and sends it to the Gemini API for
+    # summarization (see summaries.py for the summary cache).
+    # ------------------------------------------------------------------------------
+    @app.route('/summarize', methods=['POST'])
+    def summarize():
+        pdf_url = request.form.get('pdf_url')
+        if not pdf_url:
+            return "Error: No PDF URL provided.", 400
+
+        try:
+            # Get the PDF from the on-disk store (downloaded only when needed)
+            document = pdf_store.fetch(pdf_url)
+
+            # Extract its text and summarize it with Gemini, unless a summary of
+            # the same document is already stored or being generated
+            with prefetcher.interactive():
+                return summarizer.summarize(document)
+
+        except EmptyDocumentError as e:
+            return str(e), 500
+        except requests.exceptions.RequestException as e:
+            return f"Error downloading PDF: {e}", 500
+        except Exception as e:
+            print(f"An error occurred during summarization: {e}")
+            return f"An unknown error occurred: {e}", 500
+
+    # ------------------------------------------------------------------------------
+    # ROUTE: /summarize/stream (Streams the AI summary as server-sent events)
+    # ------------------------------------------------------------------------------
+    # Used by the results page through EventSource. Emits 'status' events while
+    # the PDF is downloaded and its text extracted, 'token' events with pieces of
+    # the summary as the model produces them, then 'done' (or 'failed').
+    # ------------------------------------------------------------------------------
+    @app.route('/summarize/stream')
+    def summarize_stream():
+        pdf_url = request.args.get('pdf_url')
+        if not pdf_url:
+            return "Error: No PDF URL provided.", 400
+
+        def events():
+            try:
+                yield sse_event('status', "Downloading PDF from court server...")
+                document = pdf_store.fetch(pdf_url)
+                with prefetcher.interactive():
+                    for kind, text in summarizer.stream(document):
+                        yield sse_event(kind, text)
+                yield sse_event('done', "")
+            except requests.exceptions.RequestException as e:
+                yield sse_event('failed', f"Error downloading PDF: {e}")
+            except EmptyDocumentError as e:
+                yield sse_event('failed', str(e))
+            except Exception as e:
+                print(f"An error occurred during summarization: {e}")
+                yield sse_event('failed', f"An unknown error occurred: {e}")
+
+        # Disable caching and proxy buffering so each event is delivered at once
+        return Response(stream_with_context(events()), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+    # ------------------------------------------------------------------------------
+    # ROUTE: /stats (Operational metrics)
+    # ------------------------------------------------------------------------------
+    # Returns JSON counters for every component (browser pool, caches, jobs,
+    # governor, ...) of this worker process, so slowdowns under load can be
+    # diagnosed.
+    # ------------------------------------------------------------------------------
+    def collect_stats():
+        stats = services.stats()
+        stats.update(captcha_flow.stats())
+        stats['app'] = {'flow': captcha_flow.name, 'pid': os.getpid(),
+                        'worker_processes': app.config['WORKER_PROCESSES']}
+        return stats
+
+    @app.route('/stats')
+    def stats():
+        return jsonify(collect_stats())
+
+    # ------------------------------------------------------------------------------
+    # ROUTE: /analytics (Search analytics dashboard)
+    # ------------------------------------------------------------------------------
+    # Top cases, case type distribution, searches per hour, cache hit rate and
+    # scrape latency, read from the rollup tables (see analytics.py). The same
+    # figures are available as JSON from /analytics/data.
+    # ------------------------------------------------------------------------------
+    @app.route('/analytics')
+    def analytics():
+        return render_template('analytics.html', analytics=query_analytics(hours=app.config['ANALYTICS_HOURS'],
+                                                                           top=app.config['ANALYTICS_TOP_CASES']))
+
+    @app.route('/analytics/data')
+    def analytics_data():
+        return jsonify(query_analytics(hours=request.args.get('hours', app.config['ANALYTICS_HOURS'], type=int),
+                                       top=request.args.get('top', app.config['ANALYTICS_TOP_CASES'], type=int)))
+
+    # ------------------------------------------------------------------------------
+    # ROUTE: /metrics (Prometheus scrape target)
+    # ------------------------------------------------------------------------------
+    # Latency histograms per endpoint, per background job and per traced stage
+    # (browser, scrape steps, parsing, database, PDF, LLM), plus the numeric
+    # /stats counters as gauges, in the Prometheus text format.
+    # ------------------------------------------------------------------------------
+    @app.route('/metrics')
+    def metrics():
+        return Response(tracer.render_metrics(collect_stats()), mimetype='text/plain; version=0.0.4')
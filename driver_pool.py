@@ -0,0 +1,291 @@
+# ==============================================================================
+#  driver_pool.py - Warm Pool of Reusable Headless Chrome Drivers
+# ==============================================================================
+# Starting Chrome takes several seconds, so instead of launching a fresh
+# browser for every request both apps check a warm driver out of this pool
+# and hand it back when they are done. The pool is bounded, health-checks
+# drivers before handing them out, recycles them after a number of uses and
+# wipes per-user state (cookies, storage, open page) between checkouts.
+# ==============================================================================
+
+import threading
+import time
+from contextlib import contextmanager
+from tracing import tracer
+
+
+# Builds a new headless Chrome instance using the local ChromeDriver binary.
+# Selenium is imported here, when the first browser is started, not when
+# the app starts.
+def make_chrome_driver(chrome_driver_path):
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+    options = webdriver.ChromeOptions()
+    options.add_argument("--headless")
+    service = Service(executable_path=chrome_driver_path)
+    return webdriver.Chrome(service=service, options=options)
+
+
+# Raised when no driver becomes available within the checkout timeout
+class PoolExhausted(Exception):
+    pass
+
+
+# ------------------------------------------------------------------------------
+# Bookkeeping for a single pooled browser
+# ------------------------------------------------------------------------------
+class _PooledDriver:
+    def __init__(self, driver):
+        self.driver = driver
+        self.uses = 0
+        self.created_at = time.monotonic()
+
+
+# ------------------------------------------------------------------------------
+# The pool itself
+# ------------------------------------------------------------------------------
+class DriverPool:
+    def __init__(self, factory, min_size=1, max_size=4, max_uses=50, checkout_timeout=30):
+        self.factory = factory
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_uses = max_uses
+        self.checkout_timeout = checkout_timeout
+
+        # Optional callback run when a checkout finds every browser taken; it
+        # may hand a browser back (e.g. by closing an abandoned session) and
+        # returns True if it did
+        self.on_exhausted = None
+
+        self._idle = []        # drivers ready to be handed out
+        self._in_use = {}      # id(driver) -> _PooledDriver
+        self._creating = 0     # drivers currently being started
+        self._closed = False
+        self._cond = threading.Condition()
+
+        # Counters exposed through stats()
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+        self._created = 0
+        self._recycled = 0
+        self._discarded = 0
+        self._failed_health_checks = 0
+        self._timeouts = 0
+        self._reclaimed = 0
+
+    # Total number of drivers that exist or are being started
+    def _size(self):
+        return len(self._idle) + len(self._in_use) + self._creating
+
+    # Starts Chrome outside the lock; the slot is reserved by the caller
+    def _create(self):
+        try:
+            with tracer.span('browser.start'):
+                pooled = _PooledDriver(self.factory())
+        except Exception:
+            with self._cond:
+                self._creating -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._creating -= 1
+            self._created += 1
+        return pooled
+
+    # Starts drivers until the pool holds at least `min_size` of them
+    def prefill(self):
+        while True:
+            with self._cond:
+                if self._closed or self._size() >= self.min_size:
+                    return
+                self._creating += 1
+            try:
+                pooled = self._create()
+            except Exception as e:
+                print(f"Driver pool could not start a browser during prefill: {e}")
+                return
+            with self._cond:
+                self._idle.append(pooled)
+                self._cond.notify()
+
+    # Starts prefilling in the background so app startup is not delayed
+    def start(self):
+        threading.Thread(target=self.prefill, name="driver-pool-prefill", daemon=True).start()
+
+    # A driver is healthy if its browser still answers a trivial command
+    def _is_healthy(self, pooled):
+        try:
+            pooled.driver.execute_script("return 1;")
+            return True
+        except Exception:
+            return False
+
+    # Wipes everything one user's session could leave behind for the next
+    def _reset(self, pooled):
+        driver = pooled.driver
+        driver.delete_all_cookies()
+        try:
+            driver.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+        except Exception:
+            pass  # storage is not accessible on some pages (e.g. about:blank)
+        driver.get("about:blank")
+
+    def _quit(self, pooled):
+        try:
+            pooled.driver.quit()
+        except Exception as e:
+            print(f"Error while quitting pooled browser: {e}")
+
+    # --------------------------------------------------------------------------
+    # Checkout / return
+    # --------------------------------------------------------------------------
+    def acquire(self, timeout=None):
+        timeout = self.checkout_timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        waited = False
+        reclaim_tried = False
+
+        while True:
+            pooled = None
+            create = False
+            reclaim = False
+            with self._cond:
+                while not self._idle and self._size() >= self.max_size:
+                    # Before waiting, ask once for a parked browser to be given up
+                    if self.on_exhausted is not None and not reclaim_tried:
+                        reclaim = True
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolExhausted(f"No browser available after waiting {timeout}s")
+                    waited = True
+                    self._cond.wait(remaining)
+                if self._idle:
+                    pooled = self._idle.pop()
+                elif not reclaim:
+                    self._creating += 1
+                    create = True
+
+            if reclaim:
+                reclaim_tried = True
+                self._reclaim()
+                continue
+            if create:
+                pooled = self._create()
+            elif not self._is_healthy(pooled):
+                # Drop the dead browser and try again for a replacement
+                with self._cond:
+                    self._failed_health_checks += 1
+                    self._discarded += 1
+                    self._cond.notify()
+                self._quit(pooled)
+                continue
+
+            wait_time = time.monotonic() - started
+            with self._cond:
+                pooled.uses += 1
+                self._in_use[id(pooled.driver)] = pooled
+                self._checkouts += 1
+                if waited:
+                    self._waits += 1
+                self._wait_time_total += wait_time
+                self._wait_time_max = max(self._wait_time_max, wait_time)
+            tracer.record('browser.checkout', wait_time)
+            return pooled.driver
+
+    # Runs the on_exhausted callback outside the lock (its browser comes back
+    # through release())
+    def _reclaim(self):
+        try:
+            reclaimed = self.on_exhausted()
+        except Exception as e:
+            print(f"Driver pool could not reclaim a browser: {e}")
+            return
+        if reclaimed:
+            with self._cond:
+                self._reclaimed += 1
+
+    # Returns a driver to the pool. Pass discard=True when the browser is in
+    # an unknown state (e.g. it raised mid-scrape) and should not be reused.
+    def release(self, driver, discard=False):
+        with self._cond:
+            pooled = self._in_use.pop(id(driver), None)
+        if pooled is None:
+            # Not one of ours; just make sure it does not leak
+            try:
+                driver.quit()
+            except Exception:
+                pass
+            return
+
+        recycle = self._closed or pooled.uses >= self.max_uses
+        if not discard and not recycle:
+            try:
+                self._reset(pooled)
+            except Exception as e:
+                print(f"Could not reset pooled browser, discarding it: {e}")
+                discard = True
+
+        if discard or recycle:
+            self._quit(pooled)
+            with self._cond:
+                if recycle and not discard:
+                    self._recycled += 1
+                else:
+                    self._discarded += 1
+                self._cond.notify()
+            # Keep the warm floor topped up without blocking the caller
+            if not self._closed:
+                self.start()
+            return
+
+        with self._cond:
+            self._idle.append(pooled)
+            self._cond.notify()
+
+    @contextmanager
+    def driver(self, timeout=None):
+        driver = self.acquire(timeout)
+        try:
+            yield driver
+        except Exception:
+            self.release(driver, discard=True)
+            raise
+        else:
+            self.release(driver)
+
+    # Quits every idle browser; in-use ones are quit as they are returned
+    def shutdown(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._closed = True
+        for pooled in idle:
+            self._quit(pooled)
+
+    # --------------------------------------------------------------------------
+    # Metrics
+    # --------------------------------------------------------------------------
+    def stats(self):
+        with self._cond:
+            return {
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'idle': len(self._idle),
+                'in_use': len(self._in_use),
+                'starting': self._creating,
+                'checkouts': self._checkouts,
+                'checkouts_that_waited': self._waits,
+                'wait_time_total_s': round(self._wait_time_total, 3),
+                'wait_time_avg_s': round(self._wait_time_total / self._checkouts, 3) if self._checkouts else 0.0,
+                'wait_time_max_s': round(self._wait_time_max, 3),
+                'checkout_timeouts': self._timeouts,
+                'reclaimed': self._reclaimed,
+                'created': self._created,
+                'recycled': self._recycled,
+                'discarded': self._discarded,
+                'failed_health_checks': self._failed_health_checks,
+            }
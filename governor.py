@@ -0,0 +1,229 @@
+# ==============================================================================
+#  governor.py - Shared Limits on Outbound Requests to the Court Website
+# ==============================================================================
+# Every request to the court website (page loads and form submissions by
+# either scraper backend, and order PDF downloads) runs inside
+# `with governor.request():`, which applies, across all threads of the app:
+#
+#   * a token bucket: at most `rate` requests per second, bursts of `burst`;
+#   * at most `max_in_flight` requests at the same time;
+#   * adaptive backoff: each site failure (timeout, connection error, HTTP
+#     5xx or 429) halves the request rate, each success restores a tenth of
+#     it, and a Retry-After header pauses all requests for that long;
+#   * a circuit breaker: after `failure_threshold` failures in a row the
+#     circuit opens and requests fail at once with CircuitOpenError for
+#     `reset_timeout` seconds, instead of each one waiting out its full
+#     timeout. Then a single trial request is let through; its success
+#     closes the circuit, its failure opens it again.
+#
+# A caller waiting longer than `acquire_timeout` for its turn gets SiteBusy.
+# Callers catch CircuitOpenError to fall back to cached data (see the apps'
+# search routes and pdf_store.py).
+# ==============================================================================
+
+import sys
+import threading
+import time
+from contextlib import contextmanager
+import requests
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# Lowest fraction of the configured rate that backoff may reduce it to
+MIN_RATE_FACTOR = 0.1
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f"The court website is not responding; requests are paused for "
+                         f"{max(1, round(retry_after))} more seconds. Please try again later.")
+        self.retry_after = retry_after
+
+
+class SiteBusy(Exception):
+    pass
+
+
+# True for errors that suggest the court website is down or overloaded, as
+# opposed to e.g. a missing page or an unexpected page layout
+def is_site_failure(error):
+    response = getattr(error, 'response', None)
+    if response is not None:
+        return response.status_code >= 500 or response.status_code == 429
+    return isinstance(error, (requests.RequestException, TimeoutError, ConnectionError)) or _is_selenium_timeout(error)
+
+
+# Selenium is only imported once the browser backend is used; before that no
+# error can be one of its timeouts
+def _is_selenium_timeout(error):
+    exceptions = sys.modules.get('selenium.common.exceptions')
+    return exceptions is not None and isinstance(error, exceptions.TimeoutException)
+
+
+def _retry_after(error):
+    response = getattr(error, 'response', None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
+
+
+class Governor:
+    def __init__(self, rate=3.0, burst=6, max_in_flight=4, failure_threshold=5, reset_timeout=30,
+                 acquire_timeout=30):
+        self.rate = rate
+        self.burst = burst
+        self.max_in_flight = max_in_flight
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.acquire_timeout = acquire_timeout
+
+        self._cond = threading.Condition()
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._rate_factor = 1.0
+        self._paused_until = 0.0
+        self._in_flight = 0
+
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._consecutive_failures = 0
+
+        self._requests = 0
+        self._failures = 0
+        self._rejected = 0
+        self._busy = 0
+        self._times_opened = 0
+        self._wait_time_total = 0.0
+
+    # --------------------------------------------------------------------------
+    # Circuit breaker (lock held)
+    # --------------------------------------------------------------------------
+
+    def _retry_in(self, now):
+        return max(0.0, self._opened_at + self.reset_timeout - now)
+
+    # Raises CircuitOpenError unless a request may go ahead. Returns True if
+    # this request is the half-open trial.
+    def _check_circuit(self, now):
+        if self._state == OPEN:
+            if self._retry_in(now) > 0:
+                self._rejected += 1
+                raise CircuitOpenError(self._retry_in(now))
+            self._state = HALF_OPEN
+        if self._state == HALF_OPEN:
+            if self._trial_running:
+                self._rejected += 1
+                raise CircuitOpenError(1)
+            self._trial_running = True
+            return True
+        return False
+
+    def _open(self, now):
+        if self._state != OPEN:
+            self._times_opened += 1
+            print(f"Court website circuit opened after {self._consecutive_failures} failures in a row; "
+                  f"pausing requests for {self.reset_timeout}s.")
+        self._state = OPEN
+        self._opened_at = now
+
+    # --------------------------------------------------------------------------
+    # Admission: token bucket and in-flight limit
+    # --------------------------------------------------------------------------
+
+    def _admit(self):
+        started = time.monotonic()
+        deadline = started + self.acquire_timeout
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                trial = self._check_circuit(now)
+                rate = self.rate * self._rate_factor
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * rate)
+                self._updated = now
+
+                if now >= self._paused_until and self._tokens >= 1 and self._in_flight < self.max_in_flight:
+                    self._tokens -= 1
+                    self._in_flight += 1
+                    self._requests += 1
+                    self._wait_time_total += now - started
+                    return trial
+
+                if trial:
+                    self._trial_running = False
+                if now >= deadline:
+                    self._busy += 1
+                    raise SiteBusy(f"No request slot for the court website after waiting {self.acquire_timeout}s")
+                wait = max(self._paused_until - now, (1 - self._tokens) / rate if self._tokens < 1 else 0.0, 0.01)
+                self._cond.wait(min(wait, deadline - now))
+
+    # --------------------------------------------------------------------------
+    # Outcome: adaptive backoff
+    # --------------------------------------------------------------------------
+
+    def _finish(self, trial, error):
+        now = time.monotonic()
+        with self._cond:
+            self._in_flight -= 1
+            if trial:
+                self._trial_running = False
+            if error is not None and is_site_failure(error):
+                self._failures += 1
+                self._consecutive_failures += 1
+                self._rate_factor = max(MIN_RATE_FACTOR, self._rate_factor / 2)
+                retry_after = _retry_after(error)
+                if retry_after:
+                    self._paused_until = max(self._paused_until, now + retry_after)
+                if trial or self._consecutive_failures >= self.failure_threshold:
+                    self._open(now)
+            else:
+                self._consecutive_failures = 0
+                self._rate_factor = min(1.0, self._rate_factor + 0.1)
+                if self._state != CLOSED:
+                    print("Court website circuit closed; requests resumed.")
+                    self._state = CLOSED
+            self._cond.notify_all()
+
+    # Runs the block as one request to the court website
+    @contextmanager
+    def request(self):
+        trial = self._admit()
+        try:
+            yield
+        except Exception as e:
+            self._finish(trial, e)
+            raise
+        except BaseException:
+            self._finish(trial, None)
+            raise
+        self._finish(trial, None)
+
+    # True while requests are being refused without trying the site
+    def is_open(self):
+        with self._cond:
+            return self._state == OPEN and self._retry_in(time.monotonic()) > 0
+
+    def stats(self):
+        with self._cond:
+            now = time.monotonic()
+            return {
+                'state': self._state,
+                'circuit_open': self._state == OPEN,
+                'retry_in_s': round(self._retry_in(now), 1) if self._state == OPEN else 0.0,
+                'rate': self.rate,
+                'effective_rate': round(self.rate * self._rate_factor, 2),
+                'in_flight': self._in_flight,
+                'max_in_flight': self.max_in_flight,
+                'requests': self._requests,
+                'failures': self._failures,
+                'consecutive_failures': self._consecutive_failures,
+                'rejected_while_open': self._rejected,
+                'busy_timeouts': self._busy,
+                'times_opened': self._times_opened,
+                'avg_wait_ms': round(self._wait_time_total / self._requests * 1000, 1) if self._requests else 0.0,
+            }
@@ -0,0 +1,47 @@
+# ==============================================================================
+#  gunicorn.conf.py - Production Server Settings
+# ==============================================================================
+# Usage (from the repository root):
+#
+#   gunicorn -c gunicorn.conf.py wsgi:app
+#
+# Environment variables: CAPTCHA_FLOW ('auto' or 'user'), BIND (default
+# 127.0.0.1:8000), WEB_CONCURRENCY (worker processes, default 2) and
+# GUNICORN_THREADS (threads per process, default 8).
+#
+# Requests mostly wait on the court website, the database or the model, so
+# each process serves many requests at once on threads. Every worker builds
+# its own app after the fork (preload_app is off): background threads,
+# SQLite connections and the PDF extraction pool must not be shared across
+# a fork. Search jobs are tracked in the database so their status can be
+# polled from any worker, and the COURT_* limits are split between them.
+# ==============================================================================
+
+import os
+
+flow = os.environ.get('CAPTCHA_FLOW', 'auto')
+
+bind = os.environ.get('BIND', '127.0.0.1:8000')
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+
+# The user-assisted flow keeps each visitor's CAPTCHA session (a live
+# connection or browser) in the memory of the process that showed the
+# CAPTCHA, so the search must reach that same process: run a single one
+workers = 1 if flow == 'user' else int(os.environ.get('WEB_CONCURRENCY', 2))
+
+# Tells each worker's app how many processes share the court limits
+os.environ['WEB_CONCURRENCY'] = str(workers)
+
+preload_app = False
+
+# /bulk streams its results for as long as the batch runs
+timeout = 120
+graceful_timeout = 30
+
+
+# Creates the database tables once, before the workers start, so they don't
+# race to create them
+def on_starting(server):
+    from court_app import prepare_database
+    prepare_database(flow)
@@ -0,0 +1,34 @@
+# ==============================================================================
+#  http_client.py - Pooled HTTP Sessions for Talking to the Court Website
+# ==============================================================================
+# All outbound HTTP traffic goes through one shared connection pool so that
+# repeated lookups reuse TCP/TLS connections instead of opening new ones.
+# Scrape sessions that need their own cookies get a fresh requests.Session
+# mounted on the same pooled adapter.
+# ==============================================================================
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+              "(KHTML, like Gecko) Chrome/126.0 Safari/537.36")
+
+# Retry idempotent requests on connection errors and gateway hiccups
+_retries = Retry(total=2, backoff_factor=0.3, status_forcelist=(502, 503, 504),
+                 allowed_methods=frozenset(['GET', 'HEAD']))
+_adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32, max_retries=_retries)
+
+
+# Returns a new session with its own cookie jar that shares the connection
+# pool. Don't call .close() on it: that would close the shared adapter.
+def new_session():
+    http = requests.Session()
+    http.mount('https://', _adapter)
+    http.mount('http://', _adapter)
+    http.headers['User-Agent'] = USER_AGENT
+    return http
+
+
+# A cookie-less session for plain downloads (e.g. order PDFs)
+shared_session = new_session()
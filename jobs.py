@@ -0,0 +1,182 @@
+# ==============================================================================
+#  jobs.py - Background Job Queue for Case Searches
+# ==============================================================================
+# A scrape can keep a request busy for 15+ seconds, which used to tie up a
+# Flask worker for the whole time. /search now enqueues a job and returns at
+# once; a bounded pool of worker threads runs the scrapes, and the results
+# page polls the job's status until it has finished. Finished jobs are kept
+# for `retention` seconds so the results page can be reloaded.
+#
+# With `shared=True` (several worker processes behind one WSGI server) each
+# change of a job's state is also written to the search_job table, and jobs
+# not known to this process are read from there, so the status poll may land
+# on any worker. Job results must then be JSON-serializable.
+# ==============================================================================
+
+import json
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from models import db, SearchJob
+from tracing import tracer
+
+
+class Job:
+    def __init__(self, kind, on_change=None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = 'queued'      # queued -> running -> done | failed
+        self.progress = 'Waiting for a free worker...'
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._on_change = on_change
+
+    # Called by the running task to report what it is doing right now
+    def set_progress(self, message):
+        self.progress = message
+        if self._on_change is not None:
+            self._on_change(self)
+
+    @property
+    def finished(self):
+        return self.status in ('done', 'failed')
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'progress': self.progress,
+            'result': self.result,
+            'error': self.error,
+            'queued_s': round((self.started_at or time.time()) - self.created_at, 3),
+            'run_s': round((self.finished_at or time.time()) - self.started_at, 3) if self.started_at else None,
+        }
+
+
+class JobQueue:
+    def __init__(self, app, workers=4, retention=3600, shared=False):
+        self.app = app
+        self.retention = retention
+        self.shared = shared
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job-worker')
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._table_pruned_at = 0       # when old rows were last deleted from search_job
+        self.workers = workers
+
+    # Runs `task(job, *args)` in a worker thread inside an app context; its
+    # return value becomes job.result
+    def submit(self, kind, task, *args):
+        job = Job(kind, on_change=self._save if self.shared else None)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        if self.shared:
+            self._prune_table()
+            self._save(job)
+        self._executor.submit(self._run, job, task, args)
+        return job
+
+    def _run(self, job, task, args):
+        job.status = 'running'
+        job.started_at = time.time()
+        job.set_progress('Starting...')
+        try:
+            with self.app.app_context(), tracer.trace('job.' + job.kind, {'job_id': job.id}):
+                job.result = task(job, *args)
+            job.status = 'done'
+            job.set_progress('Finished')
+        except Exception as e:
+            print(f"Job {job.id} ({job.kind}) failed: {e}")
+            traceback.print_exc()
+            job.error = str(e)
+            job.status = 'failed'
+            job.set_progress('Failed')
+        finally:
+            job.finished_at = time.time()
+            if self.shared:
+                self._save(job)
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None and self.shared:
+            job = self._load(job_id)
+        return job
+
+    # Forgets finished jobs older than the retention period (lock held)
+    def _prune(self):
+        cutoff = time.time() - self.retention
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.finished and job.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+    # Deletes saved jobs older than the retention period from the search_job
+    # table. Runs outside the lock, at most once a minute per process.
+    def _prune_table(self):
+        now = time.time()
+        with self._lock:
+            if now - self._table_pruned_at < 60:
+                return
+            self._table_pruned_at = now
+        try:
+            with self.app.app_context(), db.engine.begin() as connection:
+                connection.execute(db.delete(SearchJob).where(SearchJob.finished_at < now - self.retention))
+        except Exception as e:
+            print(f"Could not prune the search_job table: {e}")
+
+    # --------------------------------------------------------------------------
+    # Shared job state (search_job table)
+    # --------------------------------------------------------------------------
+
+    # Writes the job's current state on its own connection, so it never
+    # commits work the task has pending in its session
+    def _save(self, job):
+        row = {'id': job.id, 'kind': job.kind, 'status': job.status, 'progress': job.progress,
+               'result_json': json.dumps(job.result) if job.result is not None else None,
+               'error': job.error, 'created_at': job.created_at, 'started_at': job.started_at,
+               'finished_at': job.finished_at if job.finished else None}
+        stmt = sqlite_insert(SearchJob).values(row)
+        try:
+            with self.app.app_context(), db.engine.begin() as connection:
+                connection.execute(stmt.on_conflict_do_update(
+                    index_elements=['id'], set_={key: stmt.excluded[key] for key in row if key != 'id'}))
+        except Exception as e:
+            print(f"Could not save the state of job {job.id}: {e}")
+
+    # Rebuilds a job started by another worker process from its saved state
+    def _load(self, job_id):
+        with self.app.app_context(), db.engine.connect() as connection:
+            row = connection.execute(db.select(SearchJob.__table__).where(SearchJob.id == job_id)).mappings().first()
+        if row is None:
+            return None
+        job = Job(row['kind'])
+        job.id = row['id']
+        job.status = row['status']
+        job.progress = row['progress']
+        job.result = json.loads(row['result_json']) if row['result_json'] else None
+        job.error = row['error']
+        job.created_at = row['created_at']
+        job.started_at = row['started_at']
+        job.finished_at = row['finished_at']
+        return job
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return {
+            'workers': self.workers,
+            'queued': sum(1 for job in jobs if job.status == 'queued'),
+            'running': sum(1 for job in jobs if job.status == 'running'),
+            'done': sum(1 for job in jobs if job.status == 'done'),
+            'failed': sum(1 for job in jobs if job.status == 'failed'),
+        }
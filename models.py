@@ -0,0 +1,150 @@
+# ==============================================================================
+#  models.py - Database Models Shared by Both Apps
+# ==============================================================================
+# create_app() binds this `db` object to the flow's own SQLite file with
+# db.init_app(app), so the user-assisted and automated versions keep separate
+# databases while sharing one set of table definitions.
+# ==============================================================================
+
+import sqlite3
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+db = SQLAlchemy()
+
+# SQLite settings for every new connection: WAL lets reads continue while a
+# write commits, synchronous=NORMAL is safe under WAL and makes each commit
+# much cheaper, and busy_timeout makes a writer wait for the lock instead of
+# failing at once with "database is locked"
+@event.listens_for(Engine, 'connect')
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+# Defines the structure for the 'query_log' table in the database.
+# Each search performed by a user will be stored as a record here (written
+# in batches by query_log_writer.py).
+class QueryLog(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    case_type = db.Column(db.String(50), nullable=False)
+    case_number = db.Column(db.String(50), nullable=False)
+    case_year = db.Column(db.String(10), nullable=False)
+    timestamp = db.Column(db.DateTime, server_default=db.func.now())
+
+    __table_args__ = (db.Index('ix_query_log_case', 'case_type', 'case_number', 'case_year'),
+                      db.Index('ix_query_log_timestamp', 'timestamp'))
+
+# Pre-aggregated search statistics for the /analytics dashboard. They are
+# updated in the same transaction as each query_log batch (see
+# query_log_writer.py), so the dashboard never has to scan query_log.
+
+# Searches per case (the "top cases" list)
+class QueryCaseRollup(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    case_type = db.Column(db.String(50), nullable=False)
+    case_number = db.Column(db.String(50), nullable=False)
+    case_year = db.Column(db.String(10), nullable=False)
+    searches = db.Column(db.Integer, nullable=False, default=0, index=True)
+    last_searched_at = db.Column(db.DateTime)
+
+    __table_args__ = (db.UniqueConstraint('case_type', 'case_number', 'case_year', name='uq_query_case_rollup_key'),)
+
+# Searches per case type
+class QueryTypeRollup(db.Model):
+    case_type = db.Column(db.String(50), primary_key=True)
+    searches = db.Column(db.Integer, nullable=False, default=0)
+
+# Searches, result cache hits and scrape timings per hour
+class QueryHourRollup(db.Model):
+    hour = db.Column(db.String(13), primary_key=True)   # 'YYYY-MM-DD HH' (UTC)
+    searches = db.Column(db.Integer, nullable=False, default=0)
+    cache_hits = db.Column(db.Integer, nullable=False, default=0)
+    scrapes = db.Column(db.Integer, nullable=False, default=0)
+    scrape_failures = db.Column(db.Integer, nullable=False, default=0)
+    scrape_seconds_total = db.Column(db.Float, nullable=False, default=0.0)
+    scrape_seconds_max = db.Column(db.Float, nullable=False, default=0.0)
+
+# Stores the last scraped list of "Case Type" dropdown options so the
+# homepage does not need a browser to render it.
+class CaseTypeCache(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    options_json = db.Column(db.Text, nullable=False)
+    refreshed_at = db.Column(db.DateTime, nullable=False)
+
+# Stores the scraped results of a case lookup so repeat searches for the same
+# (case_type, case_number, case_year) can be answered without a browser.
+class CaseResult(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    case_type = db.Column(db.String(50), nullable=False)
+    case_number = db.Column(db.String(50), nullable=False)
+    case_year = db.Column(db.String(10), nullable=False)
+    case_data_json = db.Column(db.Text, nullable=False)
+    order_links_json = db.Column(db.Text, nullable=False)
+    fetched_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (db.UniqueConstraint('case_type', 'case_number', 'case_year', name='uq_case_result_key'),)
+
+# Stores the text extracted from an order PDF and its AI summary, keyed by
+# the PDF's content hash plus the prompt version and model that produced it,
+# so each document is summarized once per prompt/model combination.
+class SummaryCache(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    content_sha256 = db.Column(db.String(64), nullable=False, index=True)
+    prompt_version = db.Column(db.String(20), nullable=False)
+    model_name = db.Column(db.String(50), nullable=False)
+    extracted_text = db.Column(db.Text, nullable=False)
+    summary = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (db.UniqueConstraint('content_sha256', 'prompt_version', 'model_name', name='uq_summary_cache_key'),)
+
+# A case on the watchlist, re-checked for new orders every `interval_s`
+# seconds. `next_check_at` is when the scheduler should look at it next.
+class WatchedCase(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    case_type = db.Column(db.String(50), nullable=False)
+    case_number = db.Column(db.String(50), nullable=False)
+    case_year = db.Column(db.String(10), nullable=False)
+    interval_s = db.Column(db.Integer, nullable=False)
+    next_check_at = db.Column(db.DateTime, nullable=False, index=True)
+    last_checked_at = db.Column(db.DateTime)
+    last_changed_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False)
+    orders = db.relationship('WatchedOrder', backref='case', cascade='all, delete-orphan', lazy='dynamic')
+
+    __table_args__ = (db.UniqueConstraint('case_type', 'case_number', 'case_year', name='uq_watched_case_key'),)
+
+# An order seen on a watched case. Orders that appear after the case was
+# added are downloaded into the PDF store (`pdf_sha256` is set).
+class WatchedOrder(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    watched_case_id = db.Column(db.Integer, db.ForeignKey('watched_case.id'), nullable=False)
+    url = db.Column(db.String(500), nullable=False)
+    text = db.Column(db.String(200))
+    date = db.Column(db.String(50))
+    first_seen_at = db.Column(db.DateTime, nullable=False)
+    pdf_sha256 = db.Column(db.String(64))
+
+    __table_args__ = (db.UniqueConstraint('watched_case_id', 'url', name='uq_watched_order_key'),)
+
+# The state of a background search job (see jobs.py), so that whichever
+# worker process serves /jobs/<id> can report on a job started by another.
+# Times are Unix timestamps; the result is stored as JSON.
+class SearchJob(db.Model):
+    id = db.Column(db.String(32), primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)
+    status = db.Column(db.String(10), nullable=False)
+    progress = db.Column(db.String(200))
+    result_json = db.Column(db.Text)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.Float, nullable=False)
+    started_at = db.Column(db.Float)
+    finished_at = db.Column(db.Float, index=True)
@@ -0,0 +1,231 @@
+# ==============================================================================
+#  parsers.py - HTML Parsing of the Court Website's Pages (shared by both apps)
+# ==============================================================================
+# Every search used to build a full BeautifulSoup tree with 'html.parser' of
+# the case status page, the results page and the orders page, only to read
+# one form or table from each. The parsers here produce the same results much
+# faster:
+#
+#   * 'lxml'  - lxml's C HTML parser with XPath lookups (used when lxml is
+#               installed).
+#   * 'soup'  - BeautifulSoup restricted with a SoupStrainer, so only the
+#               tables (or <select>, or form) we need are turned into objects.
+#
+# The backend is picked at import time; set the HTML_PARSER environment
+# variable to 'soup' or 'lxml' to force one. See benchmarks/bench_parsers.py
+# for timings against saved pages.
+# ==============================================================================
+
+import os
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
+
+NO_RECORDS_TEXT = "No data available in table"
+
+BACKENDS = ('lxml', 'soup') if lxml is not None else ('soup',)
+backend = os.environ.get('HTML_PARSER') or BACKENDS[0]
+
+
+# ------------------------------------------------------------------------------
+# Results page
+# ------------------------------------------------------------------------------
+
+# Parses the main case details from the results page. Returns the case_data
+# dict, or None when the court reported that no records were found.
+def parse_case_results(page_source):
+    if NO_RECORDS_TEXT in page_source:
+        return None
+    if backend == 'lxml':
+        return _lxml_case_results(page_source)
+    return _soup_case_results(page_source)
+
+
+def _case_data(second_cell_text, parties_text, order_page_url):
+    return {
+        'diary_no': second_cell_text.strip().split('\n')[0],
+        'parties': parties_text.strip(),
+        'order_page_link': order_page_url
+    }
+
+
+def _lxml_case_results(page_source):
+    root = lxml.html.fromstring(page_source)
+    first_row_cells = root.xpath('(//table[@id="caseTable"]//tbody)[1]//tr[1]')[0].xpath('.//td')
+
+    # All key info is in the second cell of the results table
+    second_cell = first_row_cells[1]
+    order_page_url = None
+    for link in second_cell.iter('a'):
+        if 'Orders' in link.text_content() and link.get('href') is not None:
+            order_page_url = link.get('href')
+            break
+    return _case_data(second_cell.text_content(), first_row_cells[2].text_content(), order_page_url)
+
+
+def _soup_case_results(page_source):
+    soup = BeautifulSoup(page_source, 'html.parser', parse_only=SoupStrainer('table', id='caseTable'))
+    first_row_cells = soup.find('table', id='caseTable').find('tbody').find('tr').find_all('td')
+
+    # All key info is in the second cell of the results table
+    second_cell = first_row_cells[1]
+    order_page_url = None
+    for link in second_cell.find_all('a'):
+        if 'Orders' in link.text and link.has_attr('href'):
+            order_page_url = link['href']
+            break
+    return _case_data(second_cell.text, first_row_cells[2].text, order_page_url)
+
+
+# ------------------------------------------------------------------------------
+# Orders page
+# ------------------------------------------------------------------------------
+
+# Searches all tables on the orders page for rows linking to order PDFs
+def parse_order_links(page_source):
+    if backend == 'lxml':
+        return _lxml_order_links(page_source)
+    return _soup_order_links(page_source)
+
+
+def _lxml_order_links(page_source):
+    order_links = []
+    root = lxml.html.fromstring(page_source)
+    for tbody in root.xpath('//table/descendant::tbody[1]'):
+        for row in tbody.iter('tr'):
+            cells = row.xpath('.//td')
+            if len(cells) < 3:
+                continue
+            # Identify the correct rows by their structure and link content
+            links = cells[1].xpath('.//a')
+            if links and 'showlogo' in (links[0].get('href') or ''):
+                order_links.append({
+                    'text': links[0].text_content().strip(),
+                    'url': links[0].get('href'),
+                    'date': cells[2].text_content().strip()
+                })
+    return order_links
+
+
+def _soup_order_links(page_source):
+    order_links = []
+    order_soup = BeautifulSoup(page_source, 'html.parser', parse_only=SoupStrainer('table'))
+    for table in order_soup.find_all('table'):
+        if table.find('tbody'):
+            for row in table.find('tbody').find_all('tr'):
+                cells = row.find_all('td')
+                # Identify the correct rows by their structure and link content
+                if len(cells) > 2 and cells[1].find('a') and 'showlogo' in cells[1].find('a').get('href', ''):
+                    pdf_link_element = cells[1].find('a')
+                    order_links.append({
+                        'text': pdf_link_element.text.strip(),
+                        'url': pdf_link_element['href'],
+                        'date': cells[2].text.strip()
+                    })
+    return order_links
+
+
+# ------------------------------------------------------------------------------
+# Case status page
+# ------------------------------------------------------------------------------
+
+# Extracts the option labels from the "Case Type" <select> of a page
+def parse_case_type_options(page_source):
+    if backend == 'lxml':
+        selects = lxml.html.fromstring(page_source).xpath('//select[@name="case_type"]')
+        labels = [option.text_content() for option in selects[0].iter('option')] if selects else []
+    else:
+        soup = BeautifulSoup(page_source, 'html.parser', parse_only=SoupStrainer('select', attrs={'name': 'case_type'}))
+        case_type_select = soup.find('select', {'name': 'case_type'})
+        labels = [option.text for option in case_type_select.find_all('option')] if case_type_select else []
+
+    case_type_options = []
+    for label in labels:
+        option_text = label.strip()
+        if option_text and option_text.lower() != 'select':
+            case_type_options.append(option_text)
+    return case_type_options
+
+
+# Input types that are not submitted as plain form fields
+_SKIPPED_INPUT_TYPES = ('submit', 'button', 'checkbox', 'radio')
+
+
+# Reads what the HTTP backend needs to submit a search from the case status
+# page: the CAPTCHA text and the search form's method, action (as written
+# in the page), default fields (CSRF token, CAPTCHA id and other hidden
+# inputs), CAPTCHA input name and the value of every dropdown option by its
+# label. Raises ValueError if the CAPTCHA or the form is missing.
+def parse_search_form(page_source):
+    if backend == 'lxml':
+        return _lxml_search_form(page_source)
+    return _soup_search_form(page_source)
+
+
+def _search_form(captcha_text, method, action, fields, captcha_field, option_values):
+    return {
+        'captcha_text': captcha_text,
+        'method': (method or 'get').lower(),
+        'action': action,
+        'fields': fields,
+        'captcha_field': captcha_field or 'captchaInput',
+        'option_values': option_values,
+    }
+
+
+def _lxml_search_form(page_source):
+    root = lxml.html.fromstring(page_source)
+    captcha_elements = root.xpath('//*[@id="captcha-code"]')
+    if not captcha_elements:
+        raise ValueError("CAPTCHA not found on the case status page")
+    forms = root.xpath('(//select[@name="case_type"])[1]/ancestor::form[1]')
+    if not forms:
+        raise ValueError("Search form not found on the case status page")
+    form = forms[0]
+
+    fields = {}
+    for field in form.iter('input'):
+        if field.get('name') and field.get('type') not in _SKIPPED_INPUT_TYPES:
+            fields[field.get('name')] = field.get('value', '')
+    captcha_inputs = form.xpath('.//*[@id="captchaInput"]')
+    option_values = {}
+    for select in form.iter('select'):
+        options = {}
+        for option in select.iter('option'):
+            label = option.text_content().strip()
+            options[label] = option.get('value', label)
+        option_values[select.get('name')] = options
+    return _search_form(captcha_elements[0].text_content().strip(), form.get('method'), form.get('action'),
+                        fields, captcha_inputs[0].get('name') if captcha_inputs else None, option_values)
+
+
+# Only the forms are turned into objects (and the CAPTCHA element in a second
+# pass, if it is not inside one of them)
+def _soup_search_form(page_source):
+    soup = BeautifulSoup(page_source, 'html.parser', parse_only=SoupStrainer('form'))
+    captcha_element = soup.find(id='captcha-code')
+    if captcha_element is None:
+        captcha_element = BeautifulSoup(page_source, 'html.parser',
+                                        parse_only=SoupStrainer(id='captcha-code')).find(id='captcha-code')
+    if captcha_element is None:
+        raise ValueError("CAPTCHA not found on the case status page")
+    case_type_select = soup.find('select', {'name': 'case_type'})
+    form = case_type_select.find_parent('form') if case_type_select else None
+    if form is None:
+        raise ValueError("Search form not found on the case status page")
+
+    fields = {}
+    for field in form.find_all('input'):
+        if field.get('name') and field.get('type') not in _SKIPPED_INPUT_TYPES:
+            fields[field['name']] = field.get('value', '')
+    captcha_input = form.find(id='captchaInput')
+    option_values = {}
+    for select in form.find_all('select'):
+        option_values[select.get('name')] = {
+            option.text.strip(): option.get('value', option.text.strip()) for option in select.find_all('option')
+        }
+    return _search_form(captcha_element.get_text(strip=True), form.get('method'), form.get('action'),
+                        fields, captcha_input.get('name') if captcha_input else None, option_values)
@@ -0,0 +1,271 @@
+# ==============================================================================
+#  pdf_store.py - Content-Addressed On-Disk Cache for Order PDFs
+# ==============================================================================
+# /summarize used to re-download the order PDF on every click. Downloads are
+# now streamed to disk and stored under their SHA-256 content hash, with an
+# index mapping each URL to its hash and HTTP validators (ETag,
+# Last-Modified). A URL seen recently is served straight from disk; an older
+# one is revalidated with a conditional request, so an unchanged PDF costs a
+# 304 instead of a full download. The store is bounded by `max_bytes` and
+# evicts the least recently used documents first. Downloads go through the
+# court governor (see governor.py); while its circuit is open a stored copy
+# is served without revalidation.
+# ==============================================================================
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import nullcontext
+from governor import CircuitOpenError
+from http_client import shared_session
+from tracing import span
+
+# Locks shared out among the URLs being fetched (see PdfStore._url_lock)
+URL_LOCK_STRIPES = 64
+
+# Seconds after a blob's path was handed out during which it is not deleted,
+# so a caller still about to open it doesn't find it gone
+BLOB_IN_USE_SECONDS = 60
+
+CHUNK_SIZE = 64 * 1024
+
+
+# A stored PDF: `path` points at the file on disk
+class PdfDocument:
+    def __init__(self, url, path, sha256, size, source):
+        self.url = url
+        self.path = path
+        self.sha256 = sha256
+        self.size = size
+        self.source = source    # 'cache', 'revalidated', 'stale' or 'download'
+
+
+class PdfStore:
+    def __init__(self, directory, max_bytes=500 * 1024 * 1024, revalidate_after=24 * 3600, timeout=15, governor=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.revalidate_after = revalidate_after
+        self.timeout = timeout
+        self.governor = governor    # limits downloads from the court website (see governor.py)
+
+        self._blob_dir = os.path.join(directory, 'blobs')
+        self._index_path = os.path.join(directory, 'index.json')
+        os.makedirs(self._blob_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        # One download at a time per URL. A fixed set of lock stripes picked
+        # by the URL's hash, so memory doesn't grow with every URL ever seen.
+        self._url_locks = [threading.Lock() for _ in range(URL_LOCK_STRIPES)]
+        self._index = self._load_index()
+        self._handed_out = {}           # sha256 -> when its path was last returned
+        self._pending_removal = set()   # unreferenced blobs still in use
+
+        # Counters exposed through stats()
+        self._hits = 0
+        self._revalidated = 0
+        self._stale = 0
+        self._downloads = 0
+        self._evictions = 0
+
+    # --------------------------------------------------------------------------
+    # Index handling
+    # --------------------------------------------------------------------------
+    def _load_index(self):
+        try:
+            with open(self._index_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    # Writes the index atomically so a crash never leaves it half written.
+    # URLs stored by other worker processes since this one loaded the index
+    # are adopted first, so the processes don't erase each other's entries
+    # (but not URLs this one evicted whose blobs are awaiting deletion).
+    def _save_index(self):
+        for url, entry in self._load_index().items():
+            if (url not in self._index and entry['sha256'] not in self._pending_removal
+                    and os.path.exists(self._blob_path(entry['sha256']))):
+                self._index[url] = entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, self._index_path)
+
+    def _blob_path(self, sha256):
+        return os.path.join(self._blob_dir, sha256[:2], sha256 + '.pdf')
+
+    def _url_lock(self, url):
+        return self._url_locks[hash(url) % len(self._url_locks)]
+
+    # --------------------------------------------------------------------------
+    # Fetching
+    # --------------------------------------------------------------------------
+
+    # Returns a PdfDocument for the URL, downloading it only when it is not
+    # stored yet or has changed on the server
+    def fetch(self, url):
+        with span('pdf.fetch'), self._url_lock(url):
+            with self._lock:
+                entry = self._index.get(url)
+            if entry and not os.path.exists(self._blob_path(entry['sha256'])):
+                entry = None
+
+            if entry and time.time() - entry['fetched_at'] < self.revalidate_after:
+                return self._hit(url, entry, 'cache')
+
+            headers = {}
+            if entry:
+                if entry.get('etag'):
+                    headers['If-None-Match'] = entry['etag']
+                if entry.get('last_modified'):
+                    headers['If-Modified-Since'] = entry['last_modified']
+
+            try:
+                with self.governor.request() if self.governor else nullcontext():
+                    response = shared_session.get(url, headers=headers, timeout=self.timeout, stream=True)
+                    try:
+                        if entry and response.status_code == 304:
+                            return self._hit(url, entry, 'revalidated')
+                        response.raise_for_status()
+                        return self._store(url, response)
+                    finally:
+                        response.close()
+            except CircuitOpenError:
+                # The court website is down: an older copy beats no copy
+                if entry:
+                    return self._hit(url, entry, 'stale')
+                raise
+
+    def _hit(self, url, entry, source):
+        with self._lock:
+            entry['last_used'] = time.time()
+            self._handed_out[entry['sha256']] = entry['last_used']
+            if source == 'cache':
+                self._hits += 1
+            elif source == 'stale':
+                self._stale += 1
+            else:
+                entry['fetched_at'] = time.time()
+                self._revalidated += 1
+                self._save_index()
+        return PdfDocument(url, self._blob_path(entry['sha256']), entry['sha256'], entry['size'], source)
+
+    # Streams the response to a temporary file while hashing it, then moves it
+    # to its content-addressed location (identical PDFs are stored once)
+    def _store(self, url, response):
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    f.write(chunk)
+                    digest.update(chunk)
+                    size += len(chunk)
+            sha256 = digest.hexdigest()
+            blob_path = self._blob_path(sha256)
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            os.replace(tmp_path, blob_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        now = time.time()
+        with self._lock:
+            previous = self._index.get(url)
+            self._index[url] = {
+                'sha256': sha256,
+                'size': size,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'fetched_at': now,
+                'last_used': now,
+            }
+            self._downloads += 1
+            self._handed_out[sha256] = now
+            # The URL's content changed: its old blob is garbage unless another
+            # URL still has the same content
+            if previous and previous['sha256'] != sha256:
+                self._remove_unreferenced_blob(previous['sha256'])
+            self._evict(keep=url)
+            self._save_index()
+        return PdfDocument(url, blob_path, sha256, size, 'download')
+
+    # Drops least recently used URLs until the stored blobs fit in max_bytes.
+    # A blob is deleted once no URL refers to it any more (lock held).
+    def _evict(self, keep=None):
+        self._remove_pending_blobs()
+        references = {}
+        sizes = {}
+        for entry in self._index.values():
+            references[entry['sha256']] = references.get(entry['sha256'], 0) + 1
+            sizes[entry['sha256']] = entry['size']
+
+        total = sum(sizes.values())
+        by_age = sorted((entry['last_used'], url) for url, entry in self._index.items() if url != keep)
+        for _, url in by_age:
+            if total <= self.max_bytes:
+                break
+            entry = self._index.pop(url)
+            self._evictions += 1
+            references[entry['sha256']] -= 1
+            if references[entry['sha256']] == 0:
+                total -= entry['size']
+                self._delete_blob(entry['sha256'])
+
+    # Deletes a blob that no URL in the index refers to any more (lock held)
+    def _remove_unreferenced_blob(self, sha256):
+        if any(entry['sha256'] == sha256 for entry in self._index.values()):
+            return
+        self._delete_blob(sha256)
+
+    # Deletes an unreferenced blob, or if its path was handed out moments
+    # ago, leaves it for a later eviction pass (lock held)
+    def _delete_blob(self, sha256):
+        if time.time() - self._handed_out.get(sha256, 0) < BLOB_IN_USE_SECONDS:
+            self._pending_removal.add(sha256)
+            return
+        self._pending_removal.discard(sha256)
+        self._handed_out.pop(sha256, None)
+        try:
+            os.remove(self._blob_path(sha256))
+        except OSError:
+            pass
+
+    # Retries the deferred deletions and forgets old hand-outs (lock held)
+    def _remove_pending_blobs(self):
+        referenced = {entry['sha256'] for entry in self._index.values()}
+        for sha256 in list(self._pending_removal):
+            if sha256 in referenced:
+                self._pending_removal.discard(sha256)    # stored again since
+            else:
+                self._delete_blob(sha256)
+        cutoff = time.time() - BLOB_IN_USE_SECONDS
+        for sha256, handed_out_at in list(self._handed_out.items()):
+            if handed_out_at < cutoff:
+                del self._handed_out[sha256]
+
+    # Persists last-used times recorded by cache hits (called at shutdown)
+    def flush(self):
+        with self._lock:
+            self._remove_pending_blobs()
+            self._save_index()
+
+    def stats(self):
+        with self._lock:
+            stored = {entry['sha256']: entry['size'] for entry in self._index.values()}
+            return {
+                'urls': len(self._index),
+                'documents': len(stored),
+                'bytes': sum(stored.values()),
+                'max_bytes': self.max_bytes,
+                'hits': self._hits,
+                'revalidated': self._revalidated,
+                'stale': self._stale,
+                'downloads': self._downloads,
+                'evictions': self._evictions,
+            }
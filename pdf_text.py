@@ -0,0 +1,159 @@
+# ==============================================================================
+#  pdf_text.py - Page-by-Page Text Extraction for Order PDFs
+# ==============================================================================
+# Long judgments run to hundreds of pages. Text is read lazily, one page at a
+# time, from the PDF stored on disk by pdf_store.py, and extraction stops as
+# soon as `max_pages` pages or `max_chars` characters have been read. PDFs
+# with at least `parallel_min_pages` pages are split into page ranges that
+# are extracted in a pool of worker processes. chunk_text() splits long text
+# into prompt-sized pieces for map-reduce summarization (see summaries.py).
+# ==============================================================================
+
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from tracing import span
+
+
+# Extracted text plus how much of the document it covers
+class ExtractedText:
+    def __init__(self, text, pages_read, page_count, truncated):
+        self.text = text
+        self.pages_read = pages_read
+        self.page_count = page_count
+        self.truncated = truncated
+
+
+# Yields the text of pages [start, stop) of the PDF at `path`. Pages are
+# parsed only as they are reached. (PyPDF2 is imported on first use.)
+def iter_page_texts(path, start=0, stop=None):
+    import PyPDF2
+    with open(path, 'rb') as pdf_file:
+        pdf_reader = PyPDF2.PdfReader(pdf_file)
+        stop = len(pdf_reader.pages) if stop is None else min(stop, len(pdf_reader.pages))
+        for index in range(start, stop):
+            yield pdf_reader.pages[index].extract_text() or ""
+
+
+# Runs in a worker process: returns the texts of one page range
+def _extract_range(path, start, stop):
+    return list(iter_page_texts(path, start, stop))
+
+
+def count_pages(path):
+    import PyPDF2
+    with open(path, 'rb') as pdf_file:
+        return len(PyPDF2.PdfReader(pdf_file).pages)
+
+
+class TextExtractor:
+    def __init__(self, max_pages=300, max_chars=500000, workers=2, parallel_min_pages=60, range_size=20):
+        self.max_pages = max_pages
+        self.max_chars = max_chars
+        self.workers = workers
+        self.parallel_min_pages = parallel_min_pages
+        self.range_size = range_size
+
+        self._pool = None
+        self._lock = threading.Lock()
+        self._documents = 0
+        self._pages = 0
+        self._parallel = 0
+        self._truncated = 0
+
+    # The process pool is only started once a large PDF needs it. By then
+    # the server has many threads, and a child forked from it could inherit
+    # a lock another thread was holding, so workers are forked from a clean
+    # forkserver process instead (or spawned where there is none, e.g. on
+    # Windows).
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+                self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context(start_method))
+            return self._pool
+
+    # Returns an ExtractedText for the PDF at `path`, respecting the caps
+    def extract(self, path):
+        with span('pdf.extract'):
+            return self._extract(path)
+
+    def _extract(self, path):
+        page_count = count_pages(path)
+        last_page = min(page_count, self.max_pages) if self.max_pages else page_count
+
+        parallel = self.workers > 1 and last_page >= self.parallel_min_pages
+        if parallel:
+            page_texts = self._iter_parallel(path, last_page)
+        else:
+            page_texts = iter_page_texts(path, 0, last_page)
+
+        parts = []
+        chars = 0
+        cut_short = False
+        for page_text in page_texts:
+            if self.max_chars and chars + len(page_text) > self.max_chars:
+                parts.append(page_text[:self.max_chars - chars])
+                cut_short = True
+                break
+            parts.append(page_text)
+            chars += len(page_text) + 1     # plus the newline between pages
+        page_texts.close()
+
+        pages_read = len(parts)
+        truncated = cut_short or pages_read < page_count
+        with self._lock:
+            self._documents += 1
+            self._pages += pages_read
+            self._parallel += parallel
+            self._truncated += truncated
+        return ExtractedText("\n".join(parts), pages_read, page_count, truncated)
+
+    # Extracts page ranges in worker processes and yields the page texts in
+    # document order; ranges not reached yet are cancelled if iteration stops
+    def _iter_parallel(self, path, last_page):
+        pool = self._get_pool()
+        futures = [pool.submit(_extract_range, path, start, min(start + self.range_size, last_page))
+                   for start in range(0, last_page, self.range_size)]
+        try:
+            for future in futures:
+                yield from future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                'max_pages': self.max_pages,
+                'max_chars': self.max_chars,
+                'workers': self.workers,
+                'documents': self._documents,
+                'pages_extracted': self._pages,
+                'parallel_extractions': self._parallel,
+                'truncated': self._truncated,
+            }
+
+
+# Splits text into chunks of at most `chunk_chars` characters, preferring to
+# break at paragraph and then line boundaries
+def chunk_text(text, chunk_chars):
+    chunks = []
+    while len(text) > chunk_chars:
+        cut = text.rfind("\n\n", 0, chunk_chars)
+        if cut < chunk_chars // 2:
+            cut = text.rfind("\n", 0, chunk_chars)
+        if cut < chunk_chars // 2:
+            cut = chunk_chars
+        chunks.append(text[:cut])
+        text = text[cut:].lstrip()
+    if text.strip():
+        chunks.append(text)
+    return chunks
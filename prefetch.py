@@ -0,0 +1,131 @@
+# ==============================================================================
+#  prefetch.py - Background Prefetching of Order Summaries
+# ==============================================================================
+# Nothing used to happen after a search until the user clicked "Generate AI
+# Summary", so the whole download + extract + model path ran while they
+# waited. When a search finishes, the newest `count` order PDFs are now
+# queued here; a few low-priority worker threads download them into the PDF
+# store and generate their summaries into the summary cache, so a later
+# click is answered from the cache (or joins the generation already under
+# way). Prefetch work yields to interactive requests: a worker waits while
+# any summarize request is being served, and the queue is bounded, dropping
+# new work when full.
+# ==============================================================================
+
+import queue
+import threading
+from contextlib import contextmanager
+
+
+class Prefetcher:
+    def __init__(self, app, pdf_store, summarizer, count=1, workers=1, max_queue=20):
+        self.app = app
+        self.pdf_store = pdf_store
+        self.summarizer = summarizer
+        self.count = count
+        self.workers = workers
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._pending = set()       # URLs queued or being prefetched
+        self._interactive = 0       # summarize requests being served now
+        self._idle = threading.Condition()
+        self._threads = []
+        self._closed = False
+
+        # Counters exposed through stats()
+        self._scheduled = 0
+        self._dropped = 0
+        self._completed = 0
+        self._failed = 0
+        self._yielded = 0
+
+    # Starts the daemon worker threads
+    def start(self):
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f'prefetch-{index}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    # Queues the newest orders of a finished search (the court lists the
+    # latest order first)
+    def schedule(self, order_links):
+        for link in order_links[:self.count]:
+            url = link['url']
+            with self._idle:
+                if self._closed or url in self._pending:
+                    continue
+                try:
+                    self._queue.put_nowait(url)
+                except queue.Full:
+                    self._dropped += 1
+                    continue
+                self._pending.add(url)
+                self._scheduled += 1
+
+    # Wrap interactive summarize requests in this so prefetching pauses
+    # while they run
+    @contextmanager
+    def interactive(self):
+        with self._idle:
+            self._interactive += 1
+        try:
+            yield
+        finally:
+            with self._idle:
+                self._interactive -= 1
+                if self._interactive == 0:
+                    self._idle.notify_all()
+
+    # Blocks the calling worker until no interactive request is running
+    def _wait_for_idle(self):
+        with self._idle:
+            if self._interactive:
+                self._yielded += 1
+            while self._interactive and not self._closed:
+                self._idle.wait()
+
+    def _work(self):
+        while True:
+            url = self._queue.get()
+            if url is None:
+                return
+            try:
+                self._wait_for_idle()
+                document = self.pdf_store.fetch(url)
+                self._wait_for_idle()
+                with self.app.app_context():
+                    self.summarizer.summarize(document)
+                with self._idle:
+                    self._completed += 1
+            except Exception as e:
+                print(f"Prefetching {url} failed: {e}")
+                with self._idle:
+                    self._failed += 1
+            finally:
+                with self._idle:
+                    self._pending.discard(url)
+
+    def shutdown(self):
+        with self._idle:
+            self._closed = True
+            self._idle.notify_all()
+        for _ in self._threads:
+            try:
+                self._queue.put_nowait(None)
+            except queue.Full:
+                pass
+
+    def stats(self):
+        with self._idle:
+            return {
+                'count': self.count,
+                'workers': self.workers,
+                'queued': self._queue.qsize(),
+                'in_progress': len(self._pending) - self._queue.qsize(),
+                'scheduled': self._scheduled,
+                'dropped': self._dropped,
+                'completed': self._completed,
+                'failed': self._failed,
+                'yielded_to_interactive': self._yielded,
+            }
+
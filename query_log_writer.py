@@ -0,0 +1,308 @@
+# ==============================================================================
+#  query_log_writer.py - Buffered, Batched Writes to the query_log Table
+# ==============================================================================
+# Every search used to add its QueryLog row and commit before the lookup even
+# started, so concurrent searches queued up on SQLite's single write lock.
+# log() now only appends the row to an in-memory queue; a background thread
+# inserts the queued rows in one transaction per batch, as soon as
+# `batch_size` rows are waiting or `flush_interval` seconds after the oldest
+# one arrived. shutdown() (registered with atexit) writes whatever is still
+# queued. If a batch cannot be written (e.g. the database is locked for too
+# long) its rows are kept and retried with the next batch; a batch that keeps
+# failing is written in halves so only the rows the database rejects are
+# dropped.
+#
+# The same transaction adds the batch to the rollup tables behind the
+# /analytics dashboard (searches per case, per case type and per hour, with
+# cache hits and scrape timings recorded by timed_scrape()). Rollups are
+# built from query_log once when a database that predates them is opened.
+# ==============================================================================
+
+import datetime
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from sqlalchemy import func, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from models import db, QueryLog, QueryCaseRollup, QueryTypeRollup, QueryHourRollup
+
+# Attempts at writing a batch before it is split up to find the rejected rows
+MAX_ATTEMPTS = 3
+
+
+# Current time in UTC, like the query_log column's CURRENT_TIMESTAMP default
+def _utc_now():
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+
+class QueryLogWriter:
+    def __init__(self, app, batch_size=200, flush_interval=1.0, max_queue=10000):
+        self.app = app
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+
+        # Events waiting to be written: ('search', row, cache_hit) or
+        # ('scrape', timestamp, duration, ok)
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._thread = None
+        self._stopping = False
+        self._attempts = 0
+
+        self._logged = 0
+        self._written = 0
+        self._batches = 0
+        self._failed_batches = 0
+        self._dropped = 0
+        self._largest_batch = 0
+        self._write_time_total = 0.0
+
+    def _enqueue(self, event):
+        with self._cond:
+            if len(self._queue) >= self.max_queue:
+                self._dropped += 1
+                return
+            self._queue.append(event)
+            if event[0] == 'search':
+                self._logged += 1
+            # Wake the writer for the first queued row (which starts the
+            # flush_interval countdown) and again when a batch is full
+            if len(self._queue) == 1 or len(self._queue) >= self.batch_size:
+                self._cond.notify()
+        if self._thread is None:
+            self.start()
+
+    # Queues one search for the log; never touches the database. cache_hit
+    # tells the analytics whether the result cache answered it. A search
+    # missing any case detail is dropped here, since the table would reject
+    # it and fail the rest of its batch with it.
+    def log(self, case_type, case_number, case_year, cache_hit=False):
+        if not (case_type and case_number and case_year):
+            with self._cond:
+                self._dropped += 1
+            print(f"Not logging a search with missing case details: {case_type!r} {case_number!r} {case_year!r}")
+            return
+        row = {'case_type': case_type, 'case_number': case_number, 'case_year': case_year, 'timestamp': _utc_now()}
+        self._enqueue(('search', row, bool(cache_hit)))
+
+    # Times the scrape run inside the block for the analytics (a scrape that
+    # raises is counted as failed)
+    @contextmanager
+    def timed_scrape(self):
+        started = time.monotonic()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            self._enqueue(('scrape', _utc_now(), time.monotonic() - started, ok))
+
+    # Adds the table's indexes to existing databases, builds the rollups if
+    # they are missing and starts the writer thread (also started by the
+    # first log() call)
+    def start(self):
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='query-log-writer', daemon=True)
+        try:
+            with self.app.app_context():
+                for index in QueryLog.__table__.indexes:
+                    index.create(db.engine, checkfirst=True)
+                self._backfill_rollups()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Could not prepare the query log tables: {e}")
+        self._thread.start()
+
+    # Builds the rollups from query_log for databases that predate them
+    # (inside an app context)
+    def _backfill_rollups(self):
+        if db.session.query(QueryTypeRollup.case_type).first() is not None:
+            return
+        if db.session.query(QueryLog.id).first() is None:
+            return
+        db.session.execute(text(
+            "INSERT INTO query_case_rollup (case_type, case_number, case_year, searches, last_searched_at) "
+            "SELECT case_type, case_number, case_year, COUNT(*), MAX(timestamp) FROM query_log "
+            "GROUP BY case_type, case_number, case_year"))
+        db.session.execute(text(
+            "INSERT INTO query_type_rollup (case_type, searches) "
+            "SELECT case_type, COUNT(*) FROM query_log GROUP BY case_type"))
+        db.session.execute(text(
+            "INSERT INTO query_hour_rollup (hour, searches, cache_hits, scrapes, scrape_failures, "
+            "scrape_seconds_total, scrape_seconds_max) "
+            "SELECT strftime('%Y-%m-%d %H', timestamp), COUNT(*), 0, 0, 0, 0.0, 0.0 FROM query_log "
+            "WHERE timestamp IS NOT NULL GROUP BY 1"))
+        db.session.commit()
+        print("Query analytics rollups built from the existing query log.")
+
+    def _run(self):
+        while True:
+            with self._cond:
+                # Wait for the first row, then give the batch time to fill up
+                while not self._queue and not self._stopping:
+                    self._cond.wait()
+                deadline = time.monotonic() + self.flush_interval
+                while len(self._queue) < self.batch_size and not self._stopping:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if self._stopping:
+                    return
+            failed_before = self._failed_batches
+            self.flush()
+            # Back off after a failed batch instead of retrying in a loop
+            if self._failed_batches != failed_before:
+                time.sleep(max(self.flush_interval, 1.0))
+
+    # Writes queued rows, one transaction per batch. Returns the rows written.
+    def flush(self):
+        written = 0
+        with self._write_lock:
+            while True:
+                with self._cond:
+                    batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+                if not batch:
+                    return written
+                if self._write(batch):
+                    self._attempts = 0
+                    written += len(batch)
+                    continue
+                self._attempts += 1
+                if self._attempts >= MAX_ATTEMPTS:
+                    # Most likely a row the database rejects; write the rest of
+                    # the batch around it instead of blocking the log on it
+                    self._attempts = 0
+                    written += self._write_in_parts(batch)
+                    continue
+                with self._cond:
+                    self._queue.extendleft(reversed(batch))
+                return written
+
+    # Writes a batch that keeps failing as a whole in halves, down to single
+    # events, and drops only the events the database still rejects. Returns
+    # the events written.
+    def _write_in_parts(self, batch):
+        if len(batch) == 1:
+            if self._write(batch, isolating=True):
+                return 1
+            print(f"Dropping a query log event the database rejects: {batch[0]}")
+            with self._cond:
+                self._dropped += 1
+            return 0
+        written = 0
+        middle = len(batch) // 2
+        for part in (batch[:middle], batch[middle:]):
+            if self._write(part, isolating=True):
+                written += len(part)
+            else:
+                written += self._write_in_parts(part)
+        return written
+
+    # Writes a batch of events in one transaction. Returns False if it failed
+    # (reported and counted unless the batch is being split up already).
+    def _write(self, batch, isolating=False):
+        started = time.monotonic()
+        rows = [event[1] for event in batch if event[0] == 'search']
+        with self.app.app_context():
+            try:
+                if rows:
+                    db.session.execute(db.insert(QueryLog), rows)
+                self._update_rollups(batch)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                if not isolating:
+                    print(f"Could not write {len(batch)} query log events (will retry): {e}")
+                    with self._cond:
+                        self._failed_batches += 1
+                return False
+        with self._cond:
+            self._written += len(rows)
+            self._batches += 1
+            self._largest_batch = max(self._largest_batch, len(batch))
+            self._write_time_total += time.monotonic() - started
+        return True
+
+    # Adds a batch of events to the rollup tables with one upsert per table
+    def _update_rollups(self, batch):
+        cases = {}
+        types = {}
+        hours = {}
+        for event in batch:
+            if event[0] == 'search':
+                _, row, cache_hit = event
+                key = (row['case_type'], row['case_number'], row['case_year'])
+                case = cases.setdefault(key, {'case_type': key[0], 'case_number': key[1], 'case_year': key[2],
+                                              'searches': 0, 'last_searched_at': row['timestamp']})
+                case['searches'] += 1
+                case['last_searched_at'] = max(case['last_searched_at'], row['timestamp'])
+                types[row['case_type']] = types.get(row['case_type'], 0) + 1
+                hour = self._hour(hours, row['timestamp'])
+                hour['searches'] += 1
+                hour['cache_hits'] += cache_hit
+            else:
+                _, timestamp, duration, ok = event
+                hour = self._hour(hours, timestamp)
+                hour['scrapes'] += 1
+                hour['scrape_failures'] += not ok
+                hour['scrape_seconds_total'] += duration
+                hour['scrape_seconds_max'] = max(hour['scrape_seconds_max'], duration)
+
+        if cases:
+            stmt = sqlite_insert(QueryCaseRollup)
+            db.session.execute(stmt.on_conflict_do_update(
+                index_elements=['case_type', 'case_number', 'case_year'],
+                set_={'searches': QueryCaseRollup.searches + stmt.excluded.searches,
+                      'last_searched_at': func.max(func.coalesce(QueryCaseRollup.last_searched_at, stmt.excluded.last_searched_at),
+                                                    stmt.excluded.last_searched_at)}),
+                list(cases.values()))
+        if types:
+            stmt = sqlite_insert(QueryTypeRollup)
+            db.session.execute(stmt.on_conflict_do_update(
+                index_elements=['case_type'],
+                set_={'searches': QueryTypeRollup.searches + stmt.excluded.searches}),
+                [{'case_type': case_type, 'searches': count} for case_type, count in types.items()])
+        if hours:
+            stmt = sqlite_insert(QueryHourRollup)
+            columns = ('searches', 'cache_hits', 'scrapes', 'scrape_failures', 'scrape_seconds_total')
+            set_ = {column: getattr(QueryHourRollup, column) + getattr(stmt.excluded, column) for column in columns}
+            set_['scrape_seconds_max'] = func.max(QueryHourRollup.scrape_seconds_max, stmt.excluded.scrape_seconds_max)
+            db.session.execute(stmt.on_conflict_do_update(index_elements=['hour'], set_=set_), list(hours.values()))
+
+    @staticmethod
+    def _hour(hours, timestamp):
+        key = timestamp.strftime('%Y-%m-%d %H')
+        if key not in hours:
+            hours[key] = {'hour': key, 'searches': 0, 'cache_hits': 0, 'scrapes': 0, 'scrape_failures': 0,
+                          'scrape_seconds_total': 0.0, 'scrape_seconds_max': 0.0}
+        return hours[key]
+
+    # Stops the writer thread and writes every row still queued
+    def shutdown(self):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout=10)
+        self.flush()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'queued': len(self._queue),
+                'logged': self._logged,
+                'written': self._written,
+                'batches': self._batches,
+                'failed_batches': self._failed_batches,
+                'dropped': self._dropped,
+                'largest_batch': self._largest_batch,
+                'avg_batch_size': round(self._written / self._batches, 1) if self._batches else 0.0,
+                'avg_write_ms': round(self._write_time_total / self._batches * 1000, 2) if self._batches else 0.0,
+            }
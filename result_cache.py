@@ -0,0 +1,94 @@
+# ==============================================================================
+#  result_cache.py - Persistent Cache of Case Lookup Results
+# ==============================================================================
+# A lookup drives the court website through two pages, which takes many
+# seconds, while the answer for a given case rarely changes within hours.
+# Successful lookups are stored in the `case_result` table keyed by
+# (case_type, case_number, case_year) and reused while younger than
+# `max_age` seconds. Callers can bypass the cache with force_refresh.
+# Must be used inside an app context.
+# ==============================================================================
+
+import datetime
+import json
+import threading
+from sqlalchemy.exc import IntegrityError
+from models import db, CaseResult
+
+
+class ResultCache:
+    def __init__(self, max_age=6 * 3600):
+        self.max_age = datetime.timedelta(seconds=max_age)
+
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._stale = 0
+        self._bypassed = 0
+        self._stores = 0
+        self._served_stale = 0
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _find(self, case_type, case_number, case_year):
+        return CaseResult.query.filter_by(case_type=case_type,
+                                          case_number=case_number,
+                                          case_year=case_year).first()
+
+    # Returns (case_data, order_links, fetched_at) for a fresh cached lookup,
+    # or None on a miss, a stale entry or when force_refresh is set
+    def get(self, case_type, case_number, case_year, force_refresh=False):
+        if force_refresh:
+            self._count('_bypassed')
+            return None
+        row = self._find(case_type, case_number, case_year)
+        if row is None:
+            self._count('_misses')
+            return None
+        if datetime.datetime.now() - row.fetched_at >= self.max_age:
+            self._count('_stale')
+            return None
+        self._count('_hits')
+        return json.loads(row.case_data_json), json.loads(row.order_links_json), row.fetched_at
+
+    # Returns (case_data, order_links, fetched_at) however old the stored
+    # lookup is, or None; used when the court website cannot be reached
+    def get_stale(self, case_type, case_number, case_year):
+        row = self._find(case_type, case_number, case_year)
+        if row is None:
+            return None
+        self._count('_served_stale')
+        return json.loads(row.case_data_json), json.loads(row.order_links_json), row.fetched_at
+
+    # Stores (or replaces) the results of a successful lookup
+    def put(self, case_type, case_number, case_year, case_data, order_links):
+        row = self._find(case_type, case_number, case_year)
+        if row is None:
+            row = CaseResult(case_type=case_type, case_number=case_number, case_year=case_year)
+            db.session.add(row)
+        row.case_data_json = json.dumps(case_data)
+        row.order_links_json = json.dumps(order_links)
+        row.fetched_at = datetime.datetime.now()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # A concurrent lookup of the same case stored it first
+            db.session.rollback()
+            return
+        self._count('_stores')
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses + self._stale
+            return {
+                'max_age_s': int(self.max_age.total_seconds()),
+                'hits': self._hits,
+                'misses': self._misses,
+                'stale': self._stale,
+                'force_refreshes': self._bypassed,
+                'stores': self._stores,
+                'served_stale': self._served_stale,
+                'hit_rate': round(self._hits / lookups, 3) if lookups else 0.0,
+            }
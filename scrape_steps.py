@@ -0,0 +1,160 @@
+# ==============================================================================
+#  scrape_steps.py - Condition-Based Waits and Per-Step Timing for Scrapes
+# ==============================================================================
+# The scrape used to pad every lookup with fixed time.sleep() calls. Each
+# step now waits on an explicit readiness condition (results table redrawn,
+# loading spinner gone, row count stable, orders table present) with a
+# timeout taken from the app config, and records how long it took so we
+# can see where lookup latency actually goes. Selenium is imported by the
+# functions that drive a browser, so the HTTP backend never loads it.
+# ==============================================================================
+
+import threading
+import time
+from contextlib import contextmanager
+from tracing import tracer
+
+# Selenium's By.ID and By.CSS_SELECTOR strategies
+BY_ID = "id"
+BY_CSS = "css selector"
+
+# Locators for the court's case status and orders pages
+CAPTCHA_CODE = (BY_ID, "captcha-code")
+RESULT_ROWS = (BY_CSS, "#caseTable tbody tr")
+RESULTS_SPINNER = (BY_CSS, "#caseTable_processing")
+ORDER_ROWS = (BY_CSS, "table tbody tr")
+ORDER_PDF_LINKS = (BY_CSS, "a[href*='showlogo']")
+ANY_SPINNER = (BY_CSS, ".dataTables_processing")
+
+# Used for any step that has no timeout of its own in the config
+DEFAULT_STEP_TIMEOUT = 15
+
+
+# ------------------------------------------------------------------------------
+# Readiness conditions (callables usable with WebDriverWait.until)
+# ------------------------------------------------------------------------------
+
+# True once the number of matching rows has stayed the same for
+# `quiet_period` seconds, i.e. the table has finished rendering
+class rows_stable:
+    def __init__(self, locator, quiet_period=0.3, min_rows=1):
+        self.locator = locator
+        self.quiet_period = quiet_period
+        self.min_rows = min_rows
+        self._count = None
+        self._since = None
+
+    def __call__(self, driver):
+        count = len(driver.find_elements(*self.locator))
+        now = time.monotonic()
+        if count != self._count:
+            self._count = count
+            self._since = now
+            return False
+        return count >= self.min_rows and now - self._since >= self.quiet_period
+
+
+# True once the rows that were in the table before a submit have been
+# replaced, so the "No data" placeholder is never mistaken for a result
+def table_redrawn(previous_rows):
+    if not previous_rows:
+        return lambda driver: True
+    from selenium.webdriver.support import expected_conditions as EC
+    return EC.staleness_of(previous_rows[0])
+
+
+# True once a (DataTables) "Processing..." indicator is hidden or absent
+def spinner_gone(locator):
+    from selenium.webdriver.support import expected_conditions as EC
+    return EC.invisibility_of_element_located(locator)
+
+
+def document_ready(driver):
+    return driver.execute_script("return document.readyState") == "complete"
+
+
+# The orders page is ready as soon as a PDF link shows up, or once it has
+# finished loading with a stable (possibly empty) set of table rows
+def orders_ready():
+    from selenium.webdriver.support import expected_conditions as EC
+    return EC.any_of(
+        EC.presence_of_element_located(ORDER_PDF_LINKS),
+        EC.all_of(document_ready, spinner_gone(ANY_SPINNER), rows_stable(ORDER_ROWS, min_rows=0)),
+    )
+
+
+# ------------------------------------------------------------------------------
+# Aggregated timings across all scrapes (exposed through /stats)
+# ------------------------------------------------------------------------------
+class StepTimings:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._steps = {}
+
+    def record(self, step, duration, timed_out=False):
+        with self._lock:
+            entry = self._steps.setdefault(step, {'count': 0, 'total_s': 0.0, 'max_s': 0.0, 'timeouts': 0})
+            entry['count'] += 1
+            entry['total_s'] += duration
+            entry['max_s'] = max(entry['max_s'], duration)
+            if timed_out:
+                entry['timeouts'] += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                step: {
+                    'count': entry['count'],
+                    'avg_s': round(entry['total_s'] / entry['count'], 3),
+                    'max_s': round(entry['max_s'], 3),
+                    'timeouts': entry['timeouts'],
+                }
+                for step, entry in self._steps.items()
+            }
+
+
+# ------------------------------------------------------------------------------
+# One scrape: runs timed steps against a driver
+# ------------------------------------------------------------------------------
+class ScrapeSteps:
+    def __init__(self, driver, timeouts, timings=None):
+        self.driver = driver
+        self.timeouts = timeouts
+        self.timings = timings
+        self.durations = {}
+
+    def _record(self, name, duration, timed_out=False):
+        self.durations[name] = self.durations.get(name, 0.0) + duration
+        if self.timings is not None:
+            self.timings.record(name, duration, timed_out)
+        tracer.record('scrape.' + name, duration)
+
+    # Times an arbitrary block of work (e.g. filling the form or parsing)
+    @contextmanager
+    def step(self, name):
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._record(name, time.monotonic() - started)
+
+    # Waits for each condition in turn, sharing the step's timeout budget
+    def wait(self, name, *conditions):
+        from selenium.common.exceptions import TimeoutException
+        from selenium.webdriver.support.ui import WebDriverWait
+        timeout = self.timeouts.get(name, DEFAULT_STEP_TIMEOUT)
+        started = time.monotonic()
+        result = None
+        try:
+            for condition in conditions:
+                remaining = max(timeout - (time.monotonic() - started), 0)
+                result = WebDriverWait(self.driver, remaining, poll_frequency=0.1).until(condition)
+        except TimeoutException:
+            self._record(name, time.monotonic() - started, timed_out=True)
+            raise TimeoutException(f"Step '{name}' did not become ready within {timeout}s")
+        self._record(name, time.monotonic() - started)
+        return result
+
+    # e.g. "captcha=0.84s submit=0.10s results=1.92s"
+    def summary(self):
+        return " ".join(f"{name}={duration:.2f}s" for name, duration in self.durations.items())
@@ -0,0 +1,298 @@
+# ==============================================================================
+#  scrapers.py - Pluggable Scraper Backends for the Court Website
+# ==============================================================================
+# Everything we extract (the CAPTCHA text, the #caseTable row, the "Orders"
+# link and the `showlogo` PDF links) is plain HTML, so a full browser is
+# rarely needed. Two interchangeable backends are provided:
+#
+#   * HttpScraper     - fetches and submits the pages with a pooled
+#                       requests.Session (cookies + CSRF token + CAPTCHA).
+#   * SeleniumScraper - the original flow, driving a pooled headless Chrome.
+#
+# Both hand out "scrape sessions": an open connection to the case status page
+# with its CAPTCHA already read, which the user-assisted flow keeps alive
+# between requests. ScraperChain tries the configured backends in order, so
+# the HTTP engine is used by default and Selenium acts as a fallback. Pages
+# are parsed with the shared parsers in parsers.py. Every request to the
+# court website runs through the shared Governor (see governor.py). Selenium
+# is only imported once the browser backend is actually used.
+# ==============================================================================
+
+import json
+from contextlib import nullcontext
+from urllib.parse import urljoin
+from governor import CircuitOpenError, SiteBusy
+from parsers import NO_RECORDS_TEXT, parse_case_results, parse_order_links, parse_case_type_options, parse_search_form
+from http_client import new_session
+from scrape_steps import (ScrapeSteps, rows_stable, table_redrawn, spinner_gone, orders_ready,
+                          CAPTCHA_CODE, RESULT_ROWS, RESULTS_SPINNER)
+
+
+# Default progress callback for callers that don't report progress
+def _no_progress(message):
+    pass
+
+
+# One request to the court website, limited by the governor if there is one
+def _court_request(governor):
+    return governor.request() if governor is not None else nullcontext()
+
+
+# ==============================================================================
+#  1. SELENIUM BACKEND
+# ==============================================================================
+
+class SeleniumSession:
+    def __init__(self, scraper, driver, steps, captcha_text):
+        self.scraper = scraper
+        self.driver = driver
+        self.steps = steps
+        self.captcha_text = captcha_text
+        self.backend = scraper.name
+
+    # Fills in and submits the search form in the live browser, then follows
+    # the "Orders" link. Returns (case_data, order_links) or None.
+    def search(self, case_type, case_number, case_year, captcha, progress=_no_progress):
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import Select
+        driver, steps = self.driver, self.steps
+        progress("Submitting the search form...")
+        with _court_request(self.scraper.governor):
+            with steps.step('submit'):
+                Select(driver.find_element(By.NAME, "case_type")).select_by_visible_text(case_type)
+                driver.find_element(By.NAME, "case_number").send_keys(case_number)
+                Select(driver.find_element(By.NAME, "case_year")).select_by_visible_text(case_year)
+                driver.find_element(By.ID, "captchaInput").send_keys(captcha)
+
+                # Remember the rows shown before submitting so we can tell when the table is redrawn
+                previous_rows = driver.find_elements(*RESULT_ROWS)
+
+                # Use a JavaScript click for robustness against overlapping elements
+                submit_button = driver.find_element(By.ID, "search")
+                driver.execute_script("arguments[0].click();", submit_button)
+
+            # Wait until the AJAX results have replaced the old rows, the loading
+            # spinner is gone and the row count has settled
+            progress("Waiting for the case results...")
+            steps.wait('results', table_redrawn(previous_rows), spinner_gone(RESULTS_SPINNER), rows_stable(RESULT_ROWS))
+        with steps.step('parse'):
+            case_data = parse_case_results(driver.page_source)
+        if case_data is None:
+            return None
+
+        order_links = []
+        if case_data['order_page_link']:
+            progress("Reading the orders page...")
+            with _court_request(self.scraper.governor):
+                with steps.step('page_load'):
+                    driver.get(case_data['order_page_link'])
+                steps.wait('orders', orders_ready())
+            with steps.step('parse'):
+                order_links = parse_order_links(driver.page_source)
+        return case_data, order_links
+
+    # Hands the browser back to the pool; discard it if it may be broken
+    def close(self, discard=False):
+        if self.driver is not None:
+            self.scraper.driver_pool.release(self.driver, discard=discard)
+            self.driver = None
+
+
+class SeleniumScraper:
+    name = 'selenium'
+
+    def __init__(self, driver_pool, url, timeouts, timings=None, governor=None):
+        self.driver_pool = driver_pool
+        self.url = url
+        self.timeouts = timeouts
+        self.timings = timings
+        self.governor = governor
+
+    # Checks out a browser, loads the case status page and reads the CAPTCHA
+    def open_session(self):
+        from selenium.webdriver.support import expected_conditions as EC
+        driver = self.driver_pool.acquire()
+        try:
+            steps = ScrapeSteps(driver, self.timeouts, self.timings)
+            driver.set_page_load_timeout(self.timeouts['page_load'])
+            with _court_request(self.governor):
+                with steps.step('page_load'):
+                    driver.get(self.url)
+                captcha_element = steps.wait('captcha', EC.presence_of_element_located(CAPTCHA_CODE))
+            return SeleniumSession(self, driver, steps, captcha_element.text)
+        except Exception:
+            self.driver_pool.release(driver, discard=True)
+            raise
+
+    def fetch_case_types(self):
+        with self.driver_pool.driver() as driver:
+            with _court_request(self.governor):
+                driver.get(self.url)
+            return parse_case_type_options(driver.page_source)
+
+
+# ==============================================================================
+#  2. HTTP BACKEND
+# ==============================================================================
+
+class HttpSession:
+    def __init__(self, scraper, http, steps, page_url, page_source):
+        self.scraper = scraper
+        self.http = http
+        self.steps = steps
+        self.page_url = page_url
+        self.backend = scraper.name
+
+        form = parse_search_form(page_source)
+        self.captcha_text = form['captcha_text']
+
+        # Remember the search form's target and its default fields (CSRF
+        # token, CAPTCHA id and any other hidden inputs) for the submission
+        self.form_method = form['method']
+        self.form_action = urljoin(page_url, form['action'] or page_url)
+        self.form_fields = form['fields']
+        self.captcha_field = form['captcha_field']
+
+        # Dropdowns are submitted by option value, but users pick by label
+        self.option_values = form['option_values']
+
+    def _option_value(self, field, label):
+        return self.option_values.get(field, {}).get(label, label)
+
+    # Turns a DataTables JSON payload into the same #caseTable markup the
+    # browser would have rendered, so both backends share one parser
+    def _results_markup(self, response):
+        if 'json' not in response.headers.get('Content-Type', ''):
+            return response.text
+        rows = json.loads(response.text).get('data') or []
+        if not rows:
+            return NO_RECORDS_TEXT
+        body = ""
+        for row in rows:
+            cells = row.values() if isinstance(row, dict) else row
+            body += "<tr>" + "".join(f"<td>{cell}</td>" for cell in cells) + "</tr>"
+        return f'<table id="caseTable"><tbody>{body}</tbody></table>'
+
+    def search(self, case_type, case_number, case_year, captcha, progress=_no_progress):
+        steps, timeouts = self.steps, self.scraper.timeouts
+        fields = dict(self.form_fields)
+        fields.update({
+            'case_type': self._option_value('case_type', case_type),
+            'case_number': case_number,
+            'case_year': self._option_value('case_year', case_year),
+            self.captcha_field: captcha,
+        })
+
+        # Submit the form the way the page's own AJAX call does
+        headers = {'X-Requested-With': 'XMLHttpRequest', 'Referer': self.page_url}
+        progress("Waiting for the case results...")
+        with _court_request(self.scraper.governor), steps.step('results'):
+            if self.form_method == 'post':
+                response = self.http.post(self.form_action, data=fields, headers=headers, timeout=timeouts['results'])
+            else:
+                response = self.http.get(self.form_action, params=fields, headers=headers, timeout=timeouts['results'])
+            response.raise_for_status()
+        with steps.step('parse'):
+            case_data = parse_case_results(self._results_markup(response))
+        if case_data is None:
+            return None
+
+        order_links = []
+        if case_data['order_page_link']:
+            case_data['order_page_link'] = urljoin(self.page_url, case_data['order_page_link'])
+            progress("Reading the orders page...")
+            with _court_request(self.scraper.governor), steps.step('orders'):
+                response = self.http.get(case_data['order_page_link'], headers={'Referer': self.page_url},
+                                         timeout=timeouts['orders'])
+                response.raise_for_status()
+            with steps.step('parse'):
+                order_links = parse_order_links(response.text)
+            for link in order_links:
+                link['url'] = urljoin(case_data['order_page_link'], link['url'])
+        return case_data, order_links
+
+    # Nothing to release: the connection pool is shared (see http_client.py)
+    def close(self, discard=False):
+        self.http = None
+
+
+class HttpScraper:
+    name = 'http'
+
+    def __init__(self, url, timeouts, timings=None, governor=None):
+        self.url = url
+        self.timeouts = timeouts
+        self.timings = timings
+        self.governor = governor
+
+    def _get_page(self, http, steps):
+        with _court_request(self.governor), steps.step('page_load'):
+            response = http.get(self.url, timeout=self.timeouts['page_load'])
+            response.raise_for_status()
+        return response.text
+
+    # Loads the case status page with a fresh cookie jar and reads the CAPTCHA
+    def open_session(self):
+        http = new_session()
+        steps = ScrapeSteps(None, self.timeouts, self.timings)
+        page_source = self._get_page(http, steps)
+        return HttpSession(self, http, steps, self.url, page_source)
+
+    def fetch_case_types(self):
+        page_source = self._get_page(new_session(), ScrapeSteps(None, self.timeouts, self.timings))
+        return parse_case_type_options(page_source)
+
+
+# ==============================================================================
+#  3. BACKEND SELECTION
+# ==============================================================================
+
+# Tries each backend in order until one succeeds
+class ScraperChain:
+    def __init__(self, backends):
+        self.backends = backends
+
+    def _first_success(self, action, what):
+        error = None
+        for backend in self.backends:
+            try:
+                return action(backend)
+            except (CircuitOpenError, SiteBusy):
+                # The limit applies to the site, so other backends would fail too
+                raise
+            except Exception as e:
+                print(f"The {backend.name} scraper could not {what}: {e}")
+                error = e
+        raise error
+
+    def open_session(self):
+        return self._first_success(lambda backend: backend.open_session(), "open a session")
+
+    def fetch_case_types(self):
+        return self._first_success(lambda backend: backend.fetch_case_types(), "fetch case types")
+
+    # Runs a whole lookup, reading the CAPTCHA automatically (used by the
+    # fully automated flow). A backend that fails mid-search is retried with
+    # the next one, since a new session brings its own CAPTCHA.
+    def lookup(self, case_type, case_number, case_year, progress=_no_progress):
+        def attempt(backend):
+            progress(f"Loading the court website ({backend.name})...")
+            scrape_session = backend.open_session()
+            try:
+                result = scrape_session.search(case_type, case_number, case_year, scrape_session.captcha_text, progress)
+            except Exception:
+                scrape_session.close(discard=True)
+                raise
+            scrape_session.close()
+            print(f"Scrape step timings ({backend.name}): {scrape_session.steps.summary()}")
+            return result
+        return self._first_success(attempt, "complete the lookup")
+
+
+# Builds the scraper chain from a list of backend names, e.g. ['http', 'selenium']
+def build_scraper(backend_names, url, timeouts, driver_pool, timings=None, governor=None):
+    available = {
+        'http': lambda: HttpScraper(url, timeouts, timings, governor),
+        'selenium': lambda: SeleniumScraper(driver_pool, url, timeouts, timings, governor),
+    }
+    return ScraperChain([available[name]() for name in backend_names])
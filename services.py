@@ -0,0 +1,174 @@
+# ==============================================================================
+#  services.py - Scraping, Caching and Summary Services Shared by Both Flows
+# ==============================================================================
+# Everything behind the routes that does not depend on how the CAPTCHA is
+# solved: the browser pool, the court governor, the scraper chain, the case
+# type catalog, the result cache, the PDF store and text extraction, the
+# summarizer and its prefetcher, the query log writer and the background
+# search jobs. create_app() (see court_app.py) builds one CourtServices per
+# app from its config; the captcha flows (see captcha_flows.py) use it for
+# their searches.
+#
+# Nothing here imports Selenium, Gemini or PyPDF2: the modules that need
+# them import them on first use, so building the services is cheap. start()
+# creates the database tables and starts the background threads; it runs in
+# each worker process (after any fork).
+# ==============================================================================
+
+import atexit
+from models import db
+from driver_pool import DriverPool, make_chrome_driver
+from case_types import CaseTypeCatalog
+from result_cache import ResultCache
+from governor import Governor
+from pdf_store import PdfStore
+from pdf_text import TextExtractor
+from summaries import Summarizer
+from prefetch import Prefetcher
+from scrape_steps import StepTimings
+from scrapers import build_scraper
+from jobs import JobQueue
+from query_log_writer import QueryLogWriter
+from tracing import tracer
+
+
+class CourtServices:
+    def __init__(self, app):
+        self.app = app
+        config = app.config
+
+        # A bounded pool of warm headless browsers shared by all requests
+        chrome_driver_path = config['CHROME_DRIVER_PATH']
+        self.driver_pool = DriverPool(lambda: make_chrome_driver(chrome_driver_path),
+                                      min_size=config['DRIVER_POOL_MIN_SIZE'],
+                                      max_size=config['DRIVER_POOL_MAX_SIZE'],
+                                      max_uses=config['DRIVER_POOL_MAX_USES'],
+                                      checkout_timeout=config['DRIVER_POOL_CHECKOUT_TIMEOUT'])
+        atexit.register(self.driver_pool.shutdown)
+
+        # How long each scrape step takes, aggregated across all lookups
+        self.scrape_timings = StepTimings()
+
+        # Rate limit, concurrency limit and circuit breaker for the court
+        # website. Each worker process gets its share of the limits.
+        processes = max(1, config['WORKER_PROCESSES'])
+        self.court_governor = Governor(rate=config['COURT_RATE'] / processes,
+                                       burst=max(1, config['COURT_BURST'] // processes),
+                                       max_in_flight=max(1, config['COURT_MAX_IN_FLIGHT'] // processes),
+                                       failure_threshold=config['COURT_FAILURE_THRESHOLD'],
+                                       reset_timeout=config['COURT_RESET_TIMEOUT'],
+                                       acquire_timeout=config['COURT_ACQUIRE_TIMEOUT'])
+
+        # The configured scraper backends, tried in order
+        self.scraper = build_scraper(config['SCRAPER_BACKENDS'], config['CASE_STATUS_URL'],
+                                     config['SCRAPE_STEP_TIMEOUTS'], self.driver_pool, self.scrape_timings,
+                                     self.court_governor)
+
+        # The "Case Type" dropdown options, cached in the database and refreshed
+        # in the background instead of being scraped on every homepage load
+        self.case_type_catalog = CaseTypeCatalog(app, self.scraper.fetch_case_types,
+                                                 refresh_interval=config['CASE_TYPES_REFRESH_INTERVAL'],
+                                                 retry_interval=config['CASE_TYPES_RETRY_INTERVAL'])
+
+        # Recent lookup results, stored in the database and reused for repeat searches
+        self.result_cache = ResultCache(max_age=config['RESULT_CACHE_MAX_AGE'])
+
+        # Downloaded order PDFs, kept on disk so /summarize doesn't re-download them
+        self.pdf_store = PdfStore(config['PDF_STORE_DIR'],
+                                  max_bytes=config['PDF_STORE_MAX_BYTES'],
+                                  revalidate_after=config['PDF_STORE_REVALIDATE_AFTER'],
+                                  governor=self.court_governor)
+        atexit.register(self.pdf_store.flush)
+
+        # AI summaries of order PDFs, cached in the database by content hash
+        self.text_extractor = TextExtractor(max_pages=config['PDF_MAX_PAGES'],
+                                            max_chars=config['PDF_MAX_CHARS'],
+                                            workers=config['PDF_EXTRACT_WORKERS'],
+                                            parallel_min_pages=config['PDF_PARALLEL_MIN_PAGES'])
+        atexit.register(self.text_extractor.shutdown)
+        self.summarizer = Summarizer(model_name=config['SUMMARY_MODEL'],
+                                     extractor=self.text_extractor,
+                                     chunk_chars=config['SUMMARY_CHUNK_CHARS'],
+                                     api_key=config['GEMINI_API_KEY'])
+
+        # Low-priority workers that summarize the newest orders of each search
+        self.prefetcher = Prefetcher(app, self.pdf_store, self.summarizer,
+                                     count=config['PREFETCH_ORDERS'],
+                                     workers=config['PREFETCH_WORKERS'],
+                                     max_queue=config['PREFETCH_QUEUE_SIZE'])
+        atexit.register(self.prefetcher.shutdown)
+
+        # Writes the search log on a background thread, off the request path
+        self.query_log_writer = QueryLogWriter(app, batch_size=config['QUERY_LOG_BATCH_SIZE'],
+                                               flush_interval=config['QUERY_LOG_FLUSH_INTERVAL'],
+                                               max_queue=config['QUERY_LOG_MAX_QUEUE'])
+        atexit.register(self.query_log_writer.shutdown)
+
+        # Background workers that run the scrapes so /search returns immediately
+        # (their state is kept in the database when other processes may poll it)
+        self.search_jobs = JobQueue(app, workers=config['JOB_WORKERS'], retention=config['JOB_RETENTION'],
+                                    shared=config['WORKER_PROCESSES'] > 1)
+        atexit.register(self.search_jobs.shutdown)
+
+    # Creates the tables and starts the background work (the old __main__
+    # start-up sequence of both apps)
+    def start(self):
+        # Ensure the database and its tables are created before the app starts
+        with self.app.app_context():
+            db.create_all()
+        # Add any missing query log indexes and start its writer thread
+        self.query_log_writer.start()
+        # Load the cached case types (refreshing them in the background if needed)
+        self.case_type_catalog.prefill()
+        # Warm up the browser pool only when Selenium is the primary backend;
+        # as a fallback its browsers (and Selenium itself) start on first use
+        if self.app.config['SCRAPER_BACKENDS'][:1] == ['selenium']:
+            self.driver_pool.start()
+        # Start the background summary prefetchers if enabled
+        if self.app.config['PREFETCH_ENABLED']:
+            self.prefetcher.start()
+
+    # --------------------------------------------------------------------------
+    # Search helpers used by the captcha flows
+    # --------------------------------------------------------------------------
+
+    # Logs a search and returns a recent cached result for it (case_data,
+    # order_links, fetched_at), or None if the case has to be scraped
+    def cached_lookup(self, case_type, case_number, case_year, force_refresh=False):
+        cached = self.result_cache.get(case_type, case_number, case_year, force_refresh=force_refresh)
+        self.query_log_writer.log(case_type, case_number, case_year, cache_hit=bool(cached))
+        if cached and self.app.config['PREFETCH_ENABLED']:
+            self.prefetcher.schedule(cached[1])
+        return cached
+
+    # Caches a fresh scrape result and returns it as a job result
+    def store_result(self, case_type, case_number, case_year, result):
+        if result is None:
+            return None
+        case_data, order_links = result
+        self.result_cache.put(case_type, case_number, case_year, case_data, order_links)
+        if self.app.config['PREFETCH_ENABLED']:
+            self.prefetcher.schedule(order_links)
+        return {'case_data': case_data, 'order_links': order_links}
+
+    # The last saved result of any age as a job result marked stale, for when
+    # the court website is not responding; None if the case was never saved
+    def stale_result(self, case_type, case_number, case_year):
+        stale = self.result_cache.get_stale(case_type, case_number, case_year)
+        if stale is None:
+            return None
+        case_data, order_links, fetched_at = stale
+        return {'case_data': case_data, 'order_links': order_links, 'cached_at': fetched_at.isoformat(), 'stale': True}
+
+    def stats(self):
+        return {'driver_pool': self.driver_pool.stats(),
+                'result_cache': self.result_cache.stats(),
+                'pdf_store': self.pdf_store.stats(),
+                'pdf_text': self.text_extractor.stats(),
+                'summaries': self.summarizer.stats(),
+                'prefetch': self.prefetcher.stats(),
+                'search_jobs': self.search_jobs.stats(),
+                'query_log': self.query_log_writer.stats(),
+                'scrape_steps': self.scrape_timings.stats(),
+                'court_governor': self.court_governor.stats(),
+                'tracing': tracer.stats()}
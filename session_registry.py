@@ -0,0 +1,148 @@
+# ==============================================================================
+#  session_registry.py - TTL-Bounded Registry of Live Scrape Sessions
+# ==============================================================================
+# The user-assisted flow keeps a browser open between showing the CAPTCHA and
+# receiving the search form. Visitors who never submit would otherwise leak
+# that browser forever, so entries here expire after a TTL, the oldest entry
+# is evicted once `max_sessions` is reached, and a background reaper thread
+# cleans up expired entries. Evicted values are handed to `on_evict` (e.g. to
+# return the browser to the pool). All access is guarded by a lock so the
+# registry is safe under a multi-threaded server.
+# ==============================================================================
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class SessionRegistry:
+    def __init__(self, ttl=300, max_sessions=4, on_evict=None, reap_interval=15):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.on_evict = on_evict
+        self.reap_interval = reap_interval
+
+        # session_id -> (value, expires_at), oldest first
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._reaper = None
+
+        # Counters exposed through stats()
+        self._added = 0
+        self._claimed = 0
+        self._expired = 0
+        self._evicted_lru = 0
+
+    # Runs the eviction callback outside the lock; a failing callback must
+    # never take the registry (or the reaper thread) down with it
+    def _evict(self, evicted):
+        for session_id, value in evicted:
+            if self.on_evict is None:
+                continue
+            try:
+                self.on_evict(session_id, value)
+            except Exception as e:
+                print(f"Error while evicting session {session_id}: {e}")
+
+    # Stores a value, evicting the least recently added entries if full
+    def put(self, session_id, value):
+        evicted = []
+        with self._lock:
+            old = self._entries.pop(session_id, None)
+            if old is not None:
+                evicted.append((session_id, old[0]))
+            while len(self._entries) >= self.max_sessions:
+                evicted.append(self._popitem_oldest())
+                self._evicted_lru += 1
+            self._entries[session_id] = (value, time.monotonic() + self.ttl)
+            self._added += 1
+        self._evict(evicted)
+
+    # Evicts the oldest entry whose value matches `predicate` (any entry if
+    # None). Returns True if one was evicted.
+    def evict_oldest(self, predicate=None):
+        with self._lock:
+            for session_id, (value, _) in self._entries.items():
+                if predicate is None or predicate(value):
+                    del self._entries[session_id]
+                    self._evicted_lru += 1
+                    break
+            else:
+                return False
+        self._evict([(session_id, value)])
+        return True
+
+    def _popitem_oldest(self):
+        session_id, (value, _) = self._entries.popitem(last=False)
+        return session_id, value
+
+    # Removes and returns the value for a session, or None if it is unknown
+    # or has already expired
+    def pop(self, session_id):
+        with self._lock:
+            entry = self._entries.pop(session_id, None)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                self._expired += 1
+                expired = True
+            else:
+                self._claimed += 1
+                expired = False
+        if expired:
+            self._evict([(session_id, value)])
+            return None
+        return value
+
+    # Evicts every expired entry; called periodically by the reaper thread
+    def reap(self):
+        now = time.monotonic()
+        evicted = []
+        with self._lock:
+            for session_id, (value, expires_at) in list(self._entries.items()):
+                if expires_at <= now:
+                    del self._entries[session_id]
+                    evicted.append((session_id, value))
+            self._expired += len(evicted)
+        self._evict(evicted)
+        return len(evicted)
+
+    def _reap_loop(self):
+        while not self._stop.wait(self.reap_interval):
+            reaped = self.reap()
+            if reaped:
+                print(f"Session reaper closed {reaped} abandoned session(s).")
+
+    # Starts the background reaper (safe to call more than once)
+    def start(self):
+        with self._lock:
+            if self._reaper is not None:
+                return
+            self._reaper = threading.Thread(target=self._reap_loop, name="session-reaper", daemon=True)
+        self._reaper.start()
+
+    # Stops the reaper and evicts every remaining entry
+    def shutdown(self):
+        self._stop.set()
+        with self._lock:
+            evicted = list((session_id, value) for session_id, (value, _) in self._entries.items())
+            self._entries.clear()
+        self._evict(evicted)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'active': len(self._entries),
+                'max_sessions': self.max_sessions,
+                'ttl_s': self.ttl,
+                'added': self._added,
+                'claimed': self._claimed,
+                'expired': self._expired,
+                'evicted_lru': self._evicted_lru,
+            }
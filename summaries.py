@@ -0,0 +1,294 @@
+# ==============================================================================
+#  summaries.py - Cached, De-duplicated AI Summaries of Order PDFs
+# ==============================================================================
+# Extracting a PDF's text and asking Gemini for a summary is the slowest and
+# most expensive thing either app does, and the same order is often
+# summarized again and again. Results are stored in the `summary_cache` table
+# keyed by the PDF's content hash, PROMPT_VERSION and the model name, so a
+# document is sent to the model once per prompt/model combination. A summary
+# is generated on a background thread that belongs to no single request;
+# every request for the same document subscribes to that one generation
+# (single flight), and a client that disconnects only stops listening. Text is
+# extracted page by page with the caps of pdf_text.TextExtractor, and text
+# longer than `chunk_chars` is summarized in parts whose summaries are then
+# combined (map-reduce) instead of being sent as one giant prompt.
+# stream() yields progress messages and the summary text as it is generated,
+# so the results page can show something within a second (see sse_event()).
+# The Gemini client is imported and configured when the first summary is
+# requested, not when the app starts. Must be used inside an app context.
+# ==============================================================================
+
+import datetime
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from types import SimpleNamespace
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from models import db, SummaryCache
+from pdf_text import TextExtractor, chunk_text
+from tracing import span, tracer
+
+# Bump PROMPT_VERSION whenever SUMMARY_PROMPT changes so that summaries made
+# with the old prompt are no longer served
+PROMPT_VERSION = 'v2'
+SUMMARY_PROMPT = ("Summarize the key points of the following court judgment in simple terms. "
+                  "Focus on the main argument and the final decision:\n\n{text}")
+CHUNK_PROMPT = ("The following is part {index} of {count} of a court judgment. Summarize the key "
+                "points of this part in simple terms, keeping any arguments, findings and "
+                "orders it contains:\n\n{text}")
+COMBINE_PROMPT = ("The following are summaries of consecutive parts of one court judgment. Combine "
+                  "them into a single summary in simple terms. Focus on the main argument and the "
+                  "final decision:\n\n{text}")
+
+
+# Raised when a PDF has no extractable text (e.g. a scanned image)
+class EmptyDocumentError(Exception):
+    pass
+
+
+# Formats one server-sent event; the data is JSON so newlines survive
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+# A local stand-in for Gemini, selected with SUMMARY_MODEL = 'stub', for
+# testing without an API key. It "summarizes" by echoing the start of the
+# text word by word, pausing `delay` seconds per word like a streamed reply.
+class StubModel:
+    def __init__(self, delay=0.05):
+        self.delay = delay
+
+    def generate_content(self, prompt, stream=False):
+        text = prompt.split("\n\n", 1)[-1]
+        words = ["Stub summary:"] + text.split()[:60]
+        if not stream:
+            return SimpleNamespace(text=" ".join(words))
+        return self._stream(words)
+
+    def _stream(self, words):
+        for index, word in enumerate(words):
+            time.sleep(self.delay)
+            yield SimpleNamespace(text=word if index == 0 else " " + word)
+
+
+# One summary being generated: the generator thread publishes its events
+# here and every request for the same key replays and follows them
+class _InFlight:
+    def __init__(self):
+        self.events = []    # ('status' | 'token', text), in order
+        self.done = False
+        self.error = None
+        self._cond = threading.Condition()
+
+    def publish(self, kind, text):
+        with self._cond:
+            self.events.append((kind, text))
+            self._cond.notify_all()
+
+    def finish(self, error=None):
+        with self._cond:
+            self.error = error
+            self.done = True
+            self._cond.notify_all()
+
+    # Yields every event from the first one on, waiting for new ones until
+    # the generation has finished (raising its error if it failed). Closing
+    # this generator only unsubscribes its caller.
+    def subscribe(self):
+        seen = 0
+        while True:
+            with self._cond:
+                while seen == len(self.events) and not self.done:
+                    self._cond.wait()
+                pending = self.events[seen:]
+                seen = len(self.events)
+                done, error = self.done, self.error
+            for event in pending:
+                yield event
+            if done:
+                if error is not None:
+                    raise error
+                return
+
+
+class Summarizer:
+    def __init__(self, model_name='gemini-1.5-flash', prompt_version=PROMPT_VERSION,
+                 extractor=None, chunk_chars=30000, map_workers=4, stub_delay=0.05, api_key=None):
+        self.model_name = model_name
+        self.api_key = api_key
+        self.prompt_version = prompt_version
+        self.extractor = extractor or TextExtractor()
+        self.chunk_chars = chunk_chars
+        self.map_workers = map_workers
+        self.stub_delay = stub_delay    # per-word delay of the 'stub' model
+
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._genai = None
+
+        # Counters exposed through stats()
+        self._hits = 0
+        self._misses = 0
+        self._coalesced = 0
+        self._texts_reused = 0
+        self._model_calls = 0
+        self._chunked = 0
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    # Returns the summary of a PdfDocument (see pdf_store.py), generating it
+    # only if no summary is stored for this document, prompt and model
+    def summarize(self, document):
+        return "".join(text for kind, text in self.stream(document) if kind == 'token')
+
+    # Yields ('status', message) progress updates and ('token', text) pieces
+    # of the summary as they are produced. The first request for a document
+    # starts its generation on a background thread; later ones join it and
+    # receive the same events, so each document is generated once.
+    def stream(self, document):
+        key = (document.sha256, self.prompt_version, self.model_name)
+        with self._lock:
+            flight = self._in_flight.get(key)
+            joined = flight is not None
+            if joined:
+                self._coalesced += 1
+            else:
+                flight = self._in_flight[key] = _InFlight()
+
+        if joined:
+            yield 'status', "Waiting for the summary already being generated..."
+        else:
+            threading.Thread(target=self._run_flight, name='summary-generator', daemon=True,
+                             args=(current_app._get_current_object(), key, flight, document)).start()
+        yield from flight.subscribe()
+
+    # Runs on the generator thread: publishes the events of one generation,
+    # whether or not anyone is still listening
+    def _run_flight(self, app, key, flight, document):
+        error = None
+        try:
+            with app.app_context():
+                for kind, text in self._generate(document):
+                    flight.publish(kind, text)
+        except Exception as e:
+            error = e
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            flight.finish(error)
+
+    def _generate(self, document):
+        row = SummaryCache.query.filter_by(content_sha256=document.sha256,
+                                           prompt_version=self.prompt_version,
+                                           model_name=self.model_name).first()
+        if row is not None:
+            self._count('_hits')
+            yield 'token', row.summary
+            return
+        self._count('_misses')
+
+        # Text extracted for an earlier prompt or model is still valid
+        earlier = SummaryCache.query.filter_by(content_sha256=document.sha256).first()
+        note = ""
+        if earlier is not None:
+            self._count('_texts_reused')
+            pdf_text = earlier.extracted_text
+        else:
+            yield 'status', "Extracting text from the document..."
+            extracted = self.extractor.extract(document.path)
+            pdf_text = extracted.text
+            if extracted.truncated:
+                note = f"\n\n(This summary is based on the first {extracted.pages_read} of {extracted.page_count} pages.)"
+        if not pdf_text.strip():
+            raise EmptyDocumentError("Could not extract text from the PDF.")
+
+        # Long text is summarized in parts first (map), in parallel, and the
+        # final prompt combines the partial summaries (reduce)
+        chunks = chunk_text(pdf_text, self.chunk_chars)
+        if len(chunks) <= 1:
+            prompt = SUMMARY_PROMPT.format(text=pdf_text)
+        else:
+            self._count('_chunked')
+            yield 'status', f"Summarizing a long document in {len(chunks)} parts..."
+            partial_summaries = [None] * len(chunks)
+            with ThreadPoolExecutor(max_workers=self.map_workers, thread_name_prefix='summary-map') as executor:
+                futures = {executor.submit(self._ask_model, CHUNK_PROMPT.format(index=index + 1, count=len(chunks), text=chunk)): index
+                           for index, chunk in enumerate(chunks)}
+                for done, future in enumerate(as_completed(futures), 1):
+                    partial_summaries[futures[future]] = future.result()
+                    yield 'status', f"Summarized part {done} of {len(chunks)}..."
+            prompt = COMBINE_PROMPT.format(text="\n\n".join(partial_summaries))
+
+        yield 'status', "Generating the summary..."
+        pieces = []
+        for text in self._ask_model(prompt, stream=True):
+            pieces.append(text)
+            yield 'token', text
+        if note:
+            pieces.append(note)
+            yield 'token', note
+
+        self._store(document, pdf_text, "".join(pieces))
+
+    def _store(self, document, pdf_text, summary):
+        db.session.add(SummaryCache(content_sha256=document.sha256,
+                                    prompt_version=self.prompt_version,
+                                    model_name=self.model_name,
+                                    extracted_text=pdf_text,
+                                    summary=summary,
+                                    created_at=datetime.datetime.now()))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Another process stored the same summary first
+            db.session.rollback()
+
+    def _model(self):
+        if self.model_name == 'stub':
+            return StubModel(self.stub_delay)
+        with self._lock:
+            if self._genai is None:
+                import google.generativeai as genai
+                genai.configure(api_key=self.api_key)
+                self._genai = genai
+        return self._genai.GenerativeModel(self.model_name)
+
+    # Returns the model's reply, or with stream=True an iterator over its
+    # pieces as they arrive
+    def _ask_model(self, prompt, stream=False):
+        self._count('_model_calls')
+        if not stream:
+            with span('llm.generate'):
+                return self._model().generate_content(prompt).text
+        return self._stream_model(prompt)
+
+    # Yields the streamed reply, timing the first piece and the whole reply
+    def _stream_model(self, prompt):
+        started = time.monotonic()
+        first = True
+        for chunk in self._model().generate_content(prompt, stream=True):
+            if first:
+                tracer.record('llm.first_token', time.monotonic() - started)
+                first = False
+            yield chunk.text
+        tracer.record('llm.generate', time.monotonic() - started)
+
+    def stats(self):
+        with self._lock:
+            requests = self._hits + self._misses + self._coalesced
+            return {
+                'model': self.model_name,
+                'prompt_version': self.prompt_version,
+                'hits': self._hits,
+                'misses': self._misses,
+                'coalesced': self._coalesced,
+                'texts_reused': self._texts_reused,
+                'model_calls': self._model_calls,
+                'chunked_documents': self._chunked,
+                'in_flight': len(self._in_flight),
+                'hit_rate': round((self._hits + self._coalesced) / requests, 3) if requests else 0.0,
+            }
@@ -0,0 +1,76 @@
+# ==============================================================================
+#  test_case_types.py - Tests for the Cached Case Type Catalog
+# ==============================================================================
+# Run from the repository root with: python -m pytest -q
+# ==============================================================================
+
+import datetime
+import os
+import sys
+import time
+import pytest
+from flask import Flask
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import db
+from case_types import CaseTypeCatalog
+
+OPTIONS = [{'value': '1', 'text': 'W.P.(C)'}]
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'test.db'}"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+
+# Counts the scrapes and returns whatever `result` holds at the time
+class FakeFetch:
+    def __init__(self, result):
+        self.result = result
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.result
+
+
+# With nothing cached, a scrape that comes back empty is not repeated on
+# every homepage hit, only once the retry interval has passed
+def test_empty_refresh_is_not_retried_before_retry_interval(app):
+    fetch = FakeFetch([])
+    catalog = CaseTypeCatalog(app, fetch, retry_interval=0.3)
+    for _ in range(5):
+        assert catalog.get() == []
+    assert fetch.calls == 1
+
+    time.sleep(0.35)
+    fetch.result = OPTIONS
+    assert catalog.get() == OPTIONS
+    assert fetch.calls == 2
+
+
+# A stale list keeps being served while a failing background refresh is
+# retried at most once per retry interval
+def test_failing_background_refresh_is_backed_off(app):
+    fetch = FakeFetch(OPTIONS)
+    catalog = CaseTypeCatalog(app, fetch, refresh_interval=3600, retry_interval=0.3)
+    assert catalog.get() == OPTIONS
+
+    def fail():
+        fetch.calls += 1
+        raise RuntimeError("court page did not load")
+    catalog.fetch = fail
+    catalog._refreshed_at -= datetime.timedelta(hours=2)
+    time.sleep(0.35)
+    for _ in range(5):
+        assert catalog.get() == OPTIONS
+        time.sleep(0.02)
+    assert fetch.calls == 2
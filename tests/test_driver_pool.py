@@ -0,0 +1,121 @@
+# ==============================================================================
+#  test_driver_pool.py - Tests for the Warm Browser Pool
+# ==============================================================================
+# Run from the repository root with: python -m pytest -q
+# ==============================================================================
+
+import os
+import sys
+import threading
+import time
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from driver_pool import DriverPool, PoolExhausted
+
+
+# Stands in for a Selenium driver: records what the pool does with it
+class FakeDriver:
+    def __init__(self):
+        self.alive = True
+        self.quit_called = False
+        self.pages = []
+
+    def execute_script(self, script):
+        if not self.alive:
+            raise RuntimeError("browser has gone away")
+        return 1
+
+    def delete_all_cookies(self):
+        pass
+
+    def get(self, url):
+        self.pages.append(url)
+
+    def quit(self):
+        self.quit_called = True
+
+
+# Starts FakeDrivers (after `start_delay` seconds) and keeps them all
+class FakeFactory:
+    def __init__(self, start_delay=0.0):
+        self.start_delay = start_delay
+        self.created = []
+
+    def __call__(self):
+        time.sleep(self.start_delay)
+        driver = FakeDriver()
+        self.created.append(driver)
+        return driver
+
+
+# Many threads checking browsers out at once never make the pool start more
+# than max_size of them, and every thread is served in turn
+def test_concurrent_checkouts_stay_within_max_size():
+    factory = FakeFactory(start_delay=0.02)
+    pool = DriverPool(factory, min_size=0, max_size=2, checkout_timeout=5)
+    in_use = []
+    peak = []
+    lock = threading.Lock()
+
+    def worker():
+        with pool.driver() as driver:
+            with lock:
+                in_use.append(driver)
+                peak.append(len(in_use))
+            time.sleep(0.02)
+            with lock:
+                in_use.remove(driver)
+
+    threads = [threading.Thread(target=worker) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = pool.stats()
+    assert len(factory.created) == 2
+    assert max(peak) <= 2
+    assert stats['checkouts'] == 10
+    assert stats['in_use'] == 0 and stats['idle'] == 2
+    assert stats['checkouts_that_waited'] > 0
+
+
+# A browser that stopped answering is dropped at checkout and replaced
+def test_dead_idle_browser_is_replaced():
+    factory = FakeFactory()
+    pool = DriverPool(factory, min_size=1, max_size=1)
+    pool.prefill()
+    dead = factory.created[0]
+    dead.alive = False
+
+    driver = pool.acquire()
+    assert driver is not dead
+    assert dead.quit_called
+    assert pool.stats()['failed_health_checks'] == 1
+    pool.release(driver)
+
+
+# A browser is quit after max_uses checkouts and otherwise reset between users
+def test_browser_is_recycled_after_max_uses():
+    factory = FakeFactory()
+    pool = DriverPool(factory, min_size=0, max_size=1, max_uses=2)
+    first = pool.acquire()
+    pool.release(first)
+    assert first.pages == ['about:blank']
+    assert pool.acquire() is first
+    pool.release(first)
+    assert first.quit_called
+    assert pool.stats()['recycled'] == 1
+
+
+# With every browser taken and nothing to reclaim, checkout gives up
+def test_checkout_times_out_when_exhausted():
+    pool = DriverPool(FakeFactory(), min_size=0, max_size=1)
+    driver = pool.acquire()
+    with pytest.raises(PoolExhausted):
+        pool.acquire(timeout=0.1)
+    assert pool.stats()['checkout_timeouts'] == 1
+    pool.release(driver)
+
@@ -0,0 +1,113 @@
+# ==============================================================================
+#  test_governor.py - Tests for the Limits on Requests to the Court Website
+# ==============================================================================
+# Run from the repository root with: python -m pytest -q
+# ==============================================================================
+
+import os
+import sys
+import threading
+import time
+import pytest
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from governor import Governor, CircuitOpenError, SiteBusy, CLOSED, OPEN
+
+
+# Runs one governed request that fails the way a down court website does
+def _fail(governor):
+    with pytest.raises(requests.ConnectionError):
+        with governor.request():
+            raise requests.ConnectionError("connection refused")
+
+
+# After failure_threshold failures in a row requests are refused at once;
+# after reset_timeout a single trial goes through and its success closes
+# the circuit again
+def test_circuit_opens_and_closes():
+    governor = Governor(rate=100, burst=100, failure_threshold=3, reset_timeout=0.2)
+    for _ in range(3):
+        _fail(governor)
+    assert governor.is_open()
+
+    started = time.monotonic()
+    with pytest.raises(CircuitOpenError):
+        with governor.request():
+            pass
+    assert time.monotonic() - started < 0.1
+
+    time.sleep(0.25)
+    with governor.request():
+        pass
+    stats = governor.stats()
+    assert stats['state'] == CLOSED
+    assert stats['times_opened'] == 1
+    assert stats['rejected_while_open'] == 1
+
+
+# A failed half-open trial opens the circuit again straight away
+def test_failed_trial_reopens_circuit():
+    governor = Governor(rate=100, burst=100, failure_threshold=1, reset_timeout=0.1)
+    _fail(governor)
+    time.sleep(0.15)
+    _fail(governor)
+    assert governor.stats()['state'] == OPEN
+    assert governor.is_open()
+
+
+# Errors that don't point at the site being down (e.g. a changed page
+# layout) don't count towards opening the circuit
+def test_non_site_errors_do_not_open_circuit():
+    governor = Governor(failure_threshold=1)
+    with pytest.raises(ValueError):
+        with governor.request():
+            raise ValueError("table not found")
+    assert governor.stats()['state'] == CLOSED
+
+
+# Concurrent callers never have more than max_in_flight requests running
+def test_in_flight_limit_under_concurrency():
+    governor = Governor(rate=1000, burst=1000, max_in_flight=2)
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def worker():
+        with governor.request():
+            with lock:
+                running.append(1)
+                peak.append(len(running))
+            time.sleep(0.02)
+            with lock:
+                running.pop()
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert max(peak) == 2
+    assert governor.stats()['requests'] == 8
+
+
+# After the burst is spent requests are spaced out at `rate` per second
+def test_token_bucket_limits_rate():
+    governor = Governor(rate=20, burst=2, max_in_flight=10)
+    started = time.monotonic()
+    for _ in range(6):
+        with governor.request():
+            pass
+    # 2 from the burst, then 4 more at 20 per second
+    assert time.monotonic() - started >= 0.18
+
+
+# A caller that can't get a slot within acquire_timeout gets SiteBusy
+def test_site_busy_after_acquire_timeout():
+    governor = Governor(rate=100, burst=100, max_in_flight=1, acquire_timeout=0.1)
+    with governor.request():
+        with pytest.raises(SiteBusy):
+            with governor.request():
+                pass
+    assert governor.stats()['busy_timeouts'] == 1
@@ -0,0 +1,80 @@
+# ==============================================================================
+#  test_http_scraper.py - Tests for the Browserless Scraper
+# ==============================================================================
+# Runs the HTTP backend against the stand-in court website from
+# benchmarks/mock_court.py, served on a free local port.
+#
+# Run from the repository root with: python -m pytest -q
+# ==============================================================================
+
+import os
+import sys
+import threading
+import pytest
+from werkzeug.serving import make_server
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+import mock_court
+from governor import Governor
+from scrapers import HttpScraper, ScraperChain
+
+TIMEOUTS = {'page_load': 10, 'captcha': 10, 'results': 10, 'orders': 10}
+
+
+@pytest.fixture(scope='module')
+def court_url():
+    server = make_server('127.0.0.1', 0, mock_court.app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/app/get-case-type-status"
+    server.shutdown()
+
+
+# A backend that always fails, to check the chain moves on to the next one
+class BrokenBackend:
+    name = 'broken'
+
+    def open_session(self):
+        raise RuntimeError("Chrome did not start")
+
+    def fetch_case_types(self):
+        raise RuntimeError("Chrome did not start")
+
+
+# The case type dropdown is read from the page without a browser
+def test_fetch_case_types(court_url):
+    options = HttpScraper(court_url, TIMEOUTS).fetch_case_types()
+    assert len(options) > 100
+    assert all(option for option in options)
+
+
+# A full lookup reads the CAPTCHA, submits the search with the CSRF token
+# and follows the orders link, all through the governor
+def test_lookup_returns_case_and_orders(court_url):
+    governor = Governor(rate=100, burst=100)
+    scraper = ScraperChain([HttpScraper(court_url, TIMEOUTS, governor=governor)])
+    case_data, order_links = scraper.lookup('W.P.(C)', '1234', '2023')
+
+    assert 'W.P.(C) 1234/2023' in case_data['diary_no']
+    assert case_data['order_page_link'].startswith('http://127.0.0.1:')
+    assert len(order_links) == mock_court.app.config['ORDERS']
+    assert all(link['url'].startswith('http://127.0.0.1:') and '/app/showlogo/' in link['url']
+               for link in order_links)
+    # Page load, search and orders page
+    assert governor.stats()['requests'] == 3
+
+
+# The court's "no records" answer comes back as None, not as an error
+def test_lookup_without_records(court_url):
+    scraper = ScraperChain([HttpScraper(court_url, TIMEOUTS)])
+    assert scraper.lookup('W.P.(C)', '0999', '2023') is None
+
+
+# A lookup that fails on one backend is retried on the next one
+def test_chain_falls_back_to_next_backend(court_url):
+    scraper = ScraperChain([BrokenBackend(), HttpScraper(court_url, TIMEOUTS)])
+    case_data, _ = scraper.lookup('W.P.(C)', '42', '2021')
+    assert '42/2021' in case_data['diary_no']
@@ -0,0 +1,81 @@
+# ==============================================================================
+#  test_pdf_store.py - Tests for Blob Clean-Up in the PDF Store
+# ==============================================================================
+# Serves "PDFs" from a local HTTP server whose content can be changed.
+# Run from the repository root with: python -m pytest -q
+# ==============================================================================
+
+import http.server
+import os
+import sys
+import threading
+import time
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pdf_store
+from pdf_store import PdfStore
+
+
+@pytest.fixture
+def server():
+    content = {'version': b'one'}
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = b'%PDF-1.4 ' + content['version'] + b' ' + self.path.encode()
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{httpd.server_port}', content
+    httpd.shutdown()
+
+
+@pytest.fixture
+def short_grace(monkeypatch):
+    monkeypatch.setattr(pdf_store, 'BLOB_IN_USE_SECONDS', 0.2)
+
+
+def _blobs_on_disk(store):
+    return sum(len(files) for _, _, files in os.walk(os.path.join(store.directory, 'blobs')))
+
+
+# A URL whose content changed leaves no orphaned blob behind
+def test_changed_content_removes_old_blob(server, short_grace, tmp_path):
+    base, content = server
+    store = PdfStore(str(tmp_path), revalidate_after=0)
+    old = store.fetch(base + '/a.pdf')
+    content['version'] = b'two'
+    new = store.fetch(base + '/a.pdf')
+
+    assert new.sha256 != old.sha256
+    # The old blob was handed out just now, so it is kept for a moment
+    assert os.path.exists(old.path)
+    time.sleep(0.3)
+    store.flush()
+    assert not os.path.exists(old.path)
+    assert os.path.exists(new.path)
+    assert _blobs_on_disk(store) == 1
+
+
+# Eviction keeps the store within max_bytes once recently handed-out blobs
+# are no longer in use, and never deletes one that was just returned
+def test_eviction_respects_max_bytes_and_recent_documents(server, short_grace, tmp_path):
+    base, _ = server
+    store = PdfStore(str(tmp_path), max_bytes=200)
+    documents = [store.fetch(f'{base}/doc{i}.pdf') for i in range(20)]
+
+    assert store.stats()['bytes'] <= 200
+    assert all(os.path.exists(document.path) for document in documents)
+    time.sleep(0.3)
+    store.fetch(base + '/last.pdf')
+    assert _blobs_on_disk(store) == store.stats()['documents']
+    assert store.stats()['bytes'] <= 200
@@ -0,0 +1,97 @@
+# ==============================================================================
+#  test_query_log_writer.py - Tests for the Batched Query Log Writer
+# ==============================================================================
+# Run from the repository root with: python -m pytest -q
+# ==============================================================================
+
+import datetime
+import os
+import sys
+import time
+import pytest
+from flask import Flask
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import db, QueryLog, QueryTypeRollup
+from query_log_writer import QueryLogWriter, MAX_ATTEMPTS
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'test.db'}"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+
+def _logged_rows(app):
+    with app.app_context():
+        return db.session.query(QueryLog).count()
+
+
+# Waits up to `timeout` seconds for `expected` rows to reach the table
+def _wait_for_rows(app, expected, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if _logged_rows(app) >= expected:
+            return True
+        time.sleep(0.05)
+    return _logged_rows(app) >= expected
+
+
+# A single search on a quiet site is written within the flush interval,
+# without waiting for a full batch or for shutdown
+def test_single_row_is_written_within_flush_interval(app):
+    writer = QueryLogWriter(app, batch_size=200, flush_interval=0.5)
+    writer.start()
+    try:
+        writer.log('W.P.(C)', '7', '2020')
+        assert _wait_for_rows(app, 1, timeout=2.0)
+        assert writer.stats()['queued'] == 0
+    finally:
+        writer.shutdown()
+
+
+# A search missing a case detail is dropped on arrival instead of failing
+# the batch it would have been written with
+def test_row_missing_case_details_is_dropped(app):
+    writer = QueryLogWriter(app, batch_size=200, flush_interval=0.2)
+    writer.start()
+    try:
+        writer.log(None, '1', '2020')
+        writer.log('W.P.(C)', '7', '2020')
+        assert _wait_for_rows(app, 1, timeout=2.0)
+        stats = writer.stats()
+        assert stats['dropped'] == 1
+        assert stats['failed_batches'] == 0
+    finally:
+        writer.shutdown()
+
+
+# A batch the database keeps rejecting loses only its bad row: the other
+# searches (and their rollups) are still written
+def test_failing_batch_drops_only_the_rejected_row(app):
+    writer = QueryLogWriter(app, batch_size=200, flush_interval=60)
+    writer.start()
+    try:
+        for number in ('1', '2', '3'):
+            writer.log('W.P.(C)', number, '2020')
+        # Bypasses log()'s check, as a row the table rejects
+        writer._enqueue(('search', {'case_type': None, 'case_number': '4', 'case_year': '2020',
+                                    'timestamp': datetime.datetime.now()}, False))
+        writer.log('W.P.(C)', '5', '2020')
+        for _ in range(MAX_ATTEMPTS):
+            writer.flush()
+        assert _logged_rows(app) == 4
+        stats = writer.stats()
+        assert stats['dropped'] == 1
+        assert stats['queued'] == 0
+        with app.app_context():
+            assert db.session.get(QueryTypeRollup, 'W.P.(C)').searches == 4
+    finally:
+        writer.shutdown()
@@ -0,0 +1,123 @@
+# ==============================================================================
+#  test_session_registry.py - Tests for the Registry of Live Scrape Sessions
+# ==============================================================================
+# Run from the repository root with: python -m pytest -q
+# ==============================================================================
+
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from driver_pool import DriverPool
+from session_registry import SessionRegistry
+
+
+# Collects the evicted sessions
+class Evictions:
+    def __init__(self):
+        self.evicted = []
+        self._lock = threading.Lock()
+
+    def __call__(self, session_id, value):
+        with self._lock:
+            self.evicted.append(session_id)
+
+
+# Stands in for a Selenium driver that the pool health-checks and resets
+class FakeDriver:
+    def execute_script(self, script):
+        return 1
+
+    def delete_all_cookies(self):
+        pass
+
+    def get(self, url):
+        pass
+
+    def quit(self):
+        pass
+
+
+# Once full, adding a session evicts the oldest one
+def test_oldest_session_is_evicted_when_full():
+    evictions = Evictions()
+    registry = SessionRegistry(max_sessions=2, on_evict=evictions)
+    for session_id in ('a', 'b', 'c'):
+        registry.put(session_id, session_id.upper())
+    assert evictions.evicted == ['a']
+    assert registry.pop('a') is None
+    assert registry.pop('c') == 'C'
+    assert registry.stats()['evicted_lru'] == 1
+
+
+# Expired sessions can't be claimed and are handed to on_evict by the reaper
+def test_expired_sessions_are_reaped():
+    evictions = Evictions()
+    registry = SessionRegistry(ttl=0.1, on_evict=evictions)
+    registry.put('a', 'A')
+    registry.put('b', 'B')
+    time.sleep(0.15)
+    assert registry.pop('a') is None
+    assert registry.reap() == 1
+    assert sorted(evictions.evicted) == ['a', 'b']
+    assert len(registry) == 0
+
+
+# When many threads race to claim the same session, exactly one gets it
+def test_concurrent_pop_claims_a_session_once():
+    registry = SessionRegistry(max_sessions=50)
+    for i in range(50):
+        registry.put(i, f"driver-{i}")
+    claimed = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(8)
+
+    def worker():
+        barrier.wait()
+        for i in range(50):
+            value = registry.pop(i)
+            if value is not None:
+                with lock:
+                    claimed.append(value)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(claimed) == sorted(f"driver-{i}" for i in range(50))
+    assert registry.stats()['claimed'] == 50
+
+
+# on_evict runs outside the lock, so it may use the registry itself
+def test_eviction_callback_may_use_the_registry():
+    registry = SessionRegistry(max_sessions=1)
+    seen = []
+    registry.on_evict = lambda session_id, value: seen.append((session_id, len(registry)))
+    registry.put('a', 'A')
+    registry.put('b', 'B')
+    assert seen == [('a', 1)]
+    assert registry.evict_oldest(lambda value: value == 'B')
+    assert seen[-1] == ('b', 0)
+    assert not registry.evict_oldest()
+
+
+# A browser parked in the session registry (a visitor who never submitted
+# the CAPTCHA) is reclaimed when the pool runs out, instead of the next
+# visitor waiting out the checkout timeout
+def test_exhausted_pool_reclaims_parked_session():
+    pool = DriverPool(FakeDriver, min_size=0, max_size=1, checkout_timeout=5)
+    registry = SessionRegistry(ttl=300, max_sessions=4,
+                               on_evict=lambda session_id, driver: pool.release(driver, discard=True))
+    pool.on_exhausted = registry.evict_oldest
+    registry.put('abandoned', pool.acquire())
+
+    started = time.monotonic()
+    driver = pool.acquire()
+    assert time.monotonic() - started < 1
+    assert len(registry) == 0
+    assert pool.stats()['reclaimed'] == 1
+    pool.release(driver)
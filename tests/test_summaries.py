@@ -0,0 +1,111 @@
+# ==============================================================================
+#  test_summaries.py - Tests for Single-Flight Summary Streaming
+# ==============================================================================
+# Uses the 'stub' model and a stand-in text extractor, so no API key or PDF
+# is needed. Run from the repository root with: python -m pytest -q
+# ==============================================================================
+
+import os
+import sys
+import threading
+from types import SimpleNamespace
+import pytest
+from flask import Flask
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import db, SummaryCache
+from pdf_text import ExtractedText
+from summaries import Summarizer
+
+DOCUMENT = SimpleNamespace(sha256='ab' * 32, path='unused.pdf')
+
+
+# Returns the same text for any PDF, counting how often it was asked
+class FakeExtractor:
+    def __init__(self):
+        self.calls = 0
+
+    def extract(self, path):
+        self.calls += 1
+        return ExtractedText("The petition is allowed and the order is set aside.", 1, 1, False)
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'test.db'}"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+
+@pytest.fixture
+def summarizer():
+    return Summarizer(model_name='stub', extractor=FakeExtractor(), stub_delay=0.02)
+
+
+def _tokens(events):
+    return "".join(text for kind, text in events if kind == 'token')
+
+
+# Reads a whole stream on its own thread (as a separate request would)
+def _read_stream(app, summarizer, results, started=None):
+    with app.app_context():
+        stream = summarizer.stream(DOCUMENT)
+        events = [next(stream)]
+        if started is not None:
+            started.set()
+        events.extend(stream)
+        results.append(_tokens(events))
+
+
+# Concurrent requests for one document share a single generation
+def test_concurrent_streams_share_one_generation(app, summarizer):
+    results = []
+    started = threading.Event()
+    first = threading.Thread(target=_read_stream, args=(app, summarizer, results, started))
+    first.start()
+    started.wait(5)
+    others = [threading.Thread(target=_read_stream, args=(app, summarizer, results)) for _ in range(3)]
+    for thread in others:
+        thread.start()
+    for thread in [first] + others:
+        thread.join(10)
+
+    assert len(results) == 4
+    assert len(set(results)) == 1 and results[0].startswith("Stub summary:")
+    stats = summarizer.stats()
+    assert stats['model_calls'] == 1
+    assert stats['coalesced'] == 3
+    assert summarizer.extractor.calls == 1
+
+
+# The request that started a generation disconnecting does not fail the
+# requests that joined it, and the summary is still stored
+def test_first_client_disconnect_does_not_cancel_generation(app, summarizer):
+    with app.app_context():
+        leader = summarizer.stream(DOCUMENT)
+        first_token = next(event for event in leader if event[0] == 'token')
+        follower = summarizer.stream(DOCUMENT)
+        assert next(follower) == ('status', "Waiting for the summary already being generated...")
+        # The client that started the generation goes away mid-summary
+        leader.close()
+        summary = _tokens(list(follower))
+
+    assert summary.startswith(first_token[1] + " The petition is allowed")
+    assert summarizer.stats()['model_calls'] == 1
+    with app.app_context():
+        assert SummaryCache.query.filter_by(content_sha256=DOCUMENT.sha256).one().summary == summary
+
+
+# A failed generation is reported to every request that joined it
+def test_generation_error_reaches_every_subscriber(app, summarizer):
+    summarizer.extractor.extract = lambda path: ExtractedText("   ", 1, 1, False)
+    with app.app_context():
+        stream = summarizer.stream(DOCUMENT)
+        with pytest.raises(Exception, match="Could not extract text"):
+            list(stream)
@@ -0,0 +1,274 @@
+# ==============================================================================
+#  tracing.py - Per-Request Timing Spans, Histograms and a Slow-Request Log
+# ==============================================================================
+# Each web request (and each background job) is a trace. Code anywhere in
+# the apps times a stage with `with span('stage.name'):`; the duration is
+# added to the current trace, if there is one, and to a latency histogram for
+# that stage. Instrumented stages:
+#
+#   browser.start, browser.checkout     driver_pool.py
+#   scrape.<step>                       every ScrapeSteps step (page load,
+#                                       CAPTCHA, results, orders, parse)
+#   db.query, db.commit                 every SQL statement / commit
+#   pdf.fetch, pdf.extract              pdf_store.py, pdf_text.py
+#   llm.generate, llm.first_token       summaries.py
+#
+# render_metrics() exposes the histograms in the Prometheus text format (the
+# /metrics route). Requests slower than the configured threshold are
+# printed, appended as JSON lines to the slow-request log and kept in memory
+# with their full span breakdown.
+# ==============================================================================
+
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_current_trace = contextvars.ContextVar('current_trace', default=None)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+
+
+# One traced request or job: the spans recorded while it was running
+class Trace:
+    def __init__(self, name, details=None):
+        self.name = name
+        self.details = details or {}
+        self.started = time.monotonic()
+        self.started_at = time.time()
+        self.spans = []         # (stage, offset_s, duration_s)
+        self.duration = None
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'details': self.details,
+            'started_at': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.started_at)),
+            'duration_s': round(self.duration, 3) if self.duration is not None else None,
+            'spans': [{'stage': stage, 'offset_s': round(offset, 3), 'duration_s': round(duration, 3)}
+                      for stage, offset, duration in self.spans],
+        }
+
+
+class Tracer:
+    def __init__(self, slow_threshold=2.0, slow_log_path=None, slow_log_size=50, buckets=DEFAULT_BUCKETS):
+        self.slow_threshold = slow_threshold
+        self.slow_log_path = slow_log_path
+        self.buckets = buckets
+
+        self._lock = threading.Lock()
+        self._requests = {}     # trace name -> Histogram
+        self._stages = {}       # stage -> Histogram
+        self._slow = deque(maxlen=slow_log_size)
+        self._slow_count = 0
+        self._sqlalchemy_instrumented = False
+
+    def configure(self, slow_threshold=None, slow_log_path=None):
+        if slow_threshold is not None:
+            self.slow_threshold = slow_threshold
+        if slow_log_path is not None:
+            self.slow_log_path = slow_log_path
+
+    def _observe(self, histograms, key, value):
+        with self._lock:
+            histogram = histograms.get(key)
+            if histogram is None:
+                histogram = histograms[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    # --------------------------------------------------------------------------
+    # Traces and spans
+    # --------------------------------------------------------------------------
+
+    # Starts a trace in the current context and returns its reset token
+    def begin(self, name, details=None):
+        return _current_trace.set(Trace(name, details))
+
+    # Ends the trace started by begin(): records it and logs it if slow
+    def end(self, token):
+        trace = _current_trace.get()
+        _current_trace.reset(token)
+        if trace is None:
+            return None
+        trace.duration = time.monotonic() - trace.started
+        self._observe(self._requests, trace.name, trace.duration)
+        if trace.duration >= self.slow_threshold:
+            self._log_slow(trace)
+        return trace
+
+    @contextmanager
+    def trace(self, name, details=None):
+        token = self.begin(name, details)
+        try:
+            yield
+        finally:
+            self.end(token)
+
+    # Records a stage that took `duration` seconds and ended just now
+    def record(self, stage, duration):
+        self._observe(self._stages, stage, duration)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.spans.append((stage, time.monotonic() - duration - trace.started, duration))
+
+    @contextmanager
+    def span(self, stage):
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.record(stage, time.monotonic() - started)
+
+    def _log_slow(self, trace):
+        record = trace.to_dict()
+        breakdown = " ".join(f"{span['stage']}={span['duration_s']:.2f}s" for span in record['spans'])
+        print(f"Slow request {trace.name} took {trace.duration:.2f}s: {breakdown or 'no traced stages'}")
+        with self._lock:
+            self._slow.append(record)
+            self._slow_count += 1
+            if self.slow_log_path:
+                try:
+                    os.makedirs(os.path.dirname(self.slow_log_path) or '.', exist_ok=True)
+                    with open(self.slow_log_path, 'a', encoding='utf-8') as f:
+                        f.write(json.dumps(record) + "\n")
+                except OSError as e:
+                    print(f"Could not write the slow-request log: {e}")
+
+    # --------------------------------------------------------------------------
+    # Integrations
+    # --------------------------------------------------------------------------
+
+    # Traces every request of a Flask app. The trace ends at teardown, which
+    # for streamed responses is after the last chunk has been sent.
+    def init_app(self, app):
+        from flask import g, request
+
+        @app.before_request
+        def _begin_request_trace():
+            g.trace_token = self.begin(request.endpoint or 'unknown', {'method': request.method, 'path': request.path})
+
+        @app.teardown_request
+        def _end_request_trace(exc):
+            token = g.pop('trace_token', None)
+            if token is not None:
+                try:
+                    self.end(token)
+                except ValueError:
+                    # Torn down in a different context than it started in
+                    pass
+
+    # Times every SQL statement and every commit made through SQLAlchemy
+    # (once per process, however many apps are created)
+    def instrument_sqlalchemy(self):
+        with self._lock:
+            if self._sqlalchemy_instrumented:
+                return
+            self._sqlalchemy_instrumented = True
+        from sqlalchemy import event
+        from sqlalchemy.engine import Engine
+        from sqlalchemy.orm import Session
+
+        # The start time lives on the statement's execution context, so a
+        # statement that raises (and never reaches after_cursor_execute)
+        # leaves nothing behind on the connection
+        @event.listens_for(Engine, 'before_cursor_execute')
+        def _before_execute(conn, cursor, statement, parameters, context, executemany):
+            if context is not None:
+                context.trace_started = time.monotonic()
+
+        @event.listens_for(Engine, 'after_cursor_execute')
+        def _after_execute(conn, cursor, statement, parameters, context, executemany):
+            started = getattr(context, 'trace_started', None)
+            if started is not None:
+                self.record('db.query', time.monotonic() - started)
+
+        @event.listens_for(Session, 'before_commit')
+        def _before_commit(session):
+            session.info['trace_commit_started'] = time.monotonic()
+
+        @event.listens_for(Session, 'after_commit')
+        def _after_commit(session):
+            started = session.info.pop('trace_commit_started', None)
+            if started is not None:
+                self.record('db.commit', time.monotonic() - started)
+
+    # --------------------------------------------------------------------------
+    # Exposition
+    # --------------------------------------------------------------------------
+
+    def _render_histograms(self, lines, metric, label, histograms, help_text):
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} histogram")
+        for key, histogram in sorted(histograms.items()):
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                lines.append(f'{metric}_bucket{{{label}="{key}",le="{bound}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{{label}="{key}",le="+Inf"}} {histogram.count}')
+            lines.append(f'{metric}_sum{{{label}="{key}"}} {histogram.sum:.6f}')
+            lines.append(f'{metric}_count{{{label}="{key}"}} {histogram.count}')
+
+    # Returns the Prometheus text exposition of the histograms, plus every
+    # numeric value of `stats` (the /stats dict) as a gauge
+    def render_metrics(self, stats=None):
+        lines = []
+        with self._lock:
+            self._render_histograms(lines, 'court_request_duration_seconds', 'name', self._requests,
+                                    "Duration of web requests (by endpoint) and background jobs.")
+            self._render_histograms(lines, 'court_stage_duration_seconds', 'stage', self._stages,
+                                    "Duration of traced stages (browser, scrape, parse, db, pdf, llm).")
+            lines.append("# HELP court_slow_requests_total Requests slower than the slow-request threshold.")
+            lines.append("# TYPE court_slow_requests_total counter")
+            lines.append(f"court_slow_requests_total {self._slow_count}")
+        if stats:
+            lines.append("# HELP court_component_stat Counters and gauges from /stats.")
+            lines.append("# TYPE court_component_stat gauge")
+            for name, value in _flatten(stats):
+                component, _, stat = name.partition('.')
+                lines.append(f'court_component_stat{{component="{component}",stat="{stat}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def stats(self):
+        with self._lock:
+            return {
+                'slow_threshold_s': self.slow_threshold,
+                'slow_requests': self._slow_count,
+                'recent_slow': list(self._slow)[-5:],
+            }
+
+
+# Yields (dotted.name, number) for every numeric leaf of a nested dict
+def _flatten(values, prefix=''):
+    for key, value in values.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, bool):
+            yield name, int(value)
+        elif isinstance(value, (int, float)):
+            yield name, value
+        elif isinstance(value, dict):
+            yield from _flatten(value, name + '.')
+
+
+# The tracer shared by every module of the process
+tracer = Tracer()
+span = tracer.span
@@ -0,0 +1,260 @@
+# ==============================================================================
+#  watchlist.py - Watched Cases and Detection of New Orders
+# ==============================================================================
+# Instead of searching the same cases by hand every day to see whether a new
+# order has appeared, cases are registered on a watchlist. A scheduler
+# thread wakes up every `poll_interval` seconds and re-checks only the cases
+# that are due, on at most `workers` threads. Each check compares the
+# scraped order links with the orders already recorded for the case; only
+# the newly seen orders are recorded and their PDFs downloaded into the PDF
+# store. The first check of a case just records its existing orders as the
+# baseline. Check times are spread out with random jitter so a large
+# watchlist does not hit the court website all at once. Each due case is
+# claimed in the database before it is checked, so when several worker
+# processes run a scheduler every case is still checked only once.
+# ==============================================================================
+
+import datetime
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy.exc import IntegrityError
+from models import db, WatchedCase, WatchedOrder
+
+
+class Watchlist:
+    def __init__(self, app, lookup, pdf_store, interval=24 * 3600, jitter=0.1,
+                 retry_after=900, workers=2, poll_interval=60):
+        self.app = app
+        self.lookup = lookup            # lookup(case_type, case_number, case_year) -> (case_data, order_links) or None
+        self.pdf_store = pdf_store
+        self.interval = interval
+        self.jitter = jitter
+        self.retry_after = retry_after
+        self.workers = workers
+        self.poll_interval = poll_interval
+
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._checking = set()          # ids of cases being checked right now
+
+        # Counters exposed through stats()
+        self._sweeps = 0
+        self._checks = 0
+        self._changed = 0
+        self._new_orders = 0
+        self._downloads = 0
+        self._errors = 0
+        self._last_sweep_s = None
+
+    # --------------------------------------------------------------------------
+    # Managing watched cases (require an app context)
+    # --------------------------------------------------------------------------
+
+    # Adds a case to the watchlist (or returns it if already watched). It is
+    # checked for the first time on the next scheduler pass.
+    def add(self, case_type, case_number, case_year, interval=None):
+        case = WatchedCase.query.filter_by(case_type=case_type, case_number=case_number,
+                                           case_year=case_year).first()
+        if case is not None:
+            return case
+        now = datetime.datetime.now()
+        case = WatchedCase(case_type=case_type, case_number=case_number, case_year=case_year,
+                           interval_s=interval or self.interval, next_check_at=now, created_at=now)
+        db.session.add(case)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Added concurrently by another request
+            db.session.rollback()
+            case = WatchedCase.query.filter_by(case_type=case_type, case_number=case_number,
+                                               case_year=case_year).first()
+        return case
+
+    def remove(self, case_id):
+        case = db.session.get(WatchedCase, case_id)
+        if case is None:
+            return False
+        db.session.delete(case)
+        db.session.commit()
+        return True
+
+    # --------------------------------------------------------------------------
+    # Checking
+    # --------------------------------------------------------------------------
+
+    def _next_check(self, seconds):
+        spread = seconds * self.jitter
+        return datetime.datetime.now() + datetime.timedelta(seconds=seconds + random.uniform(-spread, spread))
+
+    # Re-scrapes one case and records the orders not seen before. Returns
+    # the list of new WatchedOrder rows (empty on the baseline check).
+    def check(self, case):
+        with self._lock:
+            self._checks += 1
+        baseline = case.last_checked_at is None
+        try:
+            result = self.lookup(case.case_type, case.case_number, case.case_year)
+        except Exception as e:
+            print(f"Watchlist check of case {case.id} failed: {e}")
+            with self._lock:
+                self._errors += 1
+            case.last_error = str(e)
+            case.next_check_at = self._next_check(min(self.retry_after, case.interval_s))
+            db.session.commit()
+            return []
+
+        now = datetime.datetime.now()
+        case.last_checked_at = now
+        case.next_check_at = self._next_check(case.interval_s)
+        if result is None:
+            case.last_error = "No records found for this case."
+            db.session.commit()
+            return []
+        case.last_error = None
+
+        _, order_links = result
+        known = {url for (url,) in db.session.query(WatchedOrder.url).filter_by(watched_case_id=case.id)}
+        new_orders = []
+        for link in order_links:
+            if link['url'] in known:
+                continue
+            known.add(link['url'])
+            order = WatchedOrder(watched_case_id=case.id, url=link['url'], text=link.get('text'),
+                                 date=link.get('date'), first_seen_at=now)
+            if not baseline:
+                order.pdf_sha256 = self._download(link['url'])
+                new_orders.append(order)
+            db.session.add(order)
+
+        if new_orders:
+            case.last_changed_at = now
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # The same case was checked concurrently and recorded them first
+            db.session.rollback()
+            return []
+        if new_orders:
+            with self._lock:
+                self._changed += 1
+                self._new_orders += len(new_orders)
+        return new_orders
+
+    # Downloads a new order into the PDF store; a failed download is retried
+    # later when the order is opened, so it doesn't fail the check
+    def _download(self, url):
+        try:
+            document = self.pdf_store.fetch(url)
+        except Exception as e:
+            print(f"Downloading new order {url} failed: {e}")
+            return None
+        with self._lock:
+            self._downloads += 1
+        return document.sha256
+
+    def _check_by_id(self, case_id):
+        try:
+            with self.app.app_context():
+                case = db.session.get(WatchedCase, case_id)
+                if case is not None:
+                    self.check(case)
+        finally:
+            with self._lock:
+                self._checking.discard(case_id)
+
+    # Claims a due case by moving its next check `retry_after` seconds ahead
+    # (check() then sets the real one). Returns False if another process
+    # claimed it first.
+    def _claim(self, case_id, now):
+        claimed = db.session.execute(db.update(WatchedCase)
+                                     .where(WatchedCase.id == case_id, WatchedCase.next_check_at <= now)
+                                     .values(next_check_at=now + datetime.timedelta(seconds=self.retry_after)))
+        return claimed.rowcount == 1
+
+    # Checks every case that is due, `workers` at a time
+    def run_due(self):
+        started = time.monotonic()
+        with self.app.app_context():
+            now = datetime.datetime.now()
+            due = [case_id for (case_id,) in db.session.query(WatchedCase.id)
+                   .filter(WatchedCase.next_check_at <= now)
+                   .order_by(WatchedCase.next_check_at)]
+            with self._lock:
+                due = [case_id for case_id in due if case_id not in self._checking]
+            due = [case_id for case_id in due if self._claim(case_id, now)]
+            db.session.commit()
+        with self._lock:
+            self._checking.update(due)
+        if due:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='watchlist') as executor:
+                list(executor.map(self._check_by_id, due))
+        with self._lock:
+            self._sweeps += 1
+            self._last_sweep_s = round(time.monotonic() - started, 3)
+        return len(due)
+
+    # --------------------------------------------------------------------------
+    # Scheduler
+    # --------------------------------------------------------------------------
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='watchlist-scheduler', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_due()
+            except Exception as e:
+                print(f"Watchlist sweep failed: {e}")
+            self._stop.wait(self.poll_interval)
+
+    def shutdown(self):
+        self._stop.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'interval_s': self.interval,
+                'workers': self.workers,
+                'checking': len(self._checking),
+                'sweeps': self._sweeps,
+                'checks': self._checks,
+                'cases_changed': self._changed,
+                'new_orders': self._new_orders,
+                'downloads': self._downloads,
+                'errors': self._errors,
+                'last_sweep_s': self._last_sweep_s,
+            }
+
+
+# JSON-friendly views of the watchlist rows (used by the /watchlist API)
+def order_to_dict(order):
+    return {
+        'url': order.url,
+        'text': order.text,
+        'date': order.date,
+        'first_seen_at': order.first_seen_at.isoformat(),
+        'downloaded': order.pdf_sha256 is not None,
+    }
+
+
+def case_to_dict(case, with_orders=False):
+    record = {
+        'id': case.id,
+        'case_type': case.case_type,
+        'case_number': case.case_number,
+        'case_year': case.case_year,
+        'interval_s': case.interval_s,
+        'next_check_at': case.next_check_at.isoformat(),
+        'last_checked_at': case.last_checked_at.isoformat() if case.last_checked_at else None,
+        'last_changed_at': case.last_changed_at.isoformat() if case.last_changed_at else None,
+        'last_error': case.last_error,
+        'order_count': case.orders.count(),
+    }
+    if with_orders:
+        record['orders'] = [order_to_dict(order) for order in case.orders.order_by(WatchedOrder.first_seen_at.desc(), WatchedOrder.id)]
+    return record
@@ -0,0 +1,15 @@
+# ==============================================================================
+#  wsgi.py - WSGI Entry Point for Production Servers
+# ==============================================================================
+# Each worker process imports this module and builds its own app:
+#
+#   gunicorn -c gunicorn.conf.py wsgi:app
+#
+# CAPTCHA_FLOW picks the version of the app: 'auto' (default, as app2.py) or
+# 'user' (as app.py).
+# ==============================================================================
+
+import os
+from court_app import create_app
+
+app = create_app(os.environ.get('CAPTCHA_FLOW', 'auto'))